@@ -0,0 +1,205 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Metadados gravados para cada anexo recebido (fonte: caixa/pasta de origem)
+CAMPOS_METADADOS = ("nome_original", "remetente", "assunto", "recebido_em", "fonte")
+
+
+def caminho_conteudo(pasta: str, digest: str, nome_original: Optional[str] = None) -> str:
+    """
+    Caminho de um anexo endereçado pelo conteúdo: <pasta>/<ab>/<sha256><ext>.
+
+    Os dois primeiros caracteres do hash formam o subdiretório, limitando o
+    número de arquivos por pasta a ~1/256 do total.
+    """
+    extensao = os.path.splitext(nome_original or "")[1].lower() or ".pdf"
+    return os.path.join(pasta, digest[:2], digest + extensao)
+
+
+class IndiceAnexos:
+    """
+    Índice em SQLite dos anexos recebidos.
+
+    Cada recebimento gera uma linha com o hash do conteúdo, o caminho em que
+    ele está gravado e os metadados do e-mail; um mesmo conteúdo recebido
+    várias vezes aparece em várias linhas, com duplicado = 1 a partir da
+    segunda.
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS anexos ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, sha256 TEXT NOT NULL, "
+                "caminho TEXT NOT NULL, tamanho INTEGER, nome_original TEXT, "
+                "remetente TEXT, assunto TEXT, recebido_em TEXT, duplicado INTEGER, fonte TEXT)"
+            )
+            # Índices criados antes das várias fontes de e-mail
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(anexos)")}
+            if "fonte" not in existing:
+                self._conn.execute("ALTER TABLE anexos ADD COLUMN fonte TEXT")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_anexos_sha256 ON anexos (sha256)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_anexos_caminho ON anexos (caminho)"
+            )
+
+    def registrar(self, sha256: str, caminho: str, tamanho: int, duplicado: bool, metadados: Dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO anexos (sha256, caminho, tamanho, nome_original, remetente, "
+                "assunto, recebido_em, fonte, duplicado) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (sha256, caminho, tamanho)
+                + tuple(metadados.get(c) for c in CAMPOS_METADADOS)
+                + (int(duplicado),),
+            )
+
+    def buscar(self, caminho: str) -> List[Dict]:
+        """Retorna os recebimentos do anexo gravado no caminho, do mais antigo ao mais novo."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM anexos WHERE caminho = ? ORDER BY id", (caminho,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class AnexoTemporario:
+    """
+    Anexo gravado em um arquivo temporário e depois movido para o caminho
+    definido pelo hash do seu conteúdo.
+
+    O arquivo só aparece com o nome definitivo em concluir(), via rename
+    atômico; quem observa a pasta nunca vê um PDF pela metade. Se o mesmo
+    conteúdo já estiver gravado, o temporário é descartado.
+    """
+
+    def __init__(self, pasta: str, nome_arquivo: str, metadados: Optional[Dict] = None,
+                 indice: Optional[IndiceAnexos] = None):
+        self.pasta = pasta
+        self.metadados = {**(metadados or {}), "nome_original": nome_arquivo}
+        self.indice = indice
+        self.caminho: Optional[str] = None
+        self.duplicado = False
+        self._hash = hashlib.sha256()
+        self._tamanho = 0
+        fd, self.temporario = tempfile.mkstemp(dir=pasta, prefix=".", suffix=".part")
+        self._arquivo = os.fdopen(fd, "wb")
+
+    def write(self, dados: bytes) -> None:
+        self._hash.update(dados)
+        self._tamanho += len(dados)
+        self._arquivo.write(dados)
+
+    def concluir(self) -> Optional[str]:
+        """
+        Move o anexo para o caminho definitivo e o registra no índice.
+
+        Returns:
+            Caminho do anexo, ou None se o conteúdo já havia sido recebido
+        """
+        self._arquivo.close()
+        digest = self._hash.hexdigest()
+        self.caminho = caminho_conteudo(self.pasta, digest, self.metadados["nome_original"])
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        if os.path.exists(self.caminho):
+            os.remove(self.temporario)
+            self.duplicado = True
+            print(f"Anexo duplicado ignorado: {self.metadados['nome_original']} ({self.caminho})")
+        else:
+            os.replace(self.temporario, self.caminho)
+            print(f"Anexo salvo: {self.metadados['nome_original']} -> {self.caminho}")
+
+        if self.indice is not None:
+            metadados = {"recebido_em": datetime.now().isoformat(), **self.metadados}
+            self.indice.registrar(digest, self.caminho, self._tamanho, self.duplicado, metadados)
+        return None if self.duplicado else self.caminho
+
+    def descartar(self) -> None:
+        self._arquivo.close()
+        try:
+            os.remove(self.temporario)
+        except OSError:
+            pass
+
+
+class VarreduraPdfs:
+    """
+    Lista os PDFs de uma pasta e de suas subpastas, relendo só o que mudou.
+
+    Uma pasta cujos PDFs já estavam todos resolvidos (gravados no
+    repositório) na última varredura e cujo mtime não mudou desde então não
+    é listada de novo: só as subpastas dela são visitadas. Um arquivo novo
+    (ou renomeado para a pasta) muda o mtime e a pasta volta a ser lida.
+    """
+
+    # Pastas alteradas há menos que isto (ns) não são dadas como resolvidas:
+    # um arquivo criado no mesmo instante da leitura poderia não mudar o mtime
+    MARGEM_MTIME = 2 * 10 ** 9
+
+    def __init__(self, raiz: str):
+        self.raiz = raiz
+        # pasta -> (mtime, subpastas, resolvida)
+        self._pastas: Dict[str, Tuple[int, List[str], bool]] = {}
+        self._lock = threading.Lock()
+
+    def candidatos(self) -> Dict[str, Tuple[int, List[str]]]:
+        """
+        Lê as pastas não resolvidas.
+
+        Returns:
+            pasta -> (mtime, caminhos dos PDFs da pasta), só das pastas lidas
+        """
+        lidas = {}
+        pilha = [self.raiz]
+        while pilha:
+            pasta = pilha.pop()
+            try:
+                mtime = os.stat(pasta).st_mtime_ns
+            except OSError:
+                continue
+            with self._lock:
+                anterior = self._pastas.get(pasta)
+            if anterior is not None and anterior[0] == mtime and anterior[2]:
+                pilha.extend(anterior[1])
+                continue
+            subpastas, pdfs = [], []
+            try:
+                with os.scandir(pasta) as entradas:
+                    for entrada in entradas:
+                        if entrada.is_dir():
+                            subpastas.append(entrada.path)
+                        elif entrada.name.lower().endswith(".pdf"):
+                            pdfs.append(entrada.path)
+            except OSError:
+                continue
+            with self._lock:
+                self._pastas[pasta] = (mtime, subpastas, False)
+            pilha.extend(subpastas)
+            lidas[pasta] = (mtime, sorted(pdfs))
+        return lidas
+
+    def resolver(self, pasta: str, mtime: int) -> None:
+        """Marca a pasta (lida com esse mtime) como resolvida, se ela não mudou desde então."""
+        if time.time_ns() - mtime < self.MARGEM_MTIME:
+            return
+        with self._lock:
+            anterior = self._pastas.get(pasta)
+            if anterior is not None and anterior[0] == mtime:
+                self._pastas[pasta] = (mtime, anterior[1], True)
@@ -0,0 +1,109 @@
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional
+
+# Data base do fator de vencimento (fator 1000 = 03/07/2000)
+DATA_BASE_FATOR = date(1997, 10, 7)
+# Em 22/02/2025 o fator atingiu 9999 e voltou para 1000
+DATA_BASE_FATOR_2025 = date(2025, 2, 22) - timedelta(days=1000)
+
+
+@dataclass
+class LinhaDigitavel:
+    """Dados lidos de uma linha digitável de boleto bancário (padrão FEBRABAN)."""
+    banco: str
+    moeda: str
+    fator_vencimento: int
+    valor_centavos: int
+    codigo_barras: str
+    vencimento: Optional[date] = None
+
+    @property
+    def valor(self) -> str:
+        """Valor no formato brasileiro sem separador de milhar (ex.: '1234,56')."""
+        return f"{self.valor_centavos // 100},{self.valor_centavos % 100:02d}"
+
+
+def modulo10(numero: str) -> int:
+    """Dígito verificador módulo 10 dos campos da linha digitável."""
+    soma = 0
+    peso = 2
+    for digito in reversed(numero):
+        produto = int(digito) * peso
+        soma += produto // 10 + produto % 10
+        peso = 1 if peso == 2 else 2
+    return (10 - soma % 10) % 10
+
+
+def modulo11(numero: str) -> int:
+    """Dígito verificador geral (módulo 11) do código de barras."""
+    soma = 0
+    peso = 2
+    for digito in reversed(numero):
+        soma += int(digito) * peso
+        peso = 2 if peso == 9 else peso + 1
+    dv = 11 - soma % 11
+    return 1 if dv in (0, 10, 11) else dv
+
+
+def fator_para_data(fator: int, referencia: Optional[date] = None) -> Optional[date]:
+    """
+    Converte o fator de vencimento em data.
+
+    Como o fator reiniciou em 1000 no dia 22/02/2025, um mesmo fator pode
+    representar duas datas; é escolhida a mais próxima da data de referência
+    (por padrão, hoje).
+    """
+    if fator == 0:
+        return None
+    referencia = referencia or date.today()
+    candidatas = [DATA_BASE_FATOR + timedelta(days=fator)]
+    if fator >= 1000:
+        candidatas.append(DATA_BASE_FATOR_2025 + timedelta(days=fator))
+    return min(candidatas, key=lambda d: abs((d - referencia).days))
+
+
+def decode_linha_digitavel(
+    linha: str, referencia: Optional[date] = None
+) -> Optional[LinhaDigitavel]:
+    """
+    Decodifica e valida uma linha digitável de 47 dígitos.
+
+    Valida os dígitos verificadores (módulo 10) dos três primeiros campos e o
+    dígito geral (módulo 11) do código de barras.
+
+    Args:
+        linha: Linha digitável, com ou sem pontos e espaços
+        referencia: Data usada para desambiguar o fator de vencimento
+
+    Returns:
+        LinhaDigitavel com os dados decodificados ou None se for inválida
+    """
+    digitos = "".join(c for c in linha if c.isdigit())
+    if len(digitos) != 47:
+        return None
+
+    campo1, dv1 = digitos[0:9], int(digitos[9])
+    campo2, dv2 = digitos[10:20], int(digitos[20])
+    campo3, dv3 = digitos[21:31], int(digitos[31])
+    dv_geral = digitos[32]
+    fator_valor = digitos[33:47]
+
+    if (modulo10(campo1), modulo10(campo2), modulo10(campo3)) != (dv1, dv2, dv3):
+        return None
+
+    # Código de barras: banco, moeda, DV, fator, valor e campo livre
+    campo_livre = campo1[4:] + campo2 + campo3
+    codigo_barras = campo1[:4] + dv_geral + fator_valor + campo_livre
+    if modulo11(codigo_barras[:4] + codigo_barras[5:]) != int(dv_geral):
+        return None
+
+    fator = int(fator_valor[:4])
+    return LinhaDigitavel(
+        banco=campo1[:3],
+        moeda=campo1[3],
+        fator_vencimento=fator,
+        valor_centavos=int(fator_valor[4:]),
+        codigo_barras=codigo_barras,
+        vencimento=fator_para_data(fator, referencia),
+    )
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("boleto_processor")
+
+# Nome dos diretórios de versão (BoletoProcessor.extraction_version)
+_VERSAO = re.compile(r"^[0-9a-f]{16}(-[0-9a-f]{8})?$")
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Calcula o SHA-256 do conteúdo de um arquivo, lendo em blocos."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Cache de resultados de extração indexado pelo hash do conteúdo do PDF.
+
+    Possui uma camada em memória (LRU limitada) e uma camada opcional em
+    disco. A versão do conjunto de padrões faz parte da chave, de modo que
+    qualquer alteração nos padrões invalida o cache automaticamente.
+
+    No disco cada versão tem seu diretório. No primeiro acesso ao disco os
+    diretórios de outras versões são removidos; quando a versão atual passa
+    de `disk_max_size` resultados, os menos usados recentemente (pelo mtime,
+    atualizado a cada leitura) são removidos até sobrar 90% do limite.
+    """
+
+    def __init__(self, version: str, max_size: int = 1024, cache_dir: Optional[str] = None,
+                 disk_max_size: int = 0):
+        self.version = version
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self.disk_max_size = disk_max_size
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Resultados da versão atual no disco; contados no primeiro acesso
+        self._disk_count: Optional[int] = None
+        self._disk_lock = threading.Lock()
+
+    def _disk_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, self.version, digest[:2], f"{digest}.json")
+
+    def _disk_entries(self) -> List[Tuple[float, str]]:
+        """(mtime, caminho) de cada resultado da versão atual no disco."""
+        entries = []
+        version_dir = os.path.join(self.cache_dir, self.version)
+        if not os.path.isdir(version_dir):
+            return entries
+        for sub in os.scandir(version_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except FileNotFoundError:
+                        pass
+        return entries
+
+    def _open_disk(self) -> None:
+        """Remove os diretórios de versões antigas e conta os resultados da atual."""
+        if self._disk_count is not None:
+            return
+        with self._disk_lock:
+            if self._disk_count is not None:
+                return
+            try:
+                names = os.listdir(self.cache_dir)
+            except FileNotFoundError:
+                names = []
+            for name in names:
+                path = os.path.join(self.cache_dir, name)
+                if name != self.version and _VERSAO.match(name) and os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                    logger.info(f"Cache de resultados da versão {name} removido")
+            self._disk_count = len(self._disk_entries())
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove do disco os resultados menos usados quando o limite é ultrapassado."""
+        if not self.disk_max_size or self._disk_count <= self.disk_max_size:
+            return
+        with self._disk_lock:
+            entries = sorted(self._disk_entries())
+            excess = len(entries) - int(self.disk_max_size * 0.9)
+            removed = 0
+            for _, path in entries[:max(excess, 0)]:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            self._disk_count = len(entries) - removed
+        logger.info(f"Cache de resultados em disco: {removed} resultado(s) antigo(s) removido(s)")
+
+    def get(self, digest: str) -> Optional[Dict]:
+        """
+        Busca o resultado de um conteúdo já processado.
+
+        Args:
+            digest: SHA-256 do conteúdo do PDF
+
+        Returns:
+            Cópia do dicionário armazenado ou None se não estiver em cache
+        """
+        with self._lock:
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+                return dict(data)
+
+        if not self.cache_dir:
+            return None
+
+        self._open_disk()
+        path = self._disk_path(digest)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Marca o uso, para a remoção dos menos usados
+            os.utime(path)
+        except Exception as e:
+            logger.warning(f"Erro ao ler cache em disco {path}: {str(e)}")
+            return None
+
+        self._remember(digest, data)
+        return dict(data)
+
+    def set(self, digest: str, data: Dict) -> None:
+        """Armazena o resultado de um conteúdo nas camadas do cache."""
+        self._remember(digest, data)
+
+        if not self.cache_dir:
+            return
+        self._open_disk()
+        path = self._disk_path(digest)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            novo = not os.path.exists(path)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Erro ao gravar cache em disco {path}: {str(e)}")
+            return
+        if novo:
+            with self._disk_lock:
+                self._disk_count += 1
+            self._evict()
+
+    def _remember(self, digest: str, data: Dict) -> None:
+        with self._lock:
+            self._memory[digest] = dict(data)
+            self._memory.move_to_end(digest)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
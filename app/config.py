@@ -1,10 +1,65 @@
+import json
 import os
+from typing import Dict, List
 
 class Config:
     def __init__(self):
         self.anexos_dir = "anexos"
+        # Arquivo JSON legado, migrado para o repositório na primeira execução
         self.output_file = "boleto_data.json"
-        self.max_workers: int = 4
+        self.store_backend: str = os.environ.get("RESULT_STORE", "sqlite")
+        self.db_file: str = os.environ.get("RESULT_DB", "boleto_data.db")
+        # Modo de execução da extração: "process" (um processo por núcleo,
+        # evita a disputa pelo GIL do pdfminer) ou "thread"
+        self.executor_mode: str = os.environ.get("EXECUTOR_MODE", "process")
+        self.max_workers: int = int(os.environ.get("MAX_WORKERS", os.cpu_count() or 4))
+        # Limites por documento no modo "process": tempo (segundos) e memória
+        # exclusiva (MiB, sem as páginas herdadas do processo principal) do
+        # processo que o extrai; ao passar de qualquer um o processo é
+        # encerrado e o arquivo vai para a quarentena (0 desativa)
+        self.extraction_timeout: float = float(os.environ.get("EXTRACTION_TIMEOUT", 120))
+        self.extraction_memory_mb: int = int(os.environ.get("EXTRACTION_MEMORY_MB", 1024))
+        # Aquece os workers de extração na inicialização (API e worker),
+        # extraindo um boleto embutido antes de aceitar requisições
+        self.warmup: bool = os.environ.get("WARMUP", "True") == "True"
+        # Jobs de upload assíncrono mantidos para consulta em /jobs/{id}
+        self.max_jobs: int = int(os.environ.get("MAX_JOBS", 10000))
+        # Cache de resultados por hash do conteúdo (memória + disco opcional);
+        # no disco ficam até RESULT_CACHE_DISK_SIZE resultados (0 = sem limite)
+        self.cache_size: int = int(os.environ.get("RESULT_CACHE_SIZE", 1024))
+        self.cache_dir: str = os.environ.get("RESULT_CACHE_DIR", "anexos_cache")
+        self.cache_disk_size: int = int(os.environ.get("RESULT_CACHE_DISK_SIZE", 100000))
+        # Leitura do texto dos PDFs: biblioteca usada ("pdfplumber" ou
+        # "pdfium") e modo - "early" lê a primeira página, depois a última e
+        # as demais, parando quando os campos obrigatórios são encontrados;
+        # "full" lê sempre todas as páginas
+        self.text_backend: str = os.environ.get("TEXT_BACKEND", "pdfplumber")
+        self.extraction_mode: str = os.environ.get("EXTRACTION_MODE", "early")
+        # Regiões de corte por layout, em frações da página (x0, topo, x1,
+        # base), tentadas antes da página inteira. Ex.:
+        # TEXT_CROP_BOXES='{"ficha_compensacao": [0, 0.45, 1, 1]}'
+        self.crop_boxes: Dict[str, List[float]] = json.loads(
+            os.environ.get("TEXT_CROP_BOXES") or "{}"
+        )
+        # Texto extraído de cada PDF, comprimido, para reaplicar padrões novos
+        # sem reabrir os PDFs (vazio desativa)
+        self.text_db: str = os.environ.get("TEXT_DB", "boleto_textos.db")
+        # Scheduler de extração: tarefas aguardando por classe de prioridade
+        # (acima disso uploads recebem 429) e pesos do rodízio entre as classes
+        self.scheduler_queue_size: int = int(os.environ.get("SCHEDULER_QUEUE_SIZE", 256))
+        self.scheduler_weights: str = os.environ.get(
+            "SCHEDULER_WEIGHTS", "interactive=8,email=3,bulk=1"
+        )
+        # Fila do pipeline e-mail -> extração; quando cheia, o worker de
+        # e-mail aguarda antes de enfileirar novos anexos
+        self.pipeline_queue_size: int = int(os.environ.get("PIPELINE_QUEUE_SIZE", 1000))
+        # Reserva (segundos) de um arquivo pendente pelo processo que vai
+        # extraí-lo, renovada enquanto o processo está vivo; se ele cair, outro
+        # processo pode reservar o arquivo depois desse prazo
+        self.claim_ttl: float = float(os.environ.get("CLAIM_TTL", 60))
+        # Intervalo mínimo (segundos) entre as consultas ao repositório feitas
+        # pelos índices de /boletos/ para incluir gravações de outros processos
+        self.query_refresh_interval: float = float(os.environ.get("QUERY_REFRESH_INTERVAL", 1.0))
 
         # Cria diretórios se não existirem
         os.makedirs(self.anexos_dir, exist_ok=True)
@@ -1,10 +1,12 @@
+import logging
 import os
 from dotenv import load_dotenv
 from pathlib import Path
 
-# Carrega o .env que está na pasta app
+# Carrega o .env que está na pasta app (sem saída no import; o caminho só
+# aparece no log em DEBUG)
 env_path = Path(__file__).parent / ".env"
-print(f"Carregando variáveis de ambiente do arquivo: {env_path}")
+logging.getLogger("boleto_processor").debug(f"Carregando variáveis de ambiente de {env_path}")
 load_dotenv(dotenv_path=env_path)
 
 class Settings:
@@ -15,7 +17,39 @@ class Settings:
     EMAIL = os.environ.get('LOGIN_APP_EMAIL')
     SENHA = os.environ.get('PASS_APP_EMAIL')
     SERVER_IMAP = os.environ.get('SERVER_IMAP')
+    IMAP_PORT = int(os.environ.get('IMAP_PORT', 0)) or None  # padrão: 993 (SSL) ou 143
+    IMAP_SSL = os.environ.get('IMAP_SSL', 'True') == 'True'
+    # Último UID processado (e UIDVALIDITY) da caixa monitorada
+    IMAP_STATE_FILE = os.environ.get('IMAP_STATE_FILE', 'imap_state.json')
+    # Várias caixas/pastas monitoradas ao mesmo tempo: lista JSON de fontes,
+    # ou o caminho de um arquivo com ela. Vazio monitora só a conta acima, na
+    # INBOX, com o assunto "Boleto". Ex.:
+    # IMAP_FONTES='[{"nome": "cliente1", "usuario": "a@x.com", "senha_env": "SENHA_C1",
+    #               "pastas": ["INBOX", "Financeiro"], "criterio": "UNSEEN FROM \\"banco\\""}]'
+    IMAP_FONTES = os.environ.get('IMAP_FONTES', '')
+    # Conexões IMAP abertas ao mesmo tempo, somando todas as fontes. Com mais
+    # fontes que conexões, cada fonte só fica conectada durante a verificação
+    IMAP_MAX_CONEXOES = int(os.environ.get('IMAP_MAX_CONEXOES', 20))
+    # Tempo limite (segundos) para conectar e para cada resposta do servidor
+    IMAP_TIMEOUT = int(os.environ.get('IMAP_TIMEOUT', 60))
     EMAIL_CHECK_INTERVAL = int(os.environ.get('EMAIL_CHECK_INTERVAL', 60))  # segundos
+    # IMAP IDLE: avisa novas mensagens sem polling; o comando é renovado a
+    # cada IMAP_IDLE_TIMEOUT segundos (o RFC 2177 recomenda menos de 29 min)
+    IMAP_IDLE = os.environ.get('IMAP_IDLE', 'True') == 'True'
+    IMAP_IDLE_TIMEOUT = int(os.environ.get('IMAP_IDLE_TIMEOUT', 300))
+    # Partes maiores que isto (em bytes) são baixadas em vários FETCH parciais
+    IMAP_FETCH_PEDACO = int(os.environ.get('IMAP_FETCH_PEDACO', 1024 * 1024))
+    # As partes menores são baixadas em lotes (um FETCH por lote) de até
+    # IMAP_LOTE_BYTES bytes somados e IMAP_LOTE_UIDS mensagens
+    IMAP_LOTE_BYTES = int(os.environ.get('IMAP_LOTE_BYTES', 8 * 1024 * 1024))
+    IMAP_LOTE_UIDS = int(os.environ.get('IMAP_LOTE_UIDS', 50))
+    IMAP_BACKOFF_MAX = int(os.environ.get('IMAP_BACKOFF_MAX', 300))  # segundos
+    # Observa a pasta de anexos e extrai também os PDFs colocados nela por outros meios
+    WATCH_ANEXOS = os.environ.get('WATCH_ANEXOS', 'True') == 'True'
+    # Porta do /metrics do worker (0 desativa)
+    METRICS_PORT = int(os.environ.get('METRICS_PORT', 9100))
     PASTA_ANEXOS = "anexos"
+    # Índice dos anexos recebidos (nome original, remetente, assunto, data)
+    ANEXOS_INDEX_DB = os.environ.get('ANEXOS_INDEX_DB', 'anexos_index.db')
 
 settings = Settings()
\ No newline at end of file
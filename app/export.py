@@ -0,0 +1,50 @@
+import csv
+import io
+import json
+from typing import Iterator
+
+from app.storage import COLUMNS, ResultStore
+
+# Formatos de exportação: conteúdo em lotes e Content-Type da resposta
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "colunar": "application/x-ndjson",
+}
+
+
+def export_csv(store: ResultStore, batch_size: int = 5000) -> Iterator[str]:
+    """
+    Exporta todos os boletos em CSV, um lote de linhas por vez.
+
+    Yields:
+        O cabeçalho e, em seguida, o texto CSV de cada lote
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue()
+    for rows in store.iter_batches(batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def export_columnar(store: ResultStore, batch_size: int = 5000) -> Iterator[str]:
+    """
+    Exporta todos os boletos em lotes colunares, um objeto JSON por linha.
+
+    Cada linha tem uma lista por coluna, por exemplo
+    {"arquivo": [...], "valor": [...], ...}, com os valores no mesmo
+    formato da API.
+    """
+    for rows in store.iter_batches(batch_size):
+        yield json.dumps(dict(zip(COLUMNS, map(list, zip(*rows)))), ensure_ascii=False) + "\n"
+
+
+def export(store: ResultStore, formato: str, batch_size: int = 5000) -> Iterator[str]:
+    if formato == "csv":
+        return export_csv(store, batch_size)
+    if formato == "colunar":
+        return export_columnar(store, batch_size)
+    raise ValueError(f"Formato de exportação desconhecido: {formato}")
@@ -1,70 +1,714 @@
 import imaplib
-import email
-from email.header import decode_header
+import json
+from email.header import decode_header, make_header
+from email.parser import BytesHeaderParser
+from email.utils import parsedate_to_datetime
 import os
+import re
+import select
+import ssl
+import threading
 import time
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import List, Optional
+from app.anexos import AnexoTemporario, IndiceAnexos
 from app.core.settings import settings
+from app.metrics import (
+    IMAP_COMMAND_SECONDS,
+    IMAP_CONNECTIONS,
+    IMAP_FAILURES,
+    IMAP_MESSAGE_LAG_SECONDS,
+    IMAP_SOURCE_ERRORS,
+    IMAP_SOURCE_LAG_SECONDS,
+)
+from app.imap_parser import parse_fetch, partes_pdf
+from app.mime_stream import decodificador, decodificar_em_pedacos
 
-def conectar_imap():
-    mail = imaplib.IMAP4_SSL(settings.SERVER_IMAP)
-    mail.login(settings.EMAIL, settings.SENHA)
-    mail.select("INBOX")
+# Critério de busca das fontes que não informam o seu
+CRITERIO_PADRAO = 'UNSEEN SUBJECT "Boleto"'
+
+# Caracteres trocados por "_" no nome do arquivo de estado de cada fonte
+_NAO_ARQUIVO = re.compile(r"[^\w.-]+")
+
+
+class FonteEmail:
+    """Uma pasta de uma conta IMAP monitorada, com seu critério de busca e seu estado de UIDs."""
+
+    def __init__(self, nome, servidor, usuario, senha, pasta="INBOX", criterio=CRITERIO_PADRAO,
+                 porta=None, ssl=True, estado=None):
+        self.nome = nome
+        self.servidor = servidor
+        self.usuario = usuario
+        self.senha = senha
+        self.pasta = pasta
+        self.criterio = criterio
+        self.porta = porta
+        self.ssl = ssl
+        self.estado = estado or f"imap_state_{_NAO_ARQUIVO.sub('_', nome)}.json"
+
+
+def carregar_fontes() -> List[FonteEmail]:
+    """
+    Fontes de e-mail configuradas em IMAP_FONTES (JSON ou caminho de um arquivo JSON).
+
+    Cada item informa nome, usuario, senha (ou senha_env, o nome da variável
+    de ambiente com a senha) e, opcionalmente, servidor, porta, ssl (padrão:
+    SERVER_IMAP, IMAP_PORT e IMAP_SSL), criterio de busca e pasta ou pastas.
+    Cada pasta vira uma fonte, com nome "<nome>/<pasta>" quando há mais de uma.
+    Sem IMAP_FONTES, a única fonte é a INBOX da conta LOGIN_APP_EMAIL.
+    """
+    if not settings.IMAP_FONTES:
+        return [FonteEmail(
+            "default", settings.SERVER_IMAP, settings.EMAIL, settings.SENHA,
+            porta=settings.IMAP_PORT, ssl=settings.IMAP_SSL, estado=settings.IMAP_STATE_FILE,
+        )]
+
+    valor = settings.IMAP_FONTES.strip()
+    if not valor.startswith("["):
+        with open(valor, "r", encoding="utf-8") as f:
+            valor = f.read()
+    fontes = []
+    for item in json.loads(valor):
+        if not item.get("nome") or not item.get("usuario"):
+            raise ValueError(f"Fonte de e-mail sem nome ou usuario: {item}")
+        senha = os.environ.get(item["senha_env"]) if item.get("senha_env") else item.get("senha")
+        pastas = item.get("pastas") or [item.get("pasta", "INBOX")]
+        for pasta in pastas:
+            fontes.append(FonteEmail(
+                item["nome"] if len(pastas) == 1 else f"{item['nome']}/{pasta}",
+                item.get("servidor", settings.SERVER_IMAP),
+                item["usuario"],
+                senha,
+                pasta=pasta,
+                criterio=item.get("criterio", CRITERIO_PADRAO),
+                porta=item.get("porta", settings.IMAP_PORT),
+                ssl=item.get("ssl", settings.IMAP_SSL),
+                estado=item.get("estado") if len(pastas) == 1 else None,
+            ))
+    nomes = [fonte.nome for fonte in fontes]
+    repetidos = {nome for nome in nomes if nomes.count(nome) > 1}
+    if repetidos:
+        raise ValueError(f"Fontes de e-mail com nomes repetidos: {sorted(repetidos)}")
+    return fontes
+
+
+def conectar_imap(fonte: FonteEmail):
+    # ssl=False permite apontar o worker para um servidor IMAP local de testes
+    if fonte.ssl:
+        mail = imaplib.IMAP4_SSL(fonte.servidor, fonte.porta or 993, timeout=settings.IMAP_TIMEOUT)
+    else:
+        mail = imaplib.IMAP4(fonte.servidor, fonte.porta or 143, timeout=settings.IMAP_TIMEOUT)
+    mail.login(fonte.usuario, fonte.senha)
+    # Nomes de pasta com espaços precisam de aspas
+    pasta = f'"{fonte.pasta}"' if " " in fonte.pasta else fonte.pasta
+    status, dados = mail.select(pasta)
+    if status != "OK":
+        mail.logout()
+        raise imaplib.IMAP4.error(f"Pasta '{fonte.pasta}' indisponível: {dados}")
     return mail
 
-def processar_email(mensagem):
-    assunto, encoding = decode_header(mensagem["Subject"])[0]
-    if isinstance(assunto, bytes):
-        assunto = assunto.decode(encoding or "utf-8")
-    remetente, encoding = decode_header(mensagem.get("From"))[0]
-    if isinstance(remetente, bytes):
-        remetente = remetente.decode(encoding or "utf-8")
-
-    # print(f"\nE-mail filtrado (Boleto): {remetente}")
-    # print(f"Assunto: {assunto}")
-
-    # Processar corpo e anexos (mesma lógica do código anterior)
-    if mensagem.is_multipart():
-        for part in mensagem.walk():
-            content_type = part.get_content_type()
-            content_disposition = str(part.get("Content-Disposition"))
-            
-            #if content_type in ["text/plain", "text/html"]:
-                #corpo = part.get_payload(decode=True).decode()
-                #print(f"\nCorpo do e-mail:\n{corpo[:500]}...")  # Exibe parte do texto
-            
-            if "attachment" in content_disposition:
-                nome_arquivo = part.get_filename()
-                if nome_arquivo:
-                    caminho = os.path.join(settings.PASTA_ANEXOS, nome_arquivo)
-                    with open(caminho, "wb") as f:
-                        f.write(part.get_payload(decode=True))
-                    print(f"Anexo salvo: {caminho}")
-
-def monitorar_emails():
+
+class OrcamentoConexoes:
+    """Limite de conexões IMAP abertas ao mesmo tempo, compartilhado pelas fontes."""
+
+    def __init__(self, limite: int):
+        self.limite = limite
+        self.em_uso = 0
+        self._vagas = threading.BoundedSemaphore(limite)
+        self._lock = threading.Lock()
+        IMAP_CONNECTIONS.set_function(lambda: self.em_uso)
+
+    def reservar(self, parar: threading.Event) -> bool:
+        """Aguarda uma vaga; False se parar for sinalizado antes."""
+        while not self._vagas.acquire(timeout=1):
+            if parar.is_set():
+                return False
+        with self._lock:
+            self.em_uso += 1
+        return True
+
+    def liberar(self) -> None:
+        with self._lock:
+            self.em_uso -= 1
+        self._vagas.release()
+
+
+class EstadoUID:
+    """
+    Último UID processado da caixa, persistido em arquivo JSON.
+
+    Se o UIDVALIDITY da caixa mudar, os UIDs antigos deixam de valer e a
+    contagem recomeça.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.uidvalidity = None
+        self.ultimo_uid = 0
+        if os.path.exists(caminho):
+            try:
+                with open(caminho, "r", encoding="utf-8") as f:
+                    dados = json.load(f)
+                self.uidvalidity = dados.get("uidvalidity")
+                self.ultimo_uid = dados.get("ultimo_uid", 0)
+            except Exception as e:
+                print(f"[IMAP] Erro ao carregar estado de UIDs: {e}")
+
+    def sincronizar(self, uidvalidity):
+        if uidvalidity and uidvalidity != self.uidvalidity:
+            if self.uidvalidity is not None:
+                print("[IMAP] UIDVALIDITY mudou; reiniciando contagem de UIDs")
+            self.uidvalidity = uidvalidity
+            self.ultimo_uid = 0
+
+    def salvar(self):
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({"uidvalidity": self.uidvalidity, "ultimo_uid": self.ultimo_uid}, f)
+        os.replace(temporario, self.caminho)
+
+
+def _decodificar_cabecalho(valor):
+    if not valor:
+        return valor
+    # Junta todos os trechos codificados (ex.: "Boleto =?utf-8?q?=C3=A1gua?=")
+    try:
+        return str(make_header(decode_header(valor)))
+    except (LookupError, UnicodeDecodeError):
+        texto, encoding = decode_header(valor)[0]
+        if isinstance(texto, bytes):
+            texto = texto.decode("utf-8", errors="replace")
+        return texto
+
+
+_indice = None
+_indice_lock = threading.Lock()
+
+
+def indice_anexos() -> IndiceAnexos:
+    """Índice de metadados dos anexos recebidos, aberto no primeiro uso."""
+    global _indice
+    if _indice is None:
+        with _indice_lock:
+            if _indice is None:
+                _indice = IndiceAnexos(settings.ANEXOS_INDEX_DB)
+    return _indice
+
+
+def _metadados(cabecalhos, recebido_em=None):
+    """Remetente, assunto e data de recebimento a partir dos cabeçalhos do e-mail."""
+    metadados = {
+        "remetente": _decodificar_cabecalho(cabecalhos.get("From")),
+        "assunto": _decodificar_cabecalho(cabecalhos.get("Subject")),
+    }
+    if recebido_em is None and cabecalhos.get("Date"):
+        try:
+            recebido_em = parsedate_to_datetime(cabecalhos["Date"])
+        except (TypeError, ValueError):
+            pass
+    if recebido_em is not None:
+        metadados["recebido_em"] = recebido_em.isoformat()
+    return metadados
+
+
+def _novo_anexo(nome_arquivo, metadados=None):
+    return AnexoTemporario(settings.PASTA_ANEXOS, nome_arquivo, metadados, indice_anexos())
+
+
+def salvar_anexo(nome_arquivo, conteudo, metadados=None):
+    """
+    Grava um anexo na pasta de anexos, endereçado pelo hash do conteúdo.
+
+    Args:
+        nome_arquivo: Nome original do anexo
+        conteudo: Bytes ou iterável de pedaços de bytes já decodificados
+        metadados: Remetente, assunto e data de recebimento do e-mail
+
+    Returns:
+        Caminho do anexo salvo, ou None se o mesmo conteúdo já havia sido recebido
+    """
+    anexo = _novo_anexo(nome_arquivo, metadados)
+    try:
+        for pedaco in ([conteudo] if isinstance(conteudo, bytes) else conteudo):
+            anexo.write(pedaco)
+        return anexo.concluir()
+    except BaseException:
+        anexo.descartar()
+        raise
+
+def _uid(mail, rotulo, comando, *args):
+    """Executa mail.uid(comando, ...) registrando a duração e respostas diferentes de OK."""
+    inicio = time.perf_counter()
+    try:
+        status, dados = mail.uid(comando, *args)
+    finally:
+        IMAP_COMMAND_SECONDS.observe(time.perf_counter() - inicio, rotulo)
+    if status != "OK":
+        IMAP_FAILURES.inc(f"resposta_{status}")
+    return status, dados
+
+def verificar_emails(mail, estado: EstadoUID, ao_salvar=None, fonte: Optional[FonteEmail] = None):
+    """
+    Busca os e-mails novos que atendem ao critério da fonte (por padrão,
+    não lidos com assunto "Boleto") e baixa apenas seus anexos PDF.
+
+    Se informado, ao_salvar(caminho) é chamado para cada anexo gravado (por
+    exemplo, para enfileirá-lo direto no pipeline de extração).
+
+    Usa os UIDs a partir do último processado: o BODYSTRUCTURE de todas as
+    mensagens novas é obtido em um único FETCH, somente as partes PDF são
+    baixadas (BODY.PEEK, sem marcar como lida), em lotes de tamanho limitado
+    (IMAP_LOTE_BYTES, IMAP_LOTE_UIDS), e o \\Seen é aplicado em um
+    único STORE às mensagens cujas partes foram todas baixadas. Uma mensagem
+    com falha no download fica sem \\Seen, e o último UID processado avança
+    só até antes da primeira falha: ela é tentada de novo na próxima
+    verificação.
+
+    Returns:
+        True se a verificação foi até o fim sem falhas (a fonte está em dia)
+    """
+    nome_fonte = fonte.nome if fonte is not None else "default"
+    criterio_fonte = fonte.criterio if fonte is not None else CRITERIO_PADRAO
+    print(f"\n[IMAP {nome_fonte}] Verificando ({criterio_fonte}) em: {datetime.now().strftime('%H:%M:%S')}")
+
+    # Critério da fonte (SEARCH não diferencia maiúsculas) após o último UID
+    criterio = f'(UID {estado.ultimo_uid + 1}:* {criterio_fonte})'
+    status, mensagens = _uid(mail, "search", "SEARCH", None, criterio)
+    if status != "OK":
+        return False
+    # "N:*" sempre inclui a última mensagem da caixa, mesmo com UID menor que N
+    uids = [int(uid) for uid in mensagens[0].split() if int(uid) > estado.ultimo_uid]
+    if not uids:
+        return True
+
+    conjunto = ",".join(str(uid) for uid in uids)
+    status, dados = _uid(
+        mail, "fetch_estrutura", "FETCH", conjunto,
+        "(UID BODYSTRUCTURE INTERNALDATE BODY.PEEK[HEADER.FIELDS (SUBJECT FROM DATE)])",
+    )
+    if status != "OK":
+        return False
+
+    # Agrupa as mensagens pelas seções PDF para baixá-las com um FETCH por grupo;
+    # partes grandes são baixadas à parte, em pedaços
+    grupos = {}
+    grandes = []
+    metadados = {}
+    limite = settings.IMAP_FETCH_PEDACO
+    agora = datetime.now(timezone.utc)
+    for mensagem in parse_fetch(dados):
+        metadados[mensagem["UID"]] = _metadados_fetch(mensagem)
+        metadados[mensagem["UID"]]["fonte"] = nome_fonte
+        recebido_em = metadados[mensagem["UID"]].get("recebido_em")
+        if recebido_em:
+            recebido_em = datetime.fromisoformat(recebido_em)
+            if recebido_em.tzinfo is not None:
+                IMAP_MESSAGE_LAG_SECONDS.observe(max(0.0, (agora - recebido_em).total_seconds()), nome_fonte)
+        partes = []
+        for parte in partes_pdf(mensagem.get("BODYSTRUCTURE") or []):
+            if parte["tamanho"] and parte["tamanho"] > limite:
+                grandes.append((mensagem["UID"], parte))
+            else:
+                partes.append(parte)
+        if partes:
+            chave = tuple(parte["secao"] for parte in partes)
+            grupos.setdefault(chave, []).append((mensagem["UID"], partes))
+
+    # UIDs com alguma parte PDF que não foi baixada
+    falhas = set()
+    for secoes, itens in grupos.items():
+        for lote in _lotes(itens, settings.IMAP_LOTE_BYTES, settings.IMAP_LOTE_UIDS):
+            falhas.update(_baixar_lote(mail, secoes, lote, metadados, ao_salvar))
+
+    for uid, parte in grandes:
+        if int(uid) in falhas:
+            continue
+        try:
+            caminho = _baixar_em_pedacos(mail, uid, parte, limite, metadados.get(uid))
+        except DownloadIncompleto:
+            falhas.add(int(uid))
+            continue
+        if caminho and ao_salvar is not None:
+            ao_salvar(caminho)
+
+    # Marcar como lidas (opcional) de uma vez as mensagens baixadas por completo
+    concluidos = [uid for uid in uids if uid not in falhas]
+    if concluidos:
+        _uid(mail, "store", "STORE", ",".join(str(uid) for uid in concluidos), "+FLAGS", "(\\Seen)")
+    # O último UID processado não passa da primeira falha
+    ultimo = estado.ultimo_uid
+    for uid in sorted(uids):
+        if uid in falhas:
+            break
+        ultimo = uid
+    if ultimo != estado.ultimo_uid:
+        estado.ultimo_uid = ultimo
+        estado.salvar()
+    if falhas:
+        print(f"[IMAP {nome_fonte}] {len(falhas)} mensagem(ns) com falha no download; nova tentativa na próxima verificação")
+    return not falhas
+
+
+def _lotes(itens, max_bytes, max_uids):
+    """
+    Divide as mensagens de um grupo em lotes de até max_uids mensagens e
+    max_bytes bytes somados (pelo tamanho informado no BODYSTRUCTURE).
+
+    Uma mensagem maior que max_bytes sozinha forma um lote.
+    """
+    lote = []
+    total = 0
+    for uid, partes in itens:
+        tamanho = sum(parte["tamanho"] or 0 for parte in partes)
+        if lote and (len(lote) >= max_uids or total + tamanho > max_bytes):
+            yield lote
+            lote = []
+            total = 0
+        lote.append((uid, partes))
+        total += tamanho
+    if lote:
+        yield lote
+
+
+def _baixar_lote(mail, secoes, lote, metadados, ao_salvar=None):
+    """
+    Baixa em um único FETCH as partes `secoes` das mensagens do lote e grava os anexos.
+
+    A resposta do servidor é liberada ao retornar, antes do lote seguinte.
+
+    Returns:
+        UIDs (int) com alguma parte que não foi baixada
+    """
+    falhas = set()
+    itens_fetch = " ".join(f"BODY.PEEK[{secao}]" for secao in secoes)
+    status, dados = _uid(
+        mail, "fetch_partes", "FETCH", ",".join(uid for uid, _ in lote), f"(UID {itens_fetch})"
+    )
+    if status != "OK":
+        return {int(uid) for uid, _ in lote}
+    recebidas = {mensagem.get("UID"): mensagem for mensagem in parse_fetch(dados)}
+    del dados
+    for uid, partes in lote:
+        mensagem = recebidas.pop(uid, {})
+        for parte in partes:
+            conteudo = mensagem.get(f"BODY[{parte['secao']}]")
+            if not isinstance(conteudo, bytes):
+                falhas.add(int(uid))
+                continue
+            nome = _decodificar_cabecalho(parte["nome"]) or f"{uid}_{parte['secao']}.pdf"
+            caminho = salvar_anexo(
+                nome,
+                decodificar_em_pedacos(conteudo, parte["encoding"]),
+                metadados.get(uid),
+            )
+            # Conteúdo repetido (caminho None) não volta para a extração
+            if caminho and ao_salvar is not None:
+                ao_salvar(caminho)
+    return falhas
+
+
+def _metadados_fetch(mensagem):
+    """Metadados de uma mensagem a partir de INTERNALDATE e dos cabeçalhos obtidos no FETCH."""
+    cabecalhos = b""
+    for chave, valor in mensagem.items():
+        if chave.startswith("BODY[HEADER.FIELDS") and isinstance(valor, bytes):
+            cabecalhos = valor
+    recebido_em = None
+    if isinstance(mensagem.get("INTERNALDATE"), str):
+        try:
+            recebido_em = datetime.strptime(mensagem["INTERNALDATE"], "%d-%b-%Y %H:%M:%S %z")
+        except ValueError:
+            pass
+    return _metadados(BytesHeaderParser().parsebytes(cabecalhos), recebido_em)
+
+
+class DownloadIncompleto(Exception):
+    """O servidor recusou um dos FETCH parciais de um anexo."""
+
+
+def _baixar_em_pedacos(mail, uid, parte, tamanho_pedaco, metadados=None):
+    """
+    Baixa uma parte com FETCH parciais (BODY.PEEK[n]<inicio.tamanho>).
+
+    Cada pedaço é decodificado e gravado no arquivo temporário assim que
+    chega, de modo que a memória usada não depende do tamanho do anexo.
+
+    Returns:
+        Caminho do anexo salvo, ou None se o conteúdo já havia sido recebido
+
+    Raises:
+        DownloadIncompleto: um FETCH parcial não foi OK (nada é gravado)
+    """
+    nome = _decodificar_cabecalho(parte["nome"]) or f"{uid}_{parte['secao']}.pdf"
+    decod = decodificador(parte["encoding"])
+    anexo = _novo_anexo(nome, metadados)
+    try:
+        inicio = 0
+        while True:
+            status, dados = _uid(
+                mail, "fetch_parcial", "FETCH", uid,
+                f"(UID BODY.PEEK[{parte['secao']}]<{inicio}.{tamanho_pedaco}>)",
+            )
+            if status != "OK":
+                raise DownloadIncompleto(f"FETCH parcial de {uid} ({parte['secao']}): {status}")
+            pedaco = b""
+            for mensagem in parse_fetch(dados):
+                pedaco = mensagem.get(f"BODY[{parte['secao']}]<{inicio}>") or b""
+            if not isinstance(pedaco, bytes):
+                pedaco = b""
+            anexo.write(decod.feed(pedaco))
+            inicio += len(pedaco)
+            if len(pedaco) < tamanho_pedaco:
+                break
+        anexo.write(decod.finish())
+        return anexo.concluir()
+    except BaseException:
+        anexo.descartar()
+        raise
+
+
+class SessaoIMAP:
+    """
+    Conexão IMAP autenticada de uma fonte, mantida aberta entre as verificações.
+
+    Reconecta com backoff exponencial em caso de falha e, quando o servidor
+    suporta, usa IMAP IDLE para ser avisado de novas mensagens. Sem IDLE,
+    volta ao polling a cada EMAIL_CHECK_INTERVAL segundos.
+
+    Cada conexão ocupa uma vaga do orçamento compartilhado pelas fontes; a
+    vaga é devolvida quando a conexão é fechada ou cai.
+    """
+
+    def __init__(self, fonte: FonteEmail, orcamento: Optional[OrcamentoConexoes] = None,
+                 parar: Optional[threading.Event] = None):
+        self.fonte = fonte
+        self.orcamento = orcamento
+        self.parar = parar or threading.Event()
+        self.mail = None
+        self.backoff = 1
+        self.uidvalidity = None
+        self.em_idle = False
+        # Avisa a conexão só na primeira vez e depois de falhas: sem
+        # manter_conexao a fonte reconecta a cada verificação
+        self._avisar_conexao = True
+        # Momento da última verificação completa, para o atraso da fonte
+        self.sincronizado_em = time.monotonic()
+        self.rotulo = f"[IMAP {fonte.nome}]"
+
+    def atraso(self) -> float:
+        """Segundos desde a última verificação completa (0 enquanto em IDLE)."""
+        return 0.0 if self.em_idle else time.monotonic() - self.sincronizado_em
+
+    def obter(self):
+        """
+        Retorna a conexão aberta, conectando (com backoff) se necessário.
+
+        Returns:
+            A conexão, ou None se parar for sinalizado antes de conectar
+        """
+        while self.mail is None:
+            if self.orcamento is not None and not self.orcamento.reservar(self.parar):
+                return None
+            try:
+                self.mail = conectar_imap(self.fonte)
+                _, dados = self.mail.response("UIDVALIDITY")
+                self.uidvalidity = int(dados[0]) if dados and dados[0] else None
+                self.backoff = 1
+                if self._avisar_conexao:
+                    print(f"{self.rotulo} Conectado")
+                    self._avisar_conexao = False
+            except (imaplib.IMAP4.error, OSError) as e:
+                if self.orcamento is not None:
+                    self.orcamento.liberar()
+                IMAP_FAILURES.inc(f"conexao_{type(e).__name__}")
+                IMAP_SOURCE_ERRORS.inc(self.fonte.nome)
+                self._avisar_conexao = True
+                print(f"{self.rotulo} Falha ao conectar: {e}. Nova tentativa em {self.backoff}s")
+                if self.parar.wait(self.backoff):
+                    return None
+                self.backoff = min(self.backoff * 2, settings.IMAP_BACKOFF_MAX)
+        return self.mail
+
+    def _soltar(self) -> None:
+        self.mail = None
+        if self.orcamento is not None:
+            self.orcamento.liberar()
+
+    def invalidar(self):
+        """Descarta a conexão atual (ex.: após queda), sem aguardar o servidor."""
+        self._avisar_conexao = True
+        if self.mail is not None:
+            try:
+                self.mail.shutdown()
+            except Exception:
+                pass
+            self._soltar()
+
+    def fechar(self):
+        if self.mail is not None:
+            try:
+                self.mail.close()
+                self.mail.logout()
+            except Exception:
+                pass
+            self._soltar()
+
+    def suporta_idle(self) -> bool:
+        return settings.IMAP_IDLE and "IDLE" in self.mail.capabilities
+
+    def aguardar_novos(self, manter_conexao: bool = True):
+        """
+        Bloqueia até chegar uma nova mensagem (IDLE) ou vencer o intervalo de polling.
+
+        Com manter_conexao=False a conexão é fechada (devolvendo a vaga do
+        orçamento) durante a espera, e o polling é usado mesmo com IDLE.
+        """
+        if not manter_conexao:
+            self.fechar()
+            self.parar.wait(settings.EMAIL_CHECK_INTERVAL)
+        elif self.suporta_idle():
+            self.em_idle = True
+            try:
+                self._idle(settings.IMAP_IDLE_TIMEOUT)
+            finally:
+                self.em_idle = False
+        else:
+            self.parar.wait(settings.EMAIL_CHECK_INTERVAL)
+            # Mantém a sessão viva entre as verificações
+            self.mail.noop()
+
+    def _idle(self, timeout: int) -> bool:
+        """
+        Executa o comando IDLE (RFC 2177) por até timeout segundos.
+
+        Returns:
+            True se o servidor avisou sobre novas mensagens
+        """
+        mail = self.mail
+        tag = mail._new_tag()
+        mail.send(tag + b" IDLE\r\n")
+        resposta = mail._get_line()
+        if not resposta.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"IDLE recusado: {resposta!r}")
+
+        novos = False
+        try:
+            fim = time.monotonic() + timeout
+            while not novos:
+                restante = fim - time.monotonic()
+                if restante <= 0:
+                    break
+                # Linhas já lidas do socket não aparecem no select
+                if not _resposta_em_buffer(mail):
+                    prontos, _, _ = select.select([mail.sock], [], [], restante)
+                    if not prontos:
+                        break
+                linha = mail._get_line()
+                if linha.endswith(b"EXISTS") or linha.endswith(b"RECENT"):
+                    novos = True
+        finally:
+            mail.send(b"DONE\r\n")
+            while not mail._get_line().startswith(tag):
+                pass
+            mail.tagged_commands.pop(tag, None)
+        return novos
+
+
+def _resposta_em_buffer(mail) -> bool:
+    """
+    Indica se há resposta já recebida e ainda não lida pelo imaplib.
+
+    Ela pode estar decifrada no SSL (sock.pending()) ou no buffer de
+    mail.file, quando o servidor envia várias linhas no mesmo segmento. O
+    peek é feito com o socket em modo não bloqueante: sem nada no buffer,
+    não espera pelo servidor.
+    """
+    if getattr(mail.sock, "pending", lambda: 0)():
+        return True
+    timeout = mail.sock.gettimeout()
+    mail.sock.setblocking(False)
+    try:
+        return bool(mail.file.peek(1))
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    finally:
+        mail.sock.settimeout(timeout)
+
+
+def monitorar_fonte(fonte: FonteEmail, ao_salvar=None, orcamento: Optional[OrcamentoConexoes] = None,
+                    manter_conexao: bool = True, parar: Optional[threading.Event] = None):
+    """
+    Monitora uma fonte até parar ser sinalizado.
+
+    A cada aviso do IDLE (ou intervalo de polling) processa os novos e-mails;
+    quedas de conexão são tratadas com reconexão e backoff, e qualquer outra
+    falha da fonte é registrada sem interromper o monitoramento.
+    """
+    sessao = SessaoIMAP(fonte, orcamento, parar)
+    estado = EstadoUID(fonte.estado)
+    IMAP_SOURCE_LAG_SECONDS.set_function(sessao.atraso, fonte.nome)
+    try:
+        while not sessao.parar.is_set():
+            try:
+                mail = sessao.obter()
+                if mail is None:
+                    break
+                estado.sincronizar(sessao.uidvalidity)
+                if verificar_emails(mail, estado, ao_salvar, fonte):
+                    sessao.sincronizado_em = time.monotonic()
+                sessao.aguardar_novos(manter_conexao)
+            except (imaplib.IMAP4.abort, OSError) as e:
+                IMAP_FAILURES.inc(type(e).__name__)
+                IMAP_SOURCE_ERRORS.inc(fonte.nome)
+                print(f"{sessao.rotulo} Conexão perdida: {e}. Reconectando...")
+                sessao.invalidar()
+            except Exception as e:
+                IMAP_FAILURES.inc(type(e).__name__)
+                IMAP_SOURCE_ERRORS.inc(fonte.nome)
+                print(f"{sessao.rotulo} Erro: {e}. Nova tentativa em {settings.EMAIL_CHECK_INTERVAL}s")
+                sessao.invalidar()
+                sessao.parar.wait(settings.EMAIL_CHECK_INTERVAL)
+    finally:
+        sessao.fechar()
+
+
+def monitorar_emails(ao_salvar=None, parar: Optional[threading.Event] = None):
+    """
+    Monitora todas as fontes de e-mail configuradas, uma thread por fonte.
+
+    Uma fonte lenta ou com falha não atrasa as demais. As conexões abertas
+    ao mesmo tempo são limitadas a IMAP_MAX_CONEXOES; se houver mais fontes
+    que isso, cada fonte conecta apenas durante a verificação, por polling.
+    ao_salvar é repassado a verificar_emails e pode ser chamado de várias
+    threads ao mesmo tempo.
+    """
     # Criar pasta para anexos
     if not os.path.exists(settings.PASTA_ANEXOS):
         os.makedirs(settings.PASTA_ANEXOS)
 
-    while True:
-        print(f"\nVerificando e-mails com assunto 'Boleto' em: {datetime.now().strftime('%H:%M:%S')}")
-        mail = conectar_imap()
-        
-        # Buscar e-mails NÃO LIDOS com assunto "Boleto" (case-insensitive)
-        status, mensagens = mail.search(None, '(UNSEEN SUBJECT "Boleto")')
-        
-        if status == "OK":
-            ids = mensagens[0].split()
-            for id_email in ids:
-                status, dados = mail.fetch(id_email, "(RFC822)")
-                if status == "OK":
-                    mensagem = email.message_from_bytes(dados[0][1])
-                    processar_email(mensagem)
-                    # Marcar como lido (opcional)
-                    mail.store(id_email, "+FLAGS", "\\Seen")
-        
-        mail.close()
-        mail.logout()
-        sleep_time = settings.EMAIL_CHECK_INTERVAL
-        print(f"Esperando {sleep_time} minutos para verificar novamente...")
-        time.sleep(sleep_time)  # Espera por XX minutos
\ No newline at end of file
+    fontes = carregar_fontes()
+    orcamento = OrcamentoConexoes(settings.IMAP_MAX_CONEXOES)
+    manter_conexao = len(fontes) <= settings.IMAP_MAX_CONEXOES
+    if not manter_conexao:
+        print(
+            f"[IMAP] {len(fontes)} fontes para {settings.IMAP_MAX_CONEXOES} conexões: "
+            "cada fonte conecta apenas durante a verificação"
+        )
+    parar = parar or threading.Event()
+    threads = [
+        threading.Thread(
+            target=monitorar_fonte,
+            args=(fonte, ao_salvar, orcamento, manter_conexao, parar),
+            name=f"imap-{fonte.nome}",
+            daemon=True,
+        )
+        for fonte in fontes
+    ]
+    for thread in threads:
+        thread.start()
+    print(f"[IMAP] Monitorando {len(fontes)} fonte(s): {', '.join(f.nome for f in fontes)}")
+    try:
+        for thread in threads:
+            thread.join()
+    finally:
+        parar.set()
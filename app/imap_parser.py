@@ -0,0 +1,193 @@
+from typing import Any, Dict, List, Optional, Union
+
+Segmento = Union[bytes, tuple]
+
+
+# Marcadores de abertura e fechamento de listas
+_ABRE = object()
+_FECHA = object()
+
+
+class _Literal(bytes):
+    """Conteúdo de um literal {n}, devolvido sem interpretação."""
+
+
+def _tokenizar(segmentos: List[Segmento]) -> List[Any]:
+    tokens: List[Any] = []
+    for segmento in segmentos:
+        if isinstance(segmento, tuple):
+            prefixo, literal = segmento
+            # Remove o marcador {n} do final do prefixo
+            prefixo = prefixo[: prefixo.rindex(b"{")]
+            tokens.extend(_tokenizar_linha(prefixo))
+            tokens.append(_Literal(literal))
+        else:
+            tokens.extend(_tokenizar_linha(segmento))
+    return tokens
+
+
+def _tokenizar_linha(linha: bytes) -> List[Any]:
+    tokens: List[Any] = []
+    i = 0
+    while i < len(linha):
+        c = linha[i:i + 1]
+        if c in (b" ", b"\r", b"\n"):
+            i += 1
+        elif c in (b"(", b")"):
+            tokens.append(_ABRE if c == b"(" else _FECHA)
+            i += 1
+        elif c == b'"':
+            valor = bytearray()
+            i += 1
+            while i < len(linha) and linha[i:i + 1] != b'"':
+                if linha[i:i + 1] == b"\\":
+                    i += 1
+                valor += linha[i:i + 1]
+                i += 1
+            tokens.append(bytes(valor).decode("utf-8", errors="replace"))
+            i += 1
+        else:
+            inicio = i
+            # Átomos como BODY[HEADER.FIELDS (SUBJECT)] podem conter espaços e
+            # parênteses dentro dos colchetes
+            profundidade = 0
+            while i < len(linha):
+                c = linha[i:i + 1]
+                if c == b"[":
+                    profundidade += 1
+                elif c == b"]":
+                    profundidade -= 1
+                elif profundidade == 0 and c in (b" ", b"(", b")", b"\r", b"\n"):
+                    break
+                i += 1
+            atomo = linha[inicio:i].decode("utf-8", errors="replace")
+            tokens.append(None if atomo.upper() == "NIL" else atomo)
+    return tokens
+
+
+def _aninhar(tokens: List[Any]) -> List[Any]:
+    raiz: List[Any] = []
+    pilha = [raiz]
+    for token in tokens:
+        if token is _ABRE:
+            nova: List[Any] = []
+            pilha[-1].append(nova)
+            pilha.append(nova)
+        elif token is _FECHA:
+            if len(pilha) > 1:
+                pilha.pop()
+        else:
+            pilha[-1].append(bytes(token) if isinstance(token, _Literal) else token)
+    return raiz
+
+
+def parse_fetch(dados: List[Segmento]) -> List[Dict[str, Any]]:
+    """
+    Converte a resposta de mail.uid("FETCH", ...) em uma lista de dicionários.
+
+    O imaplib devolve as linhas em bytes e os literais ({n}) como tuplas
+    (prefixo, conteúdo); os literais são mantidos como bytes.
+
+    Cada mensagem vira um dicionário com os itens pedidos, por exemplo
+    {"UID": "42", "BODYSTRUCTURE": [...], "BODY[2]": b"..."}.
+    """
+    mensagens = []
+    itens = _aninhar(_tokenizar([d for d in dados if d is not None]))
+    for item in itens:
+        if not isinstance(item, list):
+            continue  # número de sequência da mensagem
+        mensagem = {}
+        for i in range(0, len(item) - 1, 2):
+            chave = item[i]
+            if isinstance(chave, str):
+                # BODY.PEEK[n] é devolvido pelo servidor como BODY[n]
+                mensagem[chave.upper().replace("BODY.PEEK[", "BODY[")] = item[i + 1]
+        mensagens.append(mensagem)
+    return mensagens
+
+
+def _texto(valor: Any) -> Any:
+    """Decodifica valores recebidos como literal ({n}, ex.: nomes longos ou codificados)."""
+    if isinstance(valor, bytes):
+        return valor.decode("utf-8", errors="replace")
+    return valor
+
+
+def _parametros(lista: Optional[List]) -> Dict[str, str]:
+    if not isinstance(lista, list):
+        return {}
+    return {
+        str(_texto(lista[i])).lower(): _texto(lista[i + 1])
+        for i in range(0, len(lista) - 1, 2)
+        if isinstance(lista[i + 1], (str, bytes))
+    }
+
+
+def partes_pdf(estrutura: List, secao: str = "") -> List[Dict[str, Any]]:
+    """
+    Localiza as partes PDF de um BODYSTRUCTURE.
+
+    Args:
+        estrutura: BODYSTRUCTURE já interpretado por parse_fetch
+        secao: Número da seção da parte atual (uso interno na recursão)
+
+    Returns:
+        Lista de {"secao", "encoding", "nome", "tamanho"} de cada parte PDF
+    """
+    if estrutura and isinstance(estrutura[0], list):
+        # Multipart: as subpartes vêm primeiro, seguidas do subtipo
+        partes = []
+        numero = 1
+        for filho in estrutura:
+            if not isinstance(filho, list):
+                break
+            prefixo = f"{secao}.{numero}" if secao else str(numero)
+            partes.extend(partes_pdf(filho, prefixo))
+            numero += 1
+        return partes
+
+    if len(estrutura) < 7:
+        return []
+    tipo = f"{_texto(estrutura[0])}/{_texto(estrutura[1])}".lower()
+    parametros = _parametros(estrutura[2])
+
+    if tipo == "message/rfc822" and len(estrutura) > 8 and isinstance(estrutura[8], list):
+        # E-mail encaminhado ou anexado: o BODYSTRUCTURE da mensagem interna
+        # vem na posição 8. As subpartes de um multipart interno são N.1, N.2,
+        # ...; uma parte única interna é N.1
+        interna = estrutura[8]
+        numero = secao or "1"
+        if interna and isinstance(interna[0], list):
+            return partes_pdf(interna, numero)
+        return partes_pdf(interna, f"{numero}.1")
+
+    # Posição da disposição depende do tipo (text e message/rfc822 têm campos extras)
+    if tipo.startswith("text/"):
+        indice_disposicao = 9
+    elif tipo == "message/rfc822":
+        indice_disposicao = 11
+    else:
+        indice_disposicao = 8
+    disposicao = estrutura[indice_disposicao] if len(estrutura) > indice_disposicao else None
+    if isinstance(disposicao, list) and len(disposicao) > 1:
+        parametros = {**parametros, **_parametros(disposicao[1])}
+
+    nome = parametros.get("filename") or parametros.get("name")
+    eh_pdf = tipo == "application/pdf" or (
+        nome is not None
+        and nome.lower().endswith(".pdf")
+        and tipo in ("application/octet-stream", "application/x-pdf")
+    )
+    if not eh_pdf:
+        return []
+
+    try:
+        tamanho = int(estrutura[6])
+    except (TypeError, ValueError):
+        tamanho = None
+    return [{
+        "secao": secao or "1",
+        "encoding": (_texto(estrutura[5]) or "7bit").lower(),
+        "nome": nome,
+        "tamanho": tamanho,
+    }]
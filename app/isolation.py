@@ -0,0 +1,295 @@
+import collections
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from multiprocessing.connection import wait
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger("boleto_processor")
+
+# Motivos de interrupção de uma tarefa (gravados na quarentena)
+MOTIVO_TIMEOUT = "timeout"
+MOTIVO_MEMORIA = "memoria"
+MOTIVO_FALHA = "falha"
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # pragma: no cover - fora do Linux
+    _PAGE_SIZE = 4096
+
+
+class ExtractionAborted(Exception):
+    """Tarefa interrompida pelo supervisor: o processo que a executava foi encerrado."""
+
+    def __init__(self, motivo: str, detalhe: str):
+        super().__init__(detalhe)
+        self.motivo = motivo
+        self.detalhe = detalhe
+
+    def __reduce__(self):
+        return (ExtractionAborted, (self.motivo, self.detalhe))
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    """Memória residente de um processo, lida de /proc (None se indisponível)."""
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _private_bytes(pid: int) -> Optional[int]:
+    """
+    Memória residente exclusiva de um processo (USS), lida de
+    /proc/<pid>/smaps_rollup (None se indisponível).
+
+    Um processo criado por fork compartilha com o pai as páginas herdadas,
+    que entram na memória residente mas não na exclusiva: só o que o
+    processo aloca (ou modifica) conta.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "rb") as f:
+            kb = sum(
+                int(linha.split()[1])
+                for linha in f
+                if linha.startswith((b"Private_Clean:", b"Private_Dirty:"))
+            )
+    except (OSError, ValueError, IndexError):
+        return None
+    return kb * 1024
+
+
+def _worker_main(conn, initializer: Optional[Callable], initargs: Tuple) -> None:
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        task_id, fn, args, kwargs = task
+        try:
+            message = (task_id, True, fn(*args, **kwargs))
+        except BaseException as e:
+            message = (task_id, False, e)
+        try:
+            conn.send(message)
+        except Exception as e:
+            conn.send((task_id, False, RuntimeError(f"Resultado não serializável: {e}")))
+
+
+def _set_outcome(future: Future, ok: bool, value) -> None:
+    if ok:
+        future.set_result(value)
+    else:
+        future.set_exception(value)
+
+
+class _Worker:
+    def __init__(self, context, initializer: Optional[Callable], initargs: Tuple):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child, initializer, initargs), daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.task: Optional[Tuple[int, Future]] = None
+        self.started_at = 0.0
+        # Memória residente logo após o fork, descontada quando não há
+        # smaps_rollup para medir só a memória exclusiva do processo
+        self.baseline = _rss_bytes(self.process.pid) or 0
+
+    def memory_bytes(self) -> Optional[int]:
+        """Memória do processo que conta para o limite (None se indisponível)."""
+        uss = _private_bytes(self.process.pid)
+        if uss is not None:
+            return uss
+        rss = _rss_bytes(self.process.pid)
+        return None if rss is None else rss - self.baseline
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SupervisedProcessPool(Executor):
+    """
+    Pool de processos em que cada tarefa tem tempo e memória limitados.
+
+    Um processo executa uma tarefa por vez. Uma thread supervisora entrega
+    as tarefas, recebe os resultados e encerra (kill) o processo cuja tarefa
+    passar de `timeout` segundos ou cuja memória exclusiva passar de
+    `memory_limit` bytes (as páginas herdadas do pai não contam); o Future da tarefa termina com ExtractionAborted e
+    um processo novo toma o lugar do encerrado. Um processo que morre sozinho
+    (ex.: falha de segmentação) é tratado da mesma forma.
+
+    Diferente do ProcessPoolExecutor, a perda de um processo não quebra o
+    pool: as demais tarefas seguem normalmente.
+
+    Os Futures são concluídos por um executor de threads à parte, e não pela
+    thread supervisora: os callbacks de quem enviou a tarefa (gravar a
+    quarentena, o cache, liberar o scheduler) não atrasam a verificação dos
+    limites dos outros processos.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = (),
+        timeout: Optional[float] = None,
+        memory_limit: Optional[int] = None,
+        poll_interval: float = 0.1,
+    ):
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self.initargs = initargs
+        self.timeout = timeout or None
+        self.memory_limit = memory_limit or None
+        self.poll_interval = poll_interval
+        self._context = multiprocessing.get_context()
+        self._pending: Deque[Tuple[int, Future, Callable, Tuple, Dict]] = collections.deque()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._shutdown = False
+        self._workers = []
+        self._wake_r, self._wake_w = self._context.Pipe(duplex=False)
+        self._resolver = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="extraction-results"
+        )
+        self._thread = threading.Thread(target=self._supervise, name="extraction-supervisor", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Pool encerrado")
+            self._pending.append((next(self._ids), future, fn, args, kwargs))
+        self._wake()
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while self._pending:
+                    self._pending.popleft()[1].cancel()
+        self._wake()
+        if wait:
+            self._thread.join()
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send_bytes(b"")
+        except OSError:
+            pass
+
+    def _dispatch(self) -> None:
+        for i, worker in enumerate(self._workers):
+            if worker.task is None and not worker.process.is_alive():
+                self._workers[i] = _Worker(self._context, self.initializer, self.initargs)
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                idle = next((w for w in self._workers if w.task is None), None)
+                if idle is None and len(self._workers) < self.max_workers:
+                    idle = _Worker(self._context, self.initializer, self.initargs)
+                    self._workers.append(idle)
+                if idle is None:
+                    return
+                task_id, future, fn, args, kwargs = self._pending.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                idle.conn.send((task_id, fn, args, kwargs))
+            except Exception as e:
+                self._resolve(future, False, e)
+                continue
+            idle.task = (task_id, future)
+            idle.started_at = time.monotonic()
+
+    def _abort(self, worker: "_Worker", motivo: str, detalhe: str) -> None:
+        """Encerra o processo do worker e falha a tarefa que ele executava."""
+        worker.kill()
+        logger.warning(f"Processo de extração {worker.process.pid} encerrado: {detalhe}")
+        if worker.task is not None:
+            self._resolve(worker.task[1], False, ExtractionAborted(motivo, detalhe))
+        self._workers[self._workers.index(worker)] = _Worker(
+            self._context, self.initializer, self.initargs
+        )
+
+    def _receive(self, worker: "_Worker") -> None:
+        try:
+            task_id, ok, value = worker.conn.recv()
+        except (EOFError, OSError):
+            worker.process.join(1)
+            self._abort(
+                worker, MOTIVO_FALHA,
+                f"Processo terminou inesperadamente (código {worker.process.exitcode})",
+            )
+            return
+        _, future = worker.task
+        worker.task = None
+        self._resolve(future, ok, value)
+
+    def _resolve(self, future: Future, ok: bool, value) -> None:
+        """Conclui o Future fora da thread supervisora (os callbacks rodam lá)."""
+        self._resolver.submit(_set_outcome, future, ok, value)
+
+    def _check_limits(self) -> None:
+        agora = time.monotonic()
+        for worker in list(self._workers):
+            if worker.task is None:
+                continue
+            if self.timeout and agora - worker.started_at > self.timeout:
+                self._abort(worker, MOTIVO_TIMEOUT, f"Tempo limite de {self.timeout:g}s excedido")
+                continue
+            if self.memory_limit:
+                usado = worker.memory_bytes()
+                if usado is not None and usado > self.memory_limit:
+                    self._abort(
+                        worker, MOTIVO_MEMORIA,
+                        f"Limite de memória de {self.memory_limit // 2**20} MiB excedido "
+                        f"({usado // 2**20} MiB)",
+                    )
+
+    def _supervise(self) -> None:
+        while True:
+            self._dispatch()
+            busy = [w for w in self._workers if w.task is not None]
+            with self._lock:
+                if self._shutdown and not self._pending and not busy:
+                    break
+            ready = wait([w.conn for w in busy] + [self._wake_r], timeout=self.poll_interval)
+            for conn in ready:
+                if conn is self._wake_r:
+                    while self._wake_r.poll():
+                        self._wake_r.recv_bytes()
+                    continue
+                worker = next(w for w in busy if w.conn is conn)
+                self._receive(worker)
+            self._check_limits()
+
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.process.join(5)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.conn.close()
+        self._workers = []
+        self._resolver.shutdown(wait=True)
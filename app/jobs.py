@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("boleto_processor")
+
+
+class Job:
+    """Tarefa de extração executada em segundo plano."""
+
+    def __init__(self, arquivo: str):
+        self.id = uuid.uuid4().hex
+        self.arquivo = arquivo
+        self.status = "pending"
+        self.result: Optional[Any] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self.future: Optional[Future] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "arquivo": self.arquivo,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class JobManager:
+    """
+    Acompanha tarefas em andamento (Futures) e guarda seu estado.
+
+    Nenhuma thread fica esperando: o job é concluído pelo callback do
+    Future, na thread que o completou. Apenas os `max_jobs` jobs mais
+    recentes são mantidos para consulta.
+    """
+
+    def __init__(self, max_jobs: int = 10000):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, arquivo: str, future: Future, fn: Optional[Callable] = None) -> Job:
+        """
+        Cria um job que termina junto com `future` e o retorna imediatamente.
+
+        O resultado do Future (passado por fn, se informada) é guardado em
+        job.result; uma exceção do Future ou de fn marca o job como falho,
+        com a mensagem em job.error.
+        """
+        job = Job(arquivo)
+        job.status = "running"
+        job.future = Future()
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        future.add_done_callback(lambda done: self._finish(job, done, fn))
+        return job
+
+    def _finish(self, job: Job, done: Future, fn: Optional[Callable]) -> None:
+        try:
+            result = done.result()
+            job.result = fn(result) if fn is not None else result
+            job.status = "done"
+        except BaseException as e:
+            logger.error(f"Erro no job {job.id} ({job.arquivo}): {str(e)}")
+            job.error = str(e) or type(e).__name__
+            job.status = "failed"
+        finally:
+            job.finished_at = datetime.now()
+            job.future.set_result(job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: Optional[float] = None) -> Job:
+        """Aguarda o job terminar, sem bloquear o event loop, por até timeout segundos."""
+        if not job.finished and job.future is not None:
+            await asyncio.wait({asyncio.wrap_future(job.future)}, timeout=timeout)
+        return job
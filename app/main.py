@@ -1,44 +1,369 @@
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import JSONResponse
+import time
+
+# Início do import da API, para medir o tempo até ela ficar pronta
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import List, Optional
+import asyncio
+import json
+import logging
 import os
 import shutil
+from contextlib import asynccontextmanager
+from app.anexos import AnexoTemporario
 from app.processor import BoletoProcessor
 from app.config import Config
+from app.export import EXPORT_FORMATS, export
+from app.jobs import JobManager
+from app.metrics import CONTENT_TYPE, FIRST_REQUEST_SECONDS, REGISTRY, STARTUP_SECONDS
+from app.query import parse_filtro_data, parse_filtro_valor
+from app.scheduler import INTERACTIVE, QueueFull
 
-app = FastAPI(title="BAS - API")
 config = Config()
 processor = BoletoProcessor(config)
+jobs = JobManager(max_jobs=config.max_jobs)
+logger = logging.getLogger("boleto_processor")
+
+# Rotas cuja primeira requisição tem a latência registrada
+_ROTAS_EXTRACAO = ("/upload/", "/upload/lote/", "/reprocessar/", "/processar-todos/")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Aquece os workers antes de aceitar requisições: a primeira extração
+    # não paga a inicialização do pdfminer
+    if config.warmup:
+        try:
+            await run_in_threadpool(processor.warm_up)
+        except Exception as e:
+            logger.error(f"Falha ao aquecer os workers de extração: {str(e)}")
+    pronta = time.perf_counter() - _import_started
+    STARTUP_SECONDS.set(pronta, "ready")
+    logger.info(f"API pronta em {pronta:.2f}s")
+    yield
+    # Encerra os workers de extração junto com a API
+    processor.shutdown()
+
+
+class _FirstRequestTimer:
+    """Middleware ASGI que registra a latência da primeira requisição a cada rota."""
+
+    def __init__(self, app, paths):
+        self.app = app
+        self.pending = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path")
+        if scope["type"] != "http" or path not in self.pending:
+            return await self.app(scope, receive, send)
+        self.pending.discard(path)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            duracao = time.perf_counter() - inicio
+            FIRST_REQUEST_SECONDS.set(duracao, path)
+            logger.info(f"Primeira requisição a {path}: {duracao * 1000:.0f} ms")
+
+
+app = FastAPI(title="BAS - API", lifespan=lifespan)
+app.add_middleware(_FirstRequestTimer, paths=_ROTAS_EXTRACAO)
+
+def _save_upload_by_content(file: UploadFile) -> str:
+    """
+    Grava o upload em <anexos>/<ab>/<sha256>.pdf e retorna o caminho.
+
+    O nome enviado pelo cliente não entra no caminho (só a extensão), de
+    modo que nomes com "../", absolutos ou repetidos não saem da pasta de
+    anexos nem sobrescrevem outro arquivo.
+    """
+    anexo = AnexoTemporario(config.anexos_dir, file.filename)
+    try:
+        shutil.copyfileobj(file.file, anexo)
+        anexo.concluir()
+    except BaseException:
+        anexo.descartar()
+        raise
+    return anexo.caminho
+
+
+def _upload_result(data):
+    if not data:
+        raise ValueError("Falha ao extrair dados.")
+    return data
+
+
+def _queue_full(error: QueueFull) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"error": str(error), "retry_after": error.retry_after},
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
 
 @app.post("/upload/")
-async def upload_boleto(file: UploadFile = File(...)):
-    filename = file.filename
-    save_path = os.path.join(config.anexos_dir, filename)
+async def upload_boleto(
+    file: UploadFile = File(...), aguardar: bool = True, timeout: Optional[float] = None
+):
+    """
+    Recebe um boleto e agenda sua extração em segundo plano.
+
+    Com aguardar=false responde imediatamente (202) com o job_id, que pode ser
+    consultado em /jobs/{job_id}. Caso contrário aguarda o resultado por até
+    timeout segundos sem bloquear o event loop. Com a fila de extração
+    cheia responde 429, com o cabeçalho Retry-After.
+
+    O arquivo é gravado pelo hash do conteúdo, como em /upload/lote/.
+    """
+    # Grava o arquivo em uma thread, sem bloquear o event loop
+    save_path = await run_in_threadpool(_save_upload_by_content, file)
+
+    # Enfileira já aqui, com prioridade interativa, para recusar com 429
+    # antes de criar o job
+    try:
+        future = await run_in_threadpool(processor.submit_reprocess, save_path)
+    except QueueFull as e:
+        return _queue_full(e)
+    job = jobs.submit(save_path, future, _upload_result)
+    if not aguardar:
+        return JSONResponse(status_code=202, content=job.to_dict())
+
+    await jobs.wait(job, timeout)
+    if job.status == "done":
+        return job.result
+    if job.status == "failed":
+        return JSONResponse(status_code=400, content={"error": job.error})
+    return JSONResponse(status_code=202, content=job.to_dict())
+
 
-    with open(save_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+@app.post("/upload/lote/")
+async def upload_lote(files: List[UploadFile] = File(...)):
+    """
+    Recebe vários boletos em uma única requisição e extrai em paralelo.
 
-    data = processor.reprocess_specific_file(save_path)
-    if data:
-        return data
-    return JSONResponse(status_code=400, content={"error": "Falha ao extrair dados."})
+    Cada arquivo é gravado pelo hash do conteúdo (<anexos>/<ab>/<sha256>.pdf),
+    de modo que arquivos com o mesmo nome no lote não se sobrescrevem; o
+    mesmo conteúdo enviado mais de uma vez é extraído uma só vez.
+
+    A resposta é NDJSON: uma linha por arquivo, com "nome_original", enviada
+    assim que a extração daquele arquivo termina. Os arquivos entram na fila
+    de extração aos poucos, conforme há espaço, em vez de serem recusados
+    com a fila cheia. Erros de um arquivo são reportados na própria linha
+    ({"arquivo": ..., "nome_original": ..., "error": ...}) sem interromper o lote.
+    """
+    # Caminho gravado -> nomes originais dos arquivos com aquele conteúdo
+    nomes = {}
+    errors = []
+    # Os arquivos são gravados antes de iniciar a resposta, enquanto o upload
+    # ainda está aberto
+    for file in files:
+        try:
+            save_path = await run_in_threadpool(_save_upload_by_content, file)
+            nomes.setdefault(save_path, []).append(file.filename)
+        except Exception as e:
+            errors.append({"arquivo": None, "nome_original": file.filename, "error": str(e)})
+
+    def linhas(save_path, future=None, error=None):
+        if error is None and future.exception() is not None:
+            error = str(future.exception())
+        elif error is None and not future.result():
+            error = "Falha ao extrair dados."
+        for nome in nomes[save_path]:
+            if error is None:
+                line = {**future.result(), "nome_original": nome}
+            else:
+                line = {"arquivo": save_path, "nome_original": nome, "error": error}
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+
+    async def resultados():
+        for error in errors:
+            yield json.dumps(error, ensure_ascii=False) + "\n"
+        pending = {}
+        for save_path in nomes:
+            # block=True: com a fila interativa cheia, aguarda espaço
+            try:
+                future = await run_in_threadpool(processor.submit_file, save_path, INTERACTIVE, True)
+            except Exception as e:
+                for line in linhas(save_path, error=str(e)):
+                    yield line
+                continue
+            pending[asyncio.wrap_future(future)] = save_path
+            # Envia o que já terminou enquanto os demais entram na fila
+            for done in [f for f in pending if f.done()]:
+                for line in linhas(pending.pop(done), done):
+                    yield line
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                for line in linhas(pending.pop(future), future):
+                    yield line
+
+    return StreamingResponse(resultados(), media_type="application/x-ndjson")
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, timeout: float = 0):
+    """Consulta um job de extração, aguardando por até timeout segundos."""
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job não encontrado."})
+    if timeout > 0:
+        await jobs.wait(job, timeout)
+    return job.to_dict()
 
 @app.get("/processar-todos/")
-def processar_todos():
+def processar_todos(stream: Optional[str] = None):
+    """
+    Processa todos os boletos pendentes da pasta de anexos.
+
+    Com stream=ndjson ou stream=sse, envia cada boleto assim que é processado
+    (na ordem de conclusão) em vez de aguardar a pasta inteira.
+    """
+    if stream == "ndjson":
+        lines = (
+            json.dumps(result, ensure_ascii=False) + "\n"
+            for result in processor.iter_process_all()
+        )
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    if stream == "sse":
+        events = (
+            f"data: {json.dumps(result, ensure_ascii=False)}\n\n"
+            for result in processor.iter_process_all()
+        )
+        return StreamingResponse(events, media_type="text/event-stream")
     return processor.process_all_boletos()
 
+@app.get("/boletos/")
+def listar_boletos(
+    request: Request,
+    vencimento_de: Optional[str] = None,
+    vencimento_ate: Optional[str] = None,
+    valor_min: Optional[str] = None,
+    valor_max: Optional[str] = None,
+    beneficiario: Optional[str] = None,
+    pagador: Optional[str] = None,
+    codigo_barras: Optional[str] = None,
+    cursor: int = 0,
+    limite: int = 100,
+):
+    """
+    Consulta paginada dos boletos extraídos, servida pelos índices em memória.
+
+    Filtros: faixa de vencimento (aaaa-mm-dd ou dd/mm/aaaa), faixa de valor
+    ("1234.56" ou "1.234,56"), beneficiário e pagador exatos (sem diferença
+    de maiúsculas) e código de barras (só os dígitos são comparados). A
+    próxima página é pedida com cursor=next_cursor. A resposta traz um ETag;
+    com If-None-Match igual, responde 304 sem corpo.
+
+    Cada boleto tem os campos de BoletoData.to_dict(), incluindo banco (código
+    de 3 dígitos lido da linha digitável, ou null). Um vencimento que não é
+    uma data válida vem como o texto do PDF e não entra no filtro por faixa.
+    """
+    try:
+        filtros = {
+            "vencimento_de": parse_filtro_data(vencimento_de),
+            "vencimento_ate": parse_filtro_data(vencimento_ate),
+            "valor_min": parse_filtro_valor(valor_min),
+            "valor_max": parse_filtro_valor(valor_max),
+            "beneficiario": beneficiario,
+            "pagador": pagador,
+            "codigo_barras": codigo_barras,
+        }
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": f"Filtro inválido: {e}"})
+
+    index = processor.index
+    index.refresh(force=False)
+    etag = index.etag({**filtros, "cursor": cursor, "limite": limite})
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers={"ETag": etag})
+    result = index.query(**filtros, cursor=cursor, limit=limite)
+    return JSONResponse(content=result, headers={"ETag": etag})
+
+@app.get("/exportar/")
+def exportar(formato: str = "csv", lote: int = 5000):
+    """
+    Exporta todos os boletos do repositório em lotes (formato=csv ou colunar).
+
+    A resposta é gerada aos poucos, lote a lote, sem montar a lista completa.
+    """
+    if formato not in EXPORT_FORMATS:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"Formato inválido. Use: {', '.join(EXPORT_FORMATS)}"},
+        )
+    headers = {}
+    if formato == "csv":
+        headers["Content-Disposition"] = 'attachment; filename="boletos.csv"'
+    return StreamingResponse(
+        export(processor.store, formato, max(lote, 1)),
+        media_type=EXPORT_FORMATS[formato],
+        headers=headers,
+    )
+
 @app.get("/reprocessar/")
 def reprocessar(arquivo: str):
     path = os.path.join(config.anexos_dir, arquivo)
-    result = processor.reprocess_specific_file(path)
+    try:
+        result = processor.reprocess_specific_file(path)
+    except QueueFull as e:
+        return _queue_full(e)
     if result:
         return result
     return JSONResponse(status_code=404, content={"error": "Arquivo não encontrado."})
 
+@app.post("/reextrair-todos/")
+def reextrair_todos(aplicar: bool = True):
+    """
+    Reaplica os padrões atuais ao texto guardado de todos os PDFs, sem reabri-los.
+
+    Retorna os boletos cujo resultado mudou; com aplicar=false apenas informa
+    o que mudaria, sem gravar. É um POST: grava resultados, e não deve ser
+    disparado por navegadores, crawlers ou pré-carregamento de links.
+    """
+    try:
+        return processor.reextract_all(aplicar=aplicar)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+@app.get("/quarentena/")
+def quarentena():
+    """Arquivos cuja extração foi interrompida (tempo, memória ou falha do processo)."""
+    return processor.store.quarantined()
+
+@app.post("/quarentena/liberar/")
+def liberar_quarentena(arquivo: str):
+    """
+    Tira um arquivo da quarentena; ele volta a ser extraído em /processar-todos/.
+
+    É um POST: altera o estado do repositório.
+    """
+    if processor.store.release(arquivo):
+        return {"arquivo": arquivo, "liberado": True}
+    return JSONResponse(status_code=404, content={"error": "Arquivo não está em quarentena."})
+
 @app.get("/debug-texto/")
 def debug_texto(arquivo: str):
     path = os.path.join(config.anexos_dir, arquivo)
     return {"texto": processor.debug_extract_text(path)}
 
+@app.get("/fila/")
+def fila():
+    """Fila de extração: tarefas por prioridade, em execução e tempo de espera."""
+    return processor.scheduler.stats()
+
+@app.get("/metrics")
+def metrics():
+    """Métricas de extração no formato texto do Prometheus."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/")
 async def root():   
     return {"texto ": "API de processamento de boletos."}
+
+
+STARTUP_SECONDS.set(time.perf_counter() - _import_started, "import")
@@ -0,0 +1,341 @@
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Content-Type do formato texto do Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Limites (em segundos) dos histogramas de latência
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, registry: "Registry", name: str, documentation: str, labelnames: Iterable[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = registry._lock
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Tuple) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} espera os rótulos {self.labelnames}")
+        return tuple(str(label) for label in labels)
+
+    def _labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pares = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            pares.append(extra)
+        return "{" + ",".join(pares) + "}" if pares else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(self._samples(items))
+        return lines
+
+    def _samples(self, items) -> List[str]:
+        return [f"{self.name}{self._labels(k)} {_format_value(v)}" for k, v in items]
+
+    def drain(self) -> Dict:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: Dict) -> None:
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+
+class Counter(_Metric):
+    """Contador monotônico, opcionalmente com rótulos."""
+
+    type_name = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Valor instantâneo; pode ser lido de uma função no momento da coleta."""
+
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, *labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set_function(self, function: Callable[[], float], *labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def render(self) -> List[str]:
+        with self._lock:
+            functions = list(self._functions.items())
+        for key, function in functions:
+            try:
+                value = function()
+            except Exception:
+                continue
+            with self._lock:
+                self._values[key] = value
+        return super().render()
+
+
+class Histogram(_Metric):
+    """Histograma cumulativo no formato do Prometheus (_bucket, _sum e _count)."""
+
+    type_name = "histogram"
+
+    def __init__(self, *args, buckets: Iterable[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, *labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self, items) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+    def merge(self, values: Dict) -> None:
+        with self._lock:
+            for key, (counts, total, count) in values.items():
+                state = self._values.get(key)
+                if state is None:
+                    state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+                state[0] = [a + b for a, b in zip(state[0], counts)]
+                state[1] += total
+                state[2] += count
+
+
+class Registry:
+    """
+    Conjunto de métricas do processo, exportado no formato texto do Prometheus.
+
+    Os workers do pool de processos registram nas suas próprias cópias do
+    registro; drain() retira o que foi acumulado desde a última chamada e
+    merge() soma esse delta no registro do processo principal.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, cls, name: str, documentation: str, labelnames=(), **kwargs):
+        metric = cls(self, name, documentation, labelnames, **kwargs)
+        self._metrics[name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def drain(self) -> Dict[str, Dict]:
+        """Retira os contadores e histogramas acumulados (usado nos workers)."""
+        delta = {}
+        for name, metric in self._metrics.items():
+            if isinstance(metric, Gauge):
+                continue
+            values = metric.drain()
+            if values:
+                delta[name] = values
+        return delta
+
+    def merge(self, delta: Dict[str, Dict]) -> None:
+        for name, values in delta.items():
+            metric = self._metrics.get(name)
+            if metric is not None:
+                metric.merge(values)
+
+    def reset(self) -> None:
+        for metric in self._metrics.values():
+            metric.drain()
+
+
+REGISTRY = Registry()
+
+# Extração
+PDF_OPEN_SECONDS = REGISTRY.histogram(
+    "boleto_pdf_open_seconds", "Tempo para abrir o PDF e ler a árvore de páginas."
+)
+TEXT_EXTRACTION_SECONDS = REGISTRY.histogram(
+    "boleto_text_extraction_seconds", "Tempo de extract_text de todas as páginas."
+)
+TEXT_PAGES = REGISTRY.counter(
+    "boleto_text_pages_total",
+    "Páginas de PDF com texto extraído (read) ou dispensadas pela parada antecipada (skipped).",
+    ("result",),
+)
+FIELD_MATCHING_SECONDS = REGISTRY.histogram(
+    "boleto_field_matching_seconds",
+    "Tempo de busca dos campos no texto (regex e linha digitável).",
+    buckets=FAST_BUCKETS,
+)
+FIELD_RESOLVED = REGISTRY.counter(
+    "boleto_field_resolved_total",
+    "Campos resolvidos por nível de padrão (primary, alt, extra, health, "
+    "barcode, barcode_legacy, currency ou none).",
+    ("field", "tier"),
+)
+EXTRACTIONS = REGISTRY.counter(
+    "boleto_extractions_total",
+    "Extrações por resultado (ok, invalid, empty, error, cache, ou timeout, "
+    "memoria e falha quando o processo de extração é encerrado).",
+    ("result",),
+)
+EXTRACTION_PENDING = REGISTRY.gauge(
+    "boleto_extraction_pending", "Documentos enviados ao executor e ainda não concluídos."
+)
+CLAIMS = REGISTRY.counter(
+    "boleto_claims_total",
+    "Arquivos pendentes reservados por este processo (claimed) ou deixados de fora "
+    "(skipped: já gravados, em quarentena ou reservados por outro processo).",
+    ("result",),
+)
+PIPELINE_QUEUE_DEPTH = REGISTRY.gauge(
+    "boleto_pipeline_queue_depth", "Anexos aguardando na fila do pipeline de extração."
+)
+
+# Fila de extração (scheduler)
+SCHEDULER_QUEUE_DEPTH = REGISTRY.gauge(
+    "boleto_scheduler_queue_depth", "Tarefas aguardando na fila de extração, por prioridade.",
+    ("priority",),
+)
+SCHEDULER_WAIT_SECONDS = REGISTRY.histogram(
+    "boleto_scheduler_wait_seconds",
+    "Tempo de espera na fila de extração até a tarefa ir para um worker.",
+    ("priority",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+SCHEDULER_REJECTED = REGISTRY.counter(
+    "boleto_scheduler_rejected_total", "Tarefas recusadas com a fila cheia (HTTP 429).",
+    ("priority",),
+)
+
+# Inicialização
+STARTUP_SECONDS = REGISTRY.gauge(
+    "boleto_startup_seconds",
+    "Duração de cada etapa da inicialização do processo (import, warmup).",
+    ("phase",),
+)
+FIRST_REQUEST_SECONDS = REGISTRY.gauge(
+    "boleto_first_request_seconds", "Latência da primeira requisição a cada rota de extração.",
+    ("path",),
+)
+
+# IMAP
+IMAP_COMMAND_SECONDS = REGISTRY.histogram(
+    "boleto_imap_command_seconds", "Duração dos comandos IMAP.", ("command",)
+)
+IMAP_FAILURES = REGISTRY.counter(
+    "boleto_imap_failures_total", "Falhas de IMAP por tipo.", ("type",)
+)
+IMAP_SOURCE_LAG_SECONDS = REGISTRY.gauge(
+    "boleto_imap_source_lag_seconds",
+    "Segundos desde a última verificação completa de cada fonte de e-mail (0 em IDLE).",
+    ("fonte",),
+)
+IMAP_SOURCE_ERRORS = REGISTRY.counter(
+    "boleto_imap_source_errors_total", "Falhas de conexão ou verificação por fonte de e-mail.",
+    ("fonte",),
+)
+IMAP_MESSAGE_LAG_SECONDS = REGISTRY.histogram(
+    "boleto_imap_message_lag_seconds",
+    "Tempo entre a chegada da mensagem no servidor e seu processamento, por fonte.",
+    ("fonte",),
+    buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 900.0, 1800.0, 3600.0, 14400.0, 86400.0),
+)
+IMAP_CONNECTIONS = REGISTRY.gauge(
+    "boleto_imap_connections", "Conexões IMAP abertas, somando todas as fontes."
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: Registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port: int, addr: str = "0.0.0.0", registry: Optional[Registry] = None) -> ThreadingHTTPServer:
+    """Serve /metrics em uma thread própria (usado pelo worker, que não roda a API)."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry or REGISTRY})
+    server = ThreadingHTTPServer((addr, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,83 @@
+import base64
+import binascii
+import quopri
+from typing import Iterator, Optional
+
+# Tamanho dos pedaços entregues aos decodificadores
+TAMANHO_PEDACO = 64 * 1024
+
+
+class DecodificadorBase64:
+    """Decodifica base64 recebido em pedaços de qualquer tamanho."""
+
+    def __init__(self):
+        self._resto = b""
+
+    def feed(self, dados: bytes) -> bytes:
+        dados = self._resto + b"".join(bytes(dados).split())
+        corte = len(dados) - len(dados) % 4
+        self._resto = dados[corte:]
+        return base64.b64decode(dados[:corte])
+
+    def finish(self) -> bytes:
+        resto, self._resto = self._resto, b""
+        if not resto.rstrip(b"="):
+            return b""
+        try:
+            return base64.b64decode(resto + b"=" * (-len(resto) % 4))
+        except binascii.Error:
+            return b""
+
+
+class DecodificadorQuotedPrintable:
+    """Decodifica quoted-printable linha a linha (as quebras suaves ficam na mesma linha)."""
+
+    def __init__(self):
+        self._resto = b""
+
+    def feed(self, dados: bytes) -> bytes:
+        dados = self._resto + bytes(dados)
+        corte = dados.rfind(b"\n") + 1
+        self._resto = dados[corte:]
+        return quopri.decodestring(dados[:corte]) if corte else b""
+
+    def finish(self) -> bytes:
+        resto, self._resto = self._resto, b""
+        return quopri.decodestring(resto) if resto else b""
+
+
+class DecodificadorIdentidade:
+    """7bit, 8bit e binary: o conteúdo já está decodificado."""
+
+    def feed(self, dados: bytes) -> bytes:
+        return bytes(dados)
+
+    def finish(self) -> bytes:
+        return b""
+
+
+def decodificador(encoding: Optional[str]):
+    """Cria o decodificador incremental do Content-Transfer-Encoding informado."""
+    encoding = (encoding or "7bit").strip().lower()
+    if encoding == "base64":
+        return DecodificadorBase64()
+    if encoding == "quoted-printable":
+        return DecodificadorQuotedPrintable()
+    return DecodificadorIdentidade()
+
+
+def decodificar_em_pedacos(conteudo: bytes, encoding: Optional[str]) -> Iterator[bytes]:
+    """
+    Decodifica um conteúdo já em memória em pedaços de TAMANHO_PEDACO.
+
+    Evita manter a versão codificada e a decodificada inteiras ao mesmo tempo.
+    """
+    decod = decodificador(encoding)
+    visao = memoryview(conteudo)
+    for inicio in range(0, len(visao), TAMANHO_PEDACO):
+        pedaco = decod.feed(visao[inicio:inicio + TAMANHO_PEDACO])
+        if pedaco:
+            yield pedaco
+    final = decod.finish()
+    if final:
+        yield final
@@ -1,50 +1,141 @@
-from dataclasses import dataclass
-from typing import Optional
-from datetime import datetime
+from datetime import date
+from typing import Dict, Optional, Tuple, Union
 import re
 
-@dataclass
+# Valor que aparece junto com o nome do pagador em alguns layouts
+_VALOR_NO_PAGADOR = re.compile(r'\s+\d{1,3}(?:\.\d{3})*,\d{2}$')
+
+
+def parse_valor(valor: Optional[str]) -> Optional[int]:
+    """
+    Converte um valor no formato brasileiro ("1.234,56" ou "1234,56") em centavos.
+
+    Os dígitos de valor do código de barras ("0000123456") já estão em centavos.
+    """
+    if not valor:
+        return None
+    digitos = valor.replace(".", "").replace(",", "")
+    return int(digitos) if digitos.isdigit() else None
+
+
+def parse_data(data: Optional[str]) -> Optional[date]:
+    """Converte uma data dd/mm/aaaa, sem passar por strptime."""
+    if not data or len(data) != 10:
+        return None
+    try:
+        return date(int(data[6:10]), int(data[3:5]), int(data[0:2]))
+    except ValueError:
+        return None
+
+
+def _data_ou_texto(data: Optional[str]) -> Union[date, str, None]:
+    """Data dd/mm/aaaa convertida; texto que não é uma data válida fica como veio."""
+    return parse_data(data) or data
+
+
+def _formatar_data(data: Union[date, str, None]) -> Optional[str]:
+    return data.isoformat() if isinstance(data, date) else data
+
+
+def formatar_codigo_barras(digitos: Optional[str]) -> Optional[str]:
+    """Linha digitável de 47 dígitos no formato da API: "34191.7900101043.5100...". """
+    if not digitos or len(digitos) != 47:
+        return digitos
+    return f"{digitos[:5]}.{digitos[5:15]}.{digitos[15:26]}.{digitos[26:]}"
+
+
 class BoletoData:
-    """Classe para armazenar os dados extraídos de um boleto."""
-    arquivo: str
-    codigo_barras: Optional[str] = None
-    vencimento: Optional[str] = None
-    valor: Optional[str] = None
-    beneficiario: Optional[str] = None
-    pagador: Optional[str] = None
-    data_processamento: Optional[str] = None
+    """
+    Dados extraídos de um boleto, em uma representação compacta e tipada.
+
+    - codigo_barras: linha digitável só com os 47 dígitos
+    - valor: inteiro em centavos
+    - vencimento e data_processamento: date; o texto encontrado no PDF fica
+      como veio quando não é uma data válida (ex.: "31/02/2024")
+    - banco: código do banco (3 dígitos), lido da linha digitável
+
+    to_dict() devolve o formato usado pela API e pelo repositório
+    (valor "1234.56", datas ISO, linha digitável com pontos, banco "341"
+    ou None quando a linha digitável não foi validada).
+    """
+
+    FIELDS: Tuple[str, ...] = (
+        "arquivo", "codigo_barras", "vencimento", "valor", "beneficiario",
+        "pagador", "data_processamento", "banco",
+    )
+    __slots__ = FIELDS
+
+    def __init__(
+        self,
+        arquivo: str,
+        codigo_barras: Optional[str] = None,
+        vencimento: Union[date, str, None] = None,
+        valor: Optional[int] = None,
+        beneficiario: Optional[str] = None,
+        pagador: Optional[str] = None,
+        data_processamento: Union[date, str, None] = None,
+        banco: Optional[str] = None,
+    ):
+        self.arquivo = arquivo
+        self.codigo_barras = codigo_barras
+        self.vencimento = vencimento
+        self.valor = valor
+        self.beneficiario = beneficiario
+        self.pagador = pagador
+        self.data_processamento = data_processamento
+        self.banco = banco
+
+    @classmethod
+    def from_text(cls, arquivo: str, campos: Dict[str, Optional[str]]) -> "BoletoData":
+        """
+        Cria o boleto a partir dos textos encontrados no PDF.
+
+        Args:
+            arquivo: Caminho do arquivo PDF
+            campos: Textos de cada campo, como extraídos pelas regex
+        """
+        beneficiario = campos.get("beneficiario")
+        pagador = campos.get("pagador")
+        codigo = campos.get("codigo_barras")
+        return cls(
+            arquivo=arquivo,
+            codigo_barras="".join(c for c in codigo if c.isdigit()) if codigo else None,
+            vencimento=_data_ou_texto(campos.get("vencimento")),
+            valor=parse_valor(campos.get("valor")),
+            beneficiario=beneficiario.upper().strip() if beneficiario else beneficiario,
+            # Remove o valor que aparece junto com o nome do pagador
+            pagador=_VALOR_NO_PAGADOR.sub("", pagador).upper().strip() if pagador else pagador,
+            data_processamento=_data_ou_texto(campos.get("data_processamento")),
+            banco=campos.get("banco"),
+        )
 
     def is_valid(self) -> bool:
         """Verifica se os dados mínimos do boleto foram extraídos."""
         return bool(self.codigo_barras or self.vencimento)  # Pelo menos um dos dois deve existir
-    
-    def format_data(self) -> None:
-        """Formata os dados extraídos."""
-        if self.valor and isinstance(self.valor, str):
-            # Converte o valor para float
-            self.valor = self.valor.replace(".", "").replace(",", ".")
-        
-        if self.beneficiario:
-            self.beneficiario = self.beneficiario.upper().strip()
-        
-        if self.pagador:
-            # Remove o valor que aparece junto com o nome do pagador
-            self.pagador = re.sub(r'\s+\d{1,3}(?:\.\d{3})*,\d{2}$', '', self.pagador).upper().strip()
-        
-        if self.codigo_barras:
-            self.codigo_barras = self.codigo_barras.replace(" ", "")
-        
-        # Converte datas para formato ISO
-        if self.vencimento:
-            try:
-                date_obj = datetime.strptime(self.vencimento, "%d/%m/%Y")
-                self.vencimento = date_obj.strftime("%Y-%m-%d")
-            except ValueError:
-                pass
-        
-        if self.data_processamento:
-            try:
-                date_obj = datetime.strptime(self.data_processamento, "%d/%m/%Y")
-                self.data_processamento = date_obj.strftime("%Y-%m-%d")
-            except ValueError:
-                pass
+
+    def to_row(self) -> tuple:
+        """Valores no formato da API, na ordem de FIELDS (usado no repositório e na exportação)."""
+        valor = self.valor
+        return (
+            self.arquivo,
+            formatar_codigo_barras(self.codigo_barras),
+            _formatar_data(self.vencimento),
+            f"{valor // 100}.{valor % 100:02d}" if valor is not None else None,
+            self.beneficiario,
+            self.pagador,
+            _formatar_data(self.data_processamento),
+            self.banco,
+        )
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        """Dicionário no formato retornado pela API."""
+        return dict(zip(self.FIELDS, self.to_row()))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, BoletoData):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.FIELDS)
+
+    def __repr__(self) -> str:
+        campos = ", ".join(f"{f}={getattr(self, f)!r}" for f in self.FIELDS)
+        return f"BoletoData({campos})"
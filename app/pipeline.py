@@ -0,0 +1,241 @@
+import collections
+import itertools
+import logging
+import os
+import queue
+import threading
+from typing import Optional, Set, Tuple
+
+from app.metrics import PIPELINE_QUEUE_DEPTH
+from app.processor import BoletoProcessor
+from app.scheduler import BULK, EMAIL, PRIORITIES
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # pragma: no cover - watchdog é opcional
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger("boleto_processor")
+
+
+class ExtractionPipeline:
+    """
+    Fila limitada de PDFs a extrair, consumida pelo BoletoProcessor.
+
+    Quem produz os arquivos (o worker de e-mail, o observador da pasta de
+    anexos) chama submit() assim que o arquivo é gravado; cada resultado é
+    salvo no repositório assim que fica pronto. Com a fila cheia, submit()
+    bloqueia, aplicando contrapressão ao produtor.
+
+    Os anexos recebidos (prioridade email) saem da fila antes do backlog
+    enfileirado na inicialização (prioridade bulk) e seguem com a mesma
+    prioridade para o scheduler de extração.
+
+    Um anexo gravado pelo worker de e-mail chega duas vezes: por ao_salvar e
+    pelo observador da pasta (o rename para o caminho final). submit()
+    ignora o caminho que está na fila, em extração ou entre os RECENTES
+    últimos concluídos.
+    """
+
+    # Caminhos concluídos lembrados para descartar avisos repetidos
+    RECENTES = 10000
+
+    def __init__(self, processor: BoletoProcessor, workers: Optional[int] = None):
+        self.processor = processor
+        # Itens (classe, ordem de chegada, caminho); caminho None encerra
+        self.queue: "queue.PriorityQueue[Tuple[int, int, Optional[str]]]" = queue.PriorityQueue(
+            maxsize=processor.config.pipeline_queue_size
+        )
+        self._seq = itertools.count()
+        self.workers = workers or processor.config.max_workers
+        self._threads = []
+        self._queued: Set[str] = set()
+        self._recentes: "collections.OrderedDict[str, None]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stopping = threading.Event()
+        PIPELINE_QUEUE_DEPTH.set_function(self.queue.qsize)
+
+    def start(self) -> None:
+        """Inicia as threads consumidoras."""
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._consume, name=f"pipeline-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Pipeline de extração iniciado com {self.workers} consumidores")
+
+    def stop(self) -> None:
+        """Para o observador e as consumidoras, após esvaziar a fila."""
+        self._stopping.set()
+        if self._watcher is not None:
+            self._watcher.stop()
+        for _ in self._threads:
+            # Depois de todos os arquivos, qualquer que seja a classe
+            self.queue.put((len(PRIORITIES), next(self._seq), None))
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, pdf_path: str, priority: str = EMAIL) -> bool:
+        """
+        Enfileira um PDF para extração na classe de prioridade `priority`.
+
+        Returns:
+            False se o arquivo já estava na fila, em extração ou acabou de ser concluído
+        """
+        with self._lock:
+            if pdf_path in self._queued or pdf_path in self._recentes:
+                return False
+            self._queued.add(pdf_path)
+        self.queue.put((PRIORITIES.index(priority), next(self._seq), pdf_path))
+        return True
+
+    def submit_pending(self) -> None:
+        """
+        Enfileira, em segundo plano, o backlog da pasta de anexos (prioridade bulk).
+
+        Listar a pasta e enfileirar tudo pode levar bastante tempo, e submit()
+        bloqueia com a fila cheia; a thread deixa quem chamou seguir (ex.: o
+        worker, que ainda inicia as métricas e o monitoramento de e-mail).
+        """
+        def run() -> None:
+            try:
+                pendentes = self.processor.pending_files()
+                for caminho in pendentes:
+                    if self._stopping.is_set():
+                        return
+                    self.submit(caminho, BULK)
+                logger.info(f"Backlog enfileirado: {len(pendentes)} arquivos")
+            except Exception as e:
+                logger.error(f"Erro ao enfileirar o backlog: {str(e)}")
+
+        threading.Thread(target=run, name="pipeline-backlog", daemon=True).start()
+
+    def _consume(self) -> None:
+        while True:
+            rank, _, pdf_path = self.queue.get()
+            if pdf_path is None:
+                self.queue.task_done()
+                return
+            try:
+                # A reserva deixa de fora arquivos já gravados, em quarentena
+                # ou sendo extraídos por outro processo (ex.: a API)
+                if self.processor.claim_files([pdf_path]):
+                    try:
+                        result = self.processor.submit_file(
+                            pdf_path, PRIORITIES[rank], block=True
+                        ).result()
+                    except Exception:
+                        self.processor.release_files([pdf_path])
+                        raise
+                    if result:
+                        self.processor.save_data([result])
+                    else:
+                        self.processor.release_files([pdf_path])
+            except Exception as e:
+                logger.error(f"Erro ao processar {pdf_path} no pipeline: {str(e)}")
+            finally:
+                with self._lock:
+                    self._queued.discard(pdf_path)
+                    self._recentes[pdf_path] = None
+                    if len(self._recentes) > self.RECENTES:
+                        self._recentes.popitem(last=False)
+                self.queue.task_done()
+
+    def watch(self, directory: str, interval: float = 2.0) -> None:
+        """
+        Observa a pasta e enfileira os PDFs gravados nela por outros meios.
+
+        Usa notificações do sistema de arquivos (watchdog) quando disponível;
+        caso contrário, consulta a pasta apenas quando seu mtime muda.
+        """
+        if Observer is not None:
+            self._watcher = _WatchdogWatcher(self, directory)
+        else:
+            self._watcher = _PollingWatcher(self, directory, interval)
+        self._watcher.start()
+        logger.info(f"Observando novos PDFs em '{directory}'")
+
+
+class _PdfEventHandler(FileSystemEventHandler):
+    def __init__(self, pipeline: ExtractionPipeline):
+        self.pipeline = pipeline
+
+    def _submit(self, path: str) -> None:
+        if path.lower().endswith(".pdf"):
+            self.pipeline.submit(path)
+
+    def on_closed(self, event) -> None:
+        # Arquivo fechado após escrita: o conteúdo já está completo
+        if not event.is_directory:
+            self._submit(event.src_path)
+
+    def on_moved(self, event) -> None:
+        # Gravações atômicas (arquivo temporário + rename)
+        if not event.is_directory:
+            self._submit(event.dest_path)
+
+
+class _WatchdogWatcher:
+    def __init__(self, pipeline: ExtractionPipeline, directory: str):
+        self.observer = Observer()
+        self.observer.schedule(_PdfEventHandler(pipeline), directory, recursive=True)
+
+    def start(self) -> None:
+        self.observer.start()
+
+    def stop(self) -> None:
+        self.observer.stop()
+        self.observer.join()
+
+
+class _PollingWatcher:
+    def __init__(self, pipeline: ExtractionPipeline, directory: str, interval: float):
+        self.pipeline = pipeline
+        self.directory = directory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pipeline-watch", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        # mtime e nomes já vistos de cada pasta (a raiz e as subpastas por
+        # hash): só as pastas cujo mtime mudou são relidas. A primeira leitura
+        # completa só registra o que já existe (o backlog é enfileirado à parte)
+        vistos = {}
+        enfileirar = False
+        while True:
+            try:
+                self._verificar(vistos, enfileirar)
+                enfileirar = True
+            except OSError as e:
+                logger.error(f"Erro ao observar '{self.directory}': {str(e)}")
+            if self._stop.wait(self.interval):
+                return
+
+    def _verificar(self, vistos, enfileirar: bool) -> None:
+        pastas = [self.directory] + [
+            entry.path for entry in os.scandir(self.directory) if entry.is_dir()
+        ]
+        for pasta in pastas:
+            mtime = os.stat(pasta).st_mtime_ns
+            anterior = vistos.get(pasta)
+            if anterior is not None and anterior[0] == mtime:
+                continue
+            nomes = set(os.listdir(pasta))
+            if enfileirar:
+                conhecidos = anterior[1] if anterior is not None else set()
+                for name in nomes - conhecidos:
+                    if name.lower().endswith(".pdf"):
+                        self.pipeline.submit(os.path.join(pasta, name))
+            vistos[pasta] = (mtime, nomes)
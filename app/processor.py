@@ -1,13 +1,48 @@
 import os
+import hashlib
+import itertools
 import json
-import pdfplumber
-from app.models import BoletoData
+import socket
+import uuid
+from app.anexos import VarreduraPdfs
+from app.models import BoletoData, parse_data, parse_valor
 from app.config import Config
+from app.cache import ResultCache, file_digest
+from app.storage import ResultStore, create_store
+from app.query import BoletoIndex
+from app.scanner import FieldScanner
+from app.barcode import decode_linha_digitavel
+from app.isolation import ExtractionAborted, SupervisedProcessPool
+from app.scheduler import BULK, INTERACTIVE, ExtractionScheduler, parse_weights
+from app.text_backends import TextDocument, create_text_backend
+from app.text_store import TextStore
+from app.warmup import write_warmup_pdf
+from app.metrics import (
+    CLAIMS,
+    EXTRACTION_PENDING,
+    EXTRACTIONS,
+    FIELD_MATCHING_SECONDS,
+    FIELD_RESOLVED,
+    PDF_OPEN_SECONDS,
+    REGISTRY,
+    STARTUP_SECONDS,
+    TEXT_EXTRACTION_SECONDS,
+    TEXT_PAGES,
+)
 import re
 import logging
-from typing import Dict, List, Optional, Set
-from dataclasses import asdict
-from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import threading
+import time
+from contextlib import closing
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
 
 # Configuração de logging
 logging.basicConfig(
@@ -17,6 +52,53 @@ logging.basicConfig(
 )
 logger = logging.getLogger("boleto_processor")
 
+# Processador próprio de cada worker do pool de processos (criado uma única vez)
+_worker_processor: Optional["BoletoProcessor"] = None
+# Fila pela qual o worker devolve ao processo principal as métricas que coletou
+_worker_metrics: Optional[multiprocessing.Queue] = None
+
+
+def _init_worker(config: Config, metrics_queue: Optional[multiprocessing.Queue] = None) -> None:
+    """Inicializa o processador de um worker do pool de processos."""
+    global _worker_processor, _worker_metrics
+    _worker_processor = BoletoProcessor(config)
+    _worker_metrics = metrics_queue
+    # Descarta as métricas herdadas do processo principal no fork
+    REGISTRY.reset()
+
+
+def _drain_worker_metrics() -> None:
+    if _worker_metrics is not None:
+        delta = REGISTRY.drain()
+        if delta:
+            _worker_metrics.put(delta)
+
+
+def _reextract_worker(arquivos: List[str]) -> List[Tuple[str, str, Optional[Dict]]]:
+    """Reaplica os padrões ao texto guardado de um lote de arquivos, dentro de um worker."""
+    try:
+        return _worker_processor.reextract_files(arquivos)
+    finally:
+        _drain_worker_metrics()
+
+
+def _warmup_worker(pdf_path: str) -> bool:
+    """Aquece um worker do pool de processos com o boleto embutido."""
+    return _worker_processor.warm_up_file(pdf_path)
+
+
+def _extract_worker(pdf_path: str, digest: Optional[str] = None) -> Optional[Dict]:
+    """
+    Extrai os dados de um PDF dentro de um worker do pool de processos.
+
+    Retorna um dicionário simples (e não um BoletoData) para reduzir o custo
+    de serialização entre processos.
+    """
+    try:
+        return _worker_processor.process_pdf(pdf_path, set(), digest)
+    finally:
+        _drain_worker_metrics()
+
 
 class BoletoProcessor:
 
@@ -58,12 +140,328 @@ class BoletoProcessor:
             re.compile(r"\d{5}\.\d{5}\s\d{5}\.\d{6}\s\d{5}\.\d{6}\s\d{1}\s\d{4}(\d{10})"),
         ]
     }
+
+    # Padrões de moeda (último recurso para o valor)
+    CURRENCY_PATTERNS = {
+        "valor": [
+            re.compile(r"R\$\s*(\d{1,3}(?:\.\d{3})*,\d{2})"),
+            re.compile(r"(\d{1,3}(?:\.\d{3})*,\d{2})\s*R\$"),
+            re.compile(r"\(=\)\s*(\d{1,3}(?:\.\d{3})*,\d{2})"),
+            re.compile(r"Total\s+a\s+pagar\s*R?\$?\s*(\d{1,3}(?:\.\d{3})*,\d{2})"),
+        ]
+    }
+
+    # Campos que uma linha digitável válida fornece sem precisar de regex
+    BARCODE_FIELDS = ("valor", "vencimento")
+
+    # No modo de extração "early", a leitura das páginas termina assim que
+    # estes campos forem encontrados
+    REQUIRED_FIELDS = ("codigo_barras", "vencimento", "valor")
+
+    # Uma região de config.crop_boxes só dispensa a leitura da página inteira
+    # se todos estes campos forem encontrados nela
+    CROP_FIELDS = (
+        "codigo_barras", "vencimento", "valor", "beneficiario", "pagador", "data_processamento",
+    )
+
+    # Campos contabilizados em boleto_field_resolved_total
+    METRIC_FIELDS = (
+        "codigo_barras", "vencimento", "valor", "beneficiario", "pagador",
+        "data_processamento", "banco",
+    )
+
+    # Boletos gravados no repositório por vez, e arquivos reservados por vez
+    # (com até max_workers * BATCH_SIZE em andamento) nas varreduras da pasta.
+    # Cada documento segue para o pool em uma tarefa própria, com seus
+    # limites de tempo e memória
+    BATCH_SIZE = 8
+
+    # Versão da lógica de extração; faz parte da chave do cache de resultados
+    EXTRACTOR_VERSION = 2
+
+    # Todos os níveis compilados em um extrator de passada única, na ordem de prioridade
+    SCANNER = FieldScanner([
+        ("primary", PATTERNS),
+        ("alt", ALT_PATTERNS),
+        ("extra", EXTRA_PATTERNS),
+        ("health", HEALTH_PATTERNS),
+        ("currency", CURRENCY_PATTERNS),
+    ])
     
 
     def __init__(self, config: Config):
         self.config = config
         
         self.boletos_extraidos = []
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+        self._metrics_queue: Optional[multiprocessing.Queue] = None
+        self._metrics_thread: Optional[threading.Thread] = None
+        self._store: Optional[ResultStore] = None
+        self._store_lock = threading.Lock()
+        self._index: Optional[BoletoIndex] = None
+        self._text_store: Optional[TextStore] = None
+        self._varredura = VarreduraPdfs(config.anexos_dir)
+        # Identifica as reservas de arquivos deste processador no repositório,
+        # compartilhado com outros processos (uvicorn --workers, réplicas)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._heartbeat: Optional[threading.Thread] = None
+        self._heartbeat_lock = threading.Lock()
+        self._heartbeat_stop = threading.Event()
+        # Fila com prioridades na frente do executor: uploads passam na frente
+        # do e-mail, que passa na frente das varreduras em massa
+        self.scheduler = ExtractionScheduler(
+            self._get_executor,
+            slots=config.max_workers,
+            capacity=config.scheduler_queue_size,
+            weights=parse_weights(config.scheduler_weights),
+        )
+        self.text_backend = create_text_backend(config.text_backend)
+        self.cache = ResultCache(
+            version=self.extraction_version(),
+            max_size=config.cache_size,
+            cache_dir=config.cache_dir or None,
+            disk_max_size=config.cache_disk_size,
+        )
+
+    @classmethod
+    def patterns_version(cls) -> str:
+        """
+        Calcula uma versão do conjunto de padrões de extração.
+
+        Qualquer alteração em PATTERNS, ALT_PATTERNS, EXTRA_PATTERNS,
+        HEALTH_PATTERNS, CURRENCY_PATTERNS ou EXTRACTOR_VERSION gera uma versão
+        diferente, invalidando o cache.
+        """
+        sources = [f"extractor:{cls.EXTRACTOR_VERSION}"]
+        for name in (
+            "PATTERNS",
+            "ALT_PATTERNS",
+            "EXTRA_PATTERNS",
+            "HEALTH_PATTERNS",
+            "CURRENCY_PATTERNS",
+        ):
+            for field, patterns in getattr(cls, name).items():
+                if not isinstance(patterns, list):
+                    patterns = [patterns]
+                for pattern in patterns:
+                    sources.append(f"{name}.{field}:{pattern.pattern}:{pattern.flags}")
+        return hashlib.sha256("\n".join(sources).encode("utf-8")).hexdigest()[:16]
+
+    def extraction_version(self) -> str:
+        """
+        Versão dos padrões combinada com as opções de leitura do texto.
+
+        O backend de texto, as regiões de corte e o modo de extração mudam o
+        texto lido e, com isso, o resultado; trocá-los também invalida o cache.
+        """
+        options = [self.config.text_backend, self.config.crop_boxes, self.config.extraction_mode]
+        if options == ["pdfplumber", {}, "early"]:
+            return self.patterns_version()
+        options = json.dumps(options, sort_keys=True)
+        digest = hashlib.sha256(options.encode("utf-8")).hexdigest()[:8]
+        return f"{self.patterns_version()}-{digest}"
+
+    def _get_executor(self) -> Executor:
+        """
+        Retorna o executor de extração, criando-o na primeira chamada.
+
+        Os workers são iniciados uma única vez e reaproveitados entre chamadas.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = self._create_executor()
+        return self._executor
+
+    def _create_executor(self) -> Executor:
+        if self.config.executor_mode == "process":
+            # Os workers nascem por fork e herdam a biblioteca de PDF já importada
+            self.text_backend.preload()
+            self._metrics_queue = multiprocessing.Queue()
+            self._metrics_thread = threading.Thread(
+                target=self._merge_worker_metrics,
+                args=(self._metrics_queue,),
+                name="worker-metrics",
+                daemon=True,
+            )
+            self._metrics_thread.start()
+            # Cada documento em um processo com tempo e memória limitados
+            executor = SupervisedProcessPool(
+                max_workers=self.config.max_workers,
+                initializer=_init_worker,
+                initargs=(self.config, self._metrics_queue),
+                timeout=self.config.extraction_timeout,
+                memory_limit=self.config.extraction_memory_mb * 2**20,
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.config.max_workers)
+            if self.config.extraction_timeout or self.config.extraction_memory_mb:
+                logger.info(
+                    "Limites de tempo e memória por documento valem apenas no modo "
+                    "'process'; threads não podem ser interrompidas"
+                )
+        logger.info(
+            f"Executor de extração iniciado: {self.config.executor_mode} "
+            f"com {self.config.max_workers} workers"
+        )
+        return executor
+
+    @staticmethod
+    def _merge_worker_metrics(queue: multiprocessing.Queue) -> None:
+        """Soma no registro local as métricas enviadas pelos workers."""
+        while True:
+            delta = queue.get()
+            if delta is None:
+                return
+            REGISTRY.merge(delta)
+
+    def warm_up_file(self, pdf_path: str) -> bool:
+        """
+        Lê um PDF e busca os campos sem gravar nada nem contar nas métricas.
+
+        Paga a inicialização preguiçosa do backend de texto (imports, tabelas
+        de fontes do pdfminer) e da busca de campos.
+
+        Returns:
+            True se os campos obrigatórios foram encontrados
+        """
+        with self.text_backend.open(pdf_path) as doc:
+            texts = {i: doc.page_text(i) for i in range(doc.page_count)}
+        boleto, _ = self._match_fields(pdf_path, self._join_pages(texts))
+        return self._is_complete(boleto)
+
+    def warm_up(self) -> Dict:
+        """
+        Inicia o executor e aquece cada worker com o boleto embutido.
+
+        No modo "process" cada processo do pool extrai o boleto uma vez; no
+        modo "thread" uma extração basta, pois os workers dividem o processo.
+
+        Returns:
+            {"workers": quantidade aquecida, "ok": bool, "seconds": duração}
+        """
+        inicio = time.perf_counter()
+        pdf_path = write_warmup_pdf()
+        try:
+            executor = self._get_executor()
+            if self.config.executor_mode == "process":
+                futures = [
+                    executor.submit(_warmup_worker, pdf_path)
+                    for _ in range(self.config.max_workers)
+                ]
+                results = [future.result() for future in futures]
+            else:
+                results = [self.warm_up_file(pdf_path)]
+        finally:
+            os.remove(pdf_path)
+        duracao = time.perf_counter() - inicio
+        STARTUP_SECONDS.set(duracao, "warmup")
+        if not all(results):
+            logger.warning("Boleto de aquecimento não reconhecido pelos padrões atuais")
+        logger.info(f"{len(results)} worker(s) de extração aquecido(s) em {duracao:.2f}s")
+        return {"workers": len(results), "ok": all(results), "seconds": round(duracao, 3)}
+
+    def _track(self, future: Future) -> Future:
+        """Conta o documento como pendente até o Future terminar."""
+        EXTRACTION_PENDING.inc()
+        future.add_done_callback(lambda _: EXTRACTION_PENDING.dec())
+        return future
+
+    def _submit_extraction(
+        self, pdf_path: str, priority: str = BULK, block: bool = True, digest: Optional[str] = None
+    ) -> Future:
+        """
+        Enfileira um PDF no scheduler de extração, na classe `priority`.
+
+        `digest` é o SHA-256 do arquivo, quando quem chamou já o calculou.
+
+        Se o processo que extrai o arquivo for encerrado (tempo ou memória
+        excedidos, ou falha do processo), o arquivo vai para a quarentena.
+
+        Raises:
+            QueueFull: fila da classe cheia (com block=False)
+        """
+        if self.config.executor_mode == "process":
+            future = self.scheduler.submit(priority, _extract_worker, pdf_path, digest, block=block)
+        else:
+            future = self.scheduler.submit(
+                priority, self.process_pdf, pdf_path, set(), digest, block=block
+            )
+
+        def quarantine_if_aborted(done: Future) -> None:
+            if done.cancelled() or not isinstance(done.exception(), ExtractionAborted):
+                return
+            error = done.exception()
+            EXTRACTIONS.inc(error.motivo)
+            logger.error(f"{pdf_path} em quarentena: {error.detalhe}")
+            try:
+                self.store.quarantine(pdf_path, error.motivo, error.detalhe)
+            except Exception as e:
+                logger.error(f"Erro ao registrar {pdf_path} na quarentena: {str(e)}")
+
+        future.add_done_callback(quarantine_if_aborted)
+        return self._track(future)
+
+    def claim_files(self, arquivos: List[str]) -> List[str]:
+        """
+        Reserva arquivos pendentes para serem extraídos por este processador.
+
+        Arquivos já gravados, em quarentena ou reservados por outro processo
+        ficam de fora. As reservas são renovadas em segundo plano até o
+        resultado ser gravado (save_data) ou a reserva ser desfeita.
+
+        Returns:
+            Os arquivos reservados
+        """
+        claimed = self.store.claim(arquivos, self.owner, self.config.claim_ttl)
+        CLAIMS.inc("claimed", amount=len(claimed))
+        CLAIMS.inc("skipped", amount=len(arquivos) - len(claimed))
+        if claimed:
+            self._start_heartbeat()
+        return claimed
+
+    def release_files(self, arquivos: Optional[List[str]] = None) -> None:
+        """
+        Desfaz as reservas (todas, se arquivos for None), por exemplo de uma
+        extração sem resultado; outro processo pode tentar de novo.
+        """
+        try:
+            self.store.release_claims(self.owner, arquivos)
+        except Exception as e:
+            logger.error(f"Erro ao desfazer reservas: {str(e)}")
+
+    def _start_heartbeat(self) -> None:
+        with self._heartbeat_lock:
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(
+                    target=self._renew_claims, name="claims-heartbeat", daemon=True
+                )
+                self._heartbeat.start()
+
+    def _renew_claims(self) -> None:
+        while not self._heartbeat_stop.wait(self.config.claim_ttl / 3):
+            try:
+                self.store.renew_claims(self.owner, self.config.claim_ttl)
+            except Exception as e:
+                logger.error(f"Erro ao renovar reservas: {str(e)}")
+
+    def shutdown(self) -> None:
+        """Encerra os workers de extração e desfaz as reservas pendentes."""
+        if self._heartbeat is not None:
+            self._heartbeat_stop.set()
+            self._heartbeat.join()
+            self._heartbeat = None
+            self._heartbeat_stop.clear()
+            self.release_files(None)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._metrics_thread is not None:
+            self._metrics_queue.put(None)
+            self._metrics_thread.join()
+            self._metrics_queue.close()
+            self._metrics_thread = None
+            self._metrics_queue = None
 
     def extract_value_from_barcode(self, codigo_barras):
         """
@@ -113,171 +511,377 @@ class BoletoProcessor:
             )
             return None
 
-    def extract_data_from_pdf(self, pdf_path: str) -> Optional[BoletoData]:
+    def parse_text(self, pdf_path: str, all_text: str) -> BoletoData:
+        """
+        Extrai os campos do boleto a partir do texto já extraído do PDF.
+
+        Args:
+            pdf_path: Caminho do arquivo PDF (gravado em BoletoData.arquivo)
+            all_text: Texto de todas as páginas
+
+        Returns:
+            BoletoData com os campos encontrados, já normalizados
+        """
+        inicio = time.perf_counter()
+        boleto, tiers = self._match_fields(pdf_path, all_text)
+        self._record_matching(time.perf_counter() - inicio, tiers)
+        return boleto
+
+    def _record_matching(self, seconds: float, tiers: Dict[str, str]) -> None:
+        FIELD_MATCHING_SECONDS.observe(seconds)
+        for field in self.METRIC_FIELDS:
+            FIELD_RESOLVED.inc(field, tiers.get(field, "none"))
+
+    def _match_fields(self, pdf_path: str, all_text: str) -> Tuple[BoletoData, Dict[str, str]]:
+        """Busca os campos no texto; retorna o boleto e o nível que resolveu cada campo."""
+        # Nível de padrão que resolveu cada campo, para as métricas
+        tiers = {}
+
+        # Extrai em uma única passada os campos que não vêm da linha digitável
+        found = self.SCANNER.scan(
+            all_text,
+            [f for f in self.SCANNER.fields if f not in self.BARCODE_FIELDS],
+        )
+
+        # Caminho rápido: linha digitável válida fornece valor e vencimento
+        linha = None
+        if "codigo_barras" in found:
+            processamento = found.get("data_processamento")
+            linha = decode_linha_digitavel(
+                found["codigo_barras"][1],
+                referencia=parse_data(processamento[1]) if processamento else None,
+            )
+
+        missing = [
+            f
+            for f in self.BARCODE_FIELDS
+            if linha is None or (f == "vencimento" and linha.vencimento is None)
+        ]
+        if missing:
+            found.update(self.SCANNER.scan(all_text, missing))
+
+        campos = {}
+        for field, (tier, value) in found.items():
+            if tier != "currency":
+                campos[field] = value
+                tiers[field] = tier
+
+        # Tentar extrair o valor do código de barras - especialmente útil para boletos AMIL
+        if linha is None and campos.get("codigo_barras"):
+            extracted_value = self.extract_value_from_barcode(campos["codigo_barras"])
+            if extracted_value:
+                campos["valor"] = extracted_value
+                tiers["valor"] = "barcode_legacy"
+
+        boleto = BoletoData.from_text(pdf_path, campos)
+
+        # Linha digitável válida: valores já tipados, sem conversão de texto
+        if linha is not None:
+            boleto.banco = linha.banco
+            boleto.valor = linha.valor_centavos
+            tiers["banco"] = tiers["valor"] = "barcode"
+            if linha.vencimento is not None:
+                boleto.vencimento = linha.vencimento
+                tiers["vencimento"] = "barcode"
+
+        # Tenta um método mais agressivo para encontrar valores - procurar por padrões de moeda
+        if boleto.valor is None and "valor" in found:
+            boleto.valor = parse_valor(found["valor"][1])
+            tiers["valor"] = "currency"
+
+        return boleto, tiers
+
+    @staticmethod
+    def _page_order(page_count: int) -> List[int]:
+        """
+        Ordem de leitura das páginas no modo "early": a primeira, a última
+        (onde fica a ficha de compensação dos demonstrativos de várias
+        páginas) e depois as demais.
+        """
+        if page_count <= 2:
+            return list(range(page_count))
+        return [0, page_count - 1] + list(range(1, page_count - 1))
+
+    @staticmethod
+    def _join_pages(texts: Dict[int, str]) -> str:
+        """Texto das páginas lidas, sempre na ordem do documento."""
+        return "".join(texts[i] + "\n" for i in sorted(texts))
+
+    def _is_complete(self, boleto: BoletoData, fields: Tuple[str, ...] = REQUIRED_FIELDS) -> bool:
+        return all(getattr(boleto, f) is not None for f in fields)
+
+    def _read_early(
+        self, pdf_path: str, doc: TextDocument
+    ) -> Tuple[Optional[BoletoData], Dict, Dict[int, str], Set[int], float]:
+        """
+        Lê as páginas até encontrar REQUIRED_FIELDS.
+
+        Em cada página tenta antes as regiões de config.crop_boxes (só a área
+        recortada é diagramada) e depois a página inteira. Uma região só é
+        aceita se trouxer todos os CROP_FIELDS: faltando algum (ex.: uma
+        região só com a linha digitável), a página é lida inteira e os campos
+        vêm do texto completo. Como o texto é montado na ordem do documento,
+        quando todas as páginas acabam lidas o resultado é o mesmo do modo
+        "full".
+
+        Returns:
+            Boleto, níveis dos campos, texto de cada página lida, páginas das
+            quais só uma região foi lida e tempo gasto nas buscas
+        """
+        texts: Dict[int, str] = {}
+        boleto, tiers = None, {}
+        matching = 0.0
+        regions = list(self.config.crop_boxes.values()) + [None]
+        for index in self._page_order(doc.page_count):
+            for crop in regions:
+                texts[index] = doc.page_text(index, crop)
+                inicio = time.perf_counter()
+                boleto, tiers = self._match_fields(pdf_path, self._join_pages(texts))
+                matching += time.perf_counter() - inicio
+                if self._is_complete(boleto, self.REQUIRED_FIELDS if crop is None else self.CROP_FIELDS):
+                    TEXT_PAGES.inc("read", amount=len(texts))
+                    TEXT_PAGES.inc("skipped", amount=doc.page_count - len(texts))
+                    return boleto, tiers, texts, set() if crop is None else {index}, matching
+        TEXT_PAGES.inc("read", amount=len(texts))
+        return boleto, tiers, texts, set(), matching
+
+    def extract_data_from_pdf(
+        self, pdf_path: str, digest: Optional[str] = None
+    ) -> Optional[BoletoData]:
         """
         Extrai dados de um boleto em PDF.
 
         Args:
             pdf_path: Caminho do arquivo PDF
+            digest: SHA-256 do arquivo, se já calculado (usado ao guardar o texto)
 
         Returns:
             Objeto BoletoData com os dados extraídos ou None se falhar
         """
-        boleto = BoletoData(arquivo=pdf_path)
-
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                # Extrair todo o texto de todas as páginas
-                all_text = ""
-                for page in pdf.pages:
-                    text = page.extract_text() or ""
-                    all_text += text + "\n"
+            inicio = time.perf_counter()
+            with self.text_backend.open(pdf_path) as doc:
+                aberto = time.perf_counter()
+                PDF_OPEN_SECONDS.observe(aberto - inicio)
+
+                cropped: Set[int] = set()
+                if self.config.extraction_mode == "early":
+                    boleto, tiers, texts, cropped, matching = self._read_early(pdf_path, doc)
+                    TEXT_EXTRACTION_SECONDS.observe(time.perf_counter() - aberto - matching)
+                else:
+                    # Texto de todas as páginas
+                    texts = {i: doc.page_text(i) for i in range(doc.page_count)}
+                    TEXT_PAGES.inc("read", amount=doc.page_count)
+                    TEXT_EXTRACTION_SECONDS.observe(time.perf_counter() - aberto)
+                    boleto = None
+                all_text = self._join_pages(texts)
 
                 if not all_text.strip():
                     logger.warning(f"Nenhum texto extraído de {pdf_path}")
+                    EXTRACTIONS.inc("empty")
                     return None
 
+                # Só o texto das páginas inteiras: o de uma região não serve
+                # para reaplicar os padrões aos demais campos
+                self._save_text(
+                    pdf_path, digest, doc.page_count,
+                    {i: text for i, text in texts.items() if i not in cropped},
+                )
+
                 # Para depuração
                 logger.debug(f"Texto extraído do PDF: {all_text[:500]}...")
 
-                # Extrai dados usando padrões primários
-                for field, pattern in self.PATTERNS.items():
-                    if (
-                        getattr(boleto, field) is None
-                    ):  # Só busca se ainda não encontrou
-                        match = pattern.search(all_text)
-                        if match and match.group(1):
-                            setattr(boleto, field, match.group(1).strip())
-                            logger.debug(
-                                f"Encontrado {field}: {match.group(1).strip()}"
-                            )
-
-                # Tenta padrões alternativos para campos não encontrados
-                for field, pattern in self.ALT_PATTERNS.items():
-                    if (
-                        getattr(boleto, field) is None
-                    ):  # Só busca se ainda não encontrou
-                        match = pattern.search(all_text)
-                        if match and match.group(1):
-                            setattr(boleto, field, match.group(1).strip())
-                            logger.debug(
-                                f"Encontrado {field} (alt): {match.group(1).strip()}"
-                            )
-
-                # Tenta padrões extras para campos críticos
-                for field, pattern in self.EXTRA_PATTERNS.items():
-                    if (
-                        getattr(boleto, field) is None
-                    ):  # Só busca se ainda não encontrou
-                        match = pattern.search(all_text)
-                        if match and match.group(1):
-                            setattr(boleto, field, match.group(1).strip())
-                            logger.debug(
-                                f"Encontrado {field} (extra): {match.group(1).strip()}"
-                            )
-
-                # Tenta padrões específicos para planos de saúde
-                if (
-                    boleto.valor is None
-                    and hasattr(self, "HEALTH_PATTERNS")
-                    and "valor" in self.HEALTH_PATTERNS
-                ):
-                    for pattern in self.HEALTH_PATTERNS["valor"]:
-                        match = pattern.search(all_text)
-                        if match and match.group(1):
-                            boleto.valor = match.group(1).strip()
-                            logger.debug(
-                                f"Encontrado valor (health): {match.group(1).strip()}"
-                            )
-                            break
-
-                # Tentar extrair o valor do código de barras - especialmente útil para boletos AMIL
-                if boleto.codigo_barras:
-                    extracted_value = self.extract_value_from_barcode(
-                        boleto.codigo_barras
-                    )
-                    if extracted_value:
-                        boleto.valor = extracted_value
-                        logger.info(
-                            f"Valor extraído do código de barras: {extracted_value}"
-                        )
-
-                # Tenta um método mais agressivo para encontrar valores - procurar por padrões de moeda
-                if boleto.valor is None:
-                    currency_patterns = [
-                        re.compile(r"R\$\s*(\d{1,3}(?:\.\d{3})*,\d{2})"),
-                        re.compile(r"(\d{1,3}(?:\.\d{3})*,\d{2})\s*R\$"),
-                        re.compile(r"\(=\)\s*(\d{1,3}(?:\.\d{3})*,\d{2})"),
-                        re.compile(
-                            r"Total\s+a\s+pagar\s*R?\$?\s*(\d{1,3}(?:\.\d{3})*,\d{2})"
-                        ),
-                    ]
-
-                    for pattern in currency_patterns:
-                        match = pattern.search(all_text)
-                        if match and match.group(1):
-                            boleto.valor = match.group(1).strip()
-                            logger.debug(
-                                f"Encontrado valor (currency): {match.group(1).strip()}"
-                            )
-                            break
-
-            # Formata os dados extraídos
-            boleto.format_data()
+                if boleto is None:
+                    boleto = self.parse_text(pdf_path, all_text)
+                else:
+                    self._record_matching(matching, tiers)
 
             # Verifica se foram extraídos dados suficientes
             if not boleto.is_valid():
                 logger.warning(f"Dados insuficientes extraídos de {pdf_path}")
+                EXTRACTIONS.inc("invalid")
                 return None
 
+            EXTRACTIONS.inc("ok")
             return boleto
 
         except Exception as e:
             logger.error(f"Erro ao processar {pdf_path}: {str(e)}")
+            EXTRACTIONS.inc("error")
             return None
 
+    def _save_text(
+        self, pdf_path: str, digest: Optional[str], page_count: int, texts: Dict[int, str]
+    ) -> None:
+        """Guarda o texto lido no TextStore; uma falha aqui não impede a extração."""
+        if self.text_store is None:
+            return
+        try:
+            if digest is None:
+                digest = file_digest(pdf_path)
+            self.text_store.put(pdf_path, digest, self.text_backend.name, page_count, texts)
+        except Exception as e:
+            logger.warning(f"Não foi possível guardar o texto de {pdf_path}: {str(e)}")
+
+    def reextract_files(self, arquivos: List[str]) -> List[Tuple[str, str, Optional[Dict]]]:
+        """
+        Reaplica os padrões atuais ao texto guardado de cada arquivo, sem abrir o PDF.
+
+        Returns:
+            (arquivo, situação, boleto) para cada arquivo. Situações: "ok",
+            "invalido" (dados insuficientes), "sem_texto" (nada guardado) e
+            "incompleto" (faltam campos e há páginas que não foram lidas na
+            extração; só reprocessando o PDF)
+        """
+        results = []
+        for arquivo in arquivos:
+            stored = self.text_store.get(arquivo)
+            if stored is None:
+                results.append((arquivo, "sem_texto", None))
+                continue
+            page_count, texts = stored
+            boleto, _ = self._match_fields(arquivo, self._join_pages(texts))
+            if len(texts) < page_count and not self._is_complete(boleto):
+                results.append((arquivo, "incompleto", None))
+            elif not boleto.is_valid():
+                results.append((arquivo, "invalido", None))
+            else:
+                results.append((arquivo, "ok", boleto.to_dict()))
+        return results
+
+    def reextract_all(self, aplicar: bool = True, lote: int = 256) -> Dict:
+        """
+        Reaplica os padrões atuais a todo o histórico de textos guardados.
+
+        O trabalho é dividido em lotes de `lote` arquivos executados em
+        paralelo no executor de extração, com prioridade de varredura em
+        massa; nenhum PDF é aberto. Os resultados atuais são carregados de
+        uma vez, em uma única consulta, e comparados em memória.
+
+        Args:
+            aplicar: Se True, grava no repositório os boletos que mudaram;
+                se False, apenas informa o que mudaria
+
+        Returns:
+            Resumo com os totais por situação e a lista de boletos alterados,
+            com o valor anterior e o novo de cada campo diferente
+        """
+        if self.text_store is None:
+            raise ValueError("Texto dos PDFs não é guardado (TEXT_DB vazio)")
+
+        arquivos = self.text_store.files()
+        lotes = [arquivos[i:i + lote] for i in range(0, len(arquivos), lote)]
+        fn = _reextract_worker if self.config.executor_mode == "process" else self.reextract_files
+        futures = [self.scheduler.submit(BULK, fn, batch, block=True) for batch in lotes]
+
+        atuais = {item["arquivo"]: item for item in self.store.all()}
+        resumo = {"total": len(arquivos), "ok": 0, "invalido": 0, "sem_texto": 0,
+                  "incompleto": 0, "novos": 0, "alterados": []}
+        gravar = []
+        try:
+            for future in futures:
+                batch = future.result()
+                for arquivo, situacao, result in batch:
+                    resumo[situacao] += 1
+                    if result is None:
+                        continue
+                    anterior = atuais.get(arquivo)
+                    if anterior is None:
+                        resumo["novos"] += 1
+                        gravar.append(result)
+                    elif anterior != result:
+                        resumo["alterados"].append({
+                            "arquivo": arquivo,
+                            "campos": {
+                                campo: [anterior.get(campo), valor]
+                                for campo, valor in result.items() if anterior.get(campo) != valor
+                            },
+                        })
+                        gravar.append(result)
+                if aplicar and len(gravar) >= self.BATCH_SIZE:
+                    self.save_data(gravar)
+                    gravar = []
+        finally:
+            # Interrompida por erro: os lotes ainda na fila são descartados
+            for future in futures:
+                future.cancel()
+        if aplicar and gravar:
+            self.save_data(gravar)
+
+        logger.info(
+            f"Reextração: {resumo['total']} textos, {len(resumo['alterados'])} alterados, "
+            f"{resumo['novos']} novos, {resumo['incompleto']} incompletos"
+        )
+        return resumo
+
     def debug_extract_text(self, pdf_path: str) -> str:
         """
         Função de debug para extrair e retornar todo o texto de um PDF.
         Útil para analisar a estrutura do PDF e identificar novos padrões.
         """
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                all_text = ""
-                for page in pdf.pages:
-                    text = page.extract_text() or ""
-                    all_text += text + "\n"
-                return all_text
+            with self.text_backend.open(pdf_path) as doc:
+                return "".join(doc.page_text(i) + "\n" for i in range(doc.page_count))
         except Exception as e:
             logger.error(f"Erro ao extrair texto para debug de {pdf_path}: {str(e)}")
             return f"ERRO: {str(e)}"
 
+    @property
+    def store(self) -> ResultStore:
+        """Repositório de boletos, aberto na primeira utilização."""
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    self._store = create_store(self.config)
+        return self._store
+
+    @property
+    def text_store(self) -> Optional[TextStore]:
+        """Textos extraídos dos PDFs (None se config.text_db estiver vazio)."""
+        if self._text_store is None and self.config.text_db:
+            with self._store_lock:
+                if self._text_store is None:
+                    self._text_store = TextStore(self.config.text_db)
+        return self._text_store
+
+    @property
+    def index(self) -> BoletoIndex:
+        """Índices em memória para consultas, carregados na primeira utilização."""
+        if self._index is None:
+            store = self.store
+            with self._store_lock:
+                if self._index is None:
+                    index = BoletoIndex(store, self.config.query_refresh_interval)
+                    index.refresh()
+                    self._index = index
+        return self._index
+
     def load_processed_files(self) -> tuple[List[Dict], Set[str]]:
         """
-        Carrega os boletos já processados do arquivo JSON.
+        Carrega os boletos já processados do repositório.
 
         Returns:
             Tupla com a lista de boletos e conjunto de caminhos já processados
         """
         processed_data = []
         processed_files = set()
-        
-        if os.path.exists(self.config.output_file):
-            try:
-                with open(self.config.output_file, "r", encoding="utf-8") as f:
-                    processed_data = json.load(f)
-                    processed_files = {item["arquivo"] for item in processed_data}
-                    logger.info(
-                        f"Carregados {len(processed_data)} boletos já processados"
-                    )
-            except Exception as e:
-                logger.error(f"Erro ao carregar arquivo JSON: {str(e)}")
+
+        try:
+            processed_data = self.store.all()
+            processed_files = {item["arquivo"] for item in processed_data}
+            logger.info(f"Carregados {len(processed_data)} boletos já processados")
+        except Exception as e:
+            logger.error(f"Erro ao carregar boletos processados: {str(e)}")
 
         return processed_data, processed_files
 
     def save_data(self, data: List[Dict]) -> bool:
         """
-        Salva os dados em um arquivo JSON.
+        Grava os boletos no repositório em uma única transação.
+
+        A mesma transação encerra as reservas deste processador sobre os
+        arquivos gravados; boletos de arquivos que passaram a ser de outro
+        processo (reserva vencida e retomada) não são gravados.
 
         Args:
             data: Lista de dicionários com os dados dos boletos
@@ -286,21 +890,27 @@ class BoletoProcessor:
             True se salvou com sucesso, False caso contrário
         """
         try:
-            with open(self.config.output_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            logger.info(f"Dados salvos em '{self.config.output_file}'")
+            total = self.store.add_many(data, owner=self.owner)
+            logger.info(f"{total} boletos salvos no repositório")
+            if self._index is not None:
+                self._index.refresh()
             return True
         except Exception as e:
             logger.error(f"Erro ao salvar dados: {str(e)}")
+            # Sem a gravação, outro processo (ou a próxima execução) extrai de novo
+            self.release_files([item["arquivo"] for item in data])
             return False
 
-    def process_pdf(self, pdf_path: str, processed_files: Set[str]) -> Optional[Dict]:
+    def process_pdf(
+        self, pdf_path: str, processed_files: Set[str], digest: Optional[str] = None
+    ) -> Optional[Dict]:
         """
         Processa um único arquivo PDF se ainda não foi processado.
 
         Args:
             pdf_path: Caminho do arquivo PDF
             processed_files: Conjunto de arquivos já processados
+            digest: SHA-256 do arquivo, se já calculado
 
         Returns:
             Dicionário com os dados do boleto ou None
@@ -309,63 +919,206 @@ class BoletoProcessor:
             logger.debug(f"Pulando: {pdf_path} (já processado)")
             return None
 
-        logger.info(f"Processando: {os.path.basename(pdf_path)}")
-        boleto = self.extract_data_from_pdf(pdf_path)
+        boleto = self.extract_data_from_pdf(pdf_path, digest)
 
         if boleto:
-            result = asdict(boleto)
-            # Log dos dados extraídos
-            logger.info(f"Dados extraídos do boleto: {os.path.basename(pdf_path)}")
-            for key, value in result.items():
-                if key != "arquivo":
-                    logger.info(f"  - {key}: {value}")
+            result = boleto.to_dict()
+            # Campos por documento só em DEBUG; a visão agregada está em /metrics
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Dados extraídos de {os.path.basename(pdf_path)}: {result}")
             return result
         return None
 
-    def process_all_boletos(self) -> List[Dict]:
+    def submit_file(self, pdf_path: str, priority: str = INTERACTIVE, block: bool = False) -> Future:
         """
-        Processa todos os PDFs na pasta de anexos, pulando boletos já processados.
+        Agenda a extração de um PDF no executor de extração.
+
+        Consulta antes o cache de resultados; em caso de acerto o Future já
+        retorna concluído. No modo "process" a extração roda em um worker do
+        pool de processos, sem disputar o GIL com quem chamou (ex.: a API).
+
+        Args:
+            pdf_path: Caminho do arquivo PDF
+            priority: Classe de prioridade no scheduler (interactive, email, bulk)
+            block: Se True, aguarda espaço na fila em vez de falhar com QueueFull
 
         Returns:
-            Lista de dicionários com os dados dos boletos processados
+            Future com o dicionário com os dados do boleto ou None
+
+        Raises:
+            QueueFull: fila da classe cheia (com block=False)
+        """
+        digest = file_digest(pdf_path)
+        cached = self.cache.get(digest)
+        if cached is not None:
+            logger.debug(f"Resultado em cache: {os.path.basename(pdf_path)}")
+            EXTRACTIONS.inc("cache")
+            cached["arquivo"] = pdf_path
+            future = Future()
+            future.set_result(cached)
+            return future
+
+        future = self._submit_extraction(pdf_path, priority, block, digest)
+
+        def store_in_cache(done: Future) -> None:
+            if not done.cancelled() and done.exception() is None and done.result():
+                self.cache.set(digest, done.result())
+
+        future.add_done_callback(store_in_cache)
+        return future
+
+    def pending_files(self) -> List[str]:
+        """
+        Lista os PDFs da pasta de anexos que ainda não estão no repositório
+        (nem em quarentena).
+
+        As subpastas (por hash do conteúdo) cujos PDFs já estavam todos
+        gravados na varredura anterior e que não mudaram desde então não são
+        relidas.
+
+        Returns:
+            Lista de caminhos de PDFs pendentes
         """
         if not os.path.exists(self.config.anexos_dir):
             logger.error(f"Pasta '{self.config.anexos_dir}' não encontrada!")
             return []
 
-        # Carrega dados já processados
-        processed_data, processed_files = self.load_processed_files()
+        lidas = self._varredura.candidatos()
+        pdf_files = [pdf for _, pdfs in lidas.values() for pdf in pdfs]
+        if not pdf_files:
+            logger.info("Nenhum arquivo PDF novo na pasta de anexos")
+            return []
 
-        # Lista todos os PDFs na pasta
-        pdf_files = [
-            os.path.join(self.config.anexos_dir, f)
-            for f in os.listdir(self.config.anexos_dir)
-            if f.lower().endswith(".pdf")
-        ]
+        pendentes = self.store.unprocessed(pdf_files)
+        # Pastas sem pendentes nem arquivos em quarentena (que podem ser
+        # liberados) não precisam ser lidas de novo enquanto não mudarem
+        abertos = set(pendentes) | {item["arquivo"] for item in self.store.quarantined()}
+        for pasta, (mtime, pdfs) in lidas.items():
+            if abertos.isdisjoint(pdfs):
+                self._varredura.resolver(pasta, mtime)
+        return pendentes
 
-        if not pdf_files:
-            logger.info("Nenhum arquivo PDF encontrado na pasta de anexos")
-            return processed_data
-
-        # Processa PDFs em paralelo
-        new_data = []
-        with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
-            results = executor.map(
-                lambda pdf: self.process_pdf(pdf, processed_files), pdf_files
-            )
+    def _extract_claimed(self, files: Iterable[str]) -> Iterator[Tuple[str, Optional[Dict]]]:
+        """
+        Reserva e extrai os arquivos, produzindo (arquivo, resultado) na ordem de conclusão.
 
-            for result in results:
-                if result:
-                    new_data.append(result)
+        Os arquivos são reservados em grupos de BATCH_SIZE à medida que há
+        espaço na janela de max_workers * BATCH_SIZE arquivos em andamento:
+        processos que varrem a mesma pasta ao mesmo tempo dividem os arquivos
+        entre si, e cada um extrai só os que reservou. Um arquivo que falha
+        (ou vai para a quarentena) produz None e tem a reserva desfeita; a
+        reserva dos demais é encerrada quando quem chamou grava o resultado.
+        Se a iteração for interrompida, os arquivos ainda não iniciados são
+        cancelados e suas reservas desfeitas.
+        """
+        files = iter(files)
+        window = self.config.max_workers * self.BATCH_SIZE
+        in_flight: Dict[Future, str] = {}
+
+        def fill() -> None:
+            while len(in_flight) < window:
+                grupo = list(itertools.islice(files, self.BATCH_SIZE))
+                if not grupo:
+                    return
+                for pdf in self.claim_files(grupo):
+                    in_flight[self._submit_extraction(pdf)] = pdf
+
+        try:
+            fill()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pdf = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Erro ao processar {pdf}: {str(e)}")
+                        result = None
+                    if not result:
+                        self.release_files([pdf])
+                    yield pdf, result
+                fill()
+        finally:
+            for future in in_flight:
+                future.cancel()
+            if in_flight:
+                self.release_files(list(in_flight.values()))
+
+    def process_all_boletos(self) -> List[Dict]:
+        """
+        Processa todos os PDFs na pasta de anexos, pulando boletos já processados.
+
+        Os resultados são gravados a cada lote de BATCH_SIZE boletos, de modo
+        que uma execução interrompida continua de onde parou. Vários processos
+        podem chamar ao mesmo tempo: cada arquivo é extraído por um só deles.
+
+        Returns:
+            Lista de dicionários com os dados dos boletos processados
+        """
+        # Um arquivo que falha (ou vai para a quarentena) não interrompe os demais
+        total = 0
+        batch = []
+        try:
+            with closing(self._extract_claimed(self.pending_files())) as results:
+                for _, result in results:
+                    if result:
+                        batch.append(result)
+                    if len(batch) >= self.BATCH_SIZE:
+                        self.save_data(batch)
+                        total += len(batch)
+                        batch = []
+            if batch:
+                self.save_data(batch)
+                total += len(batch)
+                batch = []
+        finally:
+            # Interrompida antes de gravar: as reservas do lote são desfeitas
+            if batch:
+                self.release_files([item["arquivo"] for item in batch])
 
-        if new_data:
-            logger.info(f"Processados {len(new_data)} novos boletos")
-            all_data = processed_data + new_data
-            self.save_data(all_data)
-            return all_data
+        if total:
+            logger.info(f"Processados {total} novos boletos")
         else:
             logger.info("Nenhum novo boleto processado")
-            return processed_data
+        return self.store.all()
+
+    def iter_process_all(self) -> Iterator[Dict]:
+        """
+        Processa os PDFs pendentes produzindo cada resultado assim que fica pronto.
+
+        Os resultados saem na ordem de conclusão (não na de envio) e cada
+        boleto é gravado no repositório imediatamente. Se a iteração for
+        interrompida, os arquivos ainda não iniciados são cancelados e a
+        próxima execução continua de onde esta parou.
+
+        Yields:
+            Dicionário com os dados de cada boleto processado
+        """
+        with closing(self._extract_claimed(self.pending_files())) as results:
+            for _, result in results:
+                if result:
+                    self.save_data([result])
+                    yield result
+
+    def submit_reprocess(self, specific_pdf: str) -> Optional[Future]:
+        """
+        Agenda o reprocessamento de um arquivo com prioridade interativa.
+
+        Returns:
+            Future com o dicionário com os dados do boleto (ou None), ou None
+            se o arquivo não existir
+
+        Raises:
+            QueueFull: fila interativa cheia
+        """
+        if not os.path.exists(specific_pdf):
+            logger.error(f"Arquivo '{specific_pdf}' não encontrado!")
+            return None
+
+        logger.info(f"Reprocessando: {os.path.basename(specific_pdf)}")
+        # Pedido explícito: um arquivo em quarentena é tentado de novo
+        self.store.release(specific_pdf)
+        return self.submit_file(specific_pdf, INTERACTIVE)
 
     def reprocess_specific_file(self, specific_pdf: str) -> Optional[Dict]:
         """
@@ -377,19 +1130,11 @@ class BoletoProcessor:
 
         Returns:
             Dicionário com os dados do boleto ou None
+
+        Raises:
+            QueueFull: fila interativa cheia
         """
-        if not os.path.exists(specific_pdf):
-            logger.error(f"Arquivo '{specific_pdf}' não encontrado!")
+        future = self.submit_reprocess(specific_pdf)
+        if future is None:
             return None
-
-        logger.info(f"Reprocessando: {os.path.basename(specific_pdf)}")
-        boleto = self.extract_data_from_pdf(specific_pdf)
-
-        if boleto:
-            result = asdict(boleto)
-            logger.info(f"Dados extraídos do boleto: {os.path.basename(specific_pdf)}")
-            for key, value in result.items():
-                if key != "arquivo":
-                    logger.info(f"  - {key}: {value}")
-            return result
-        return None
+        return future.result() or None
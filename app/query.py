@@ -0,0 +1,255 @@
+import bisect
+import hashlib
+import re
+import threading
+import time
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.models import parse_valor
+from app.storage import COLUMNS, ResultStore
+
+# Posição de cada coluna nas linhas do repositório
+_POS = {c: i for i, c in enumerate(COLUMNS)}
+
+# Quantidade máxima de boletos por página
+MAX_LIMIT = 1000
+
+_NAO_DIGITO = re.compile(r"\D")
+_DATA_ISO = re.compile(r"\d{4}-\d{2}-\d{2}$")
+
+
+def _texto(valor: Optional[str]) -> Optional[str]:
+    return " ".join(valor.upper().split()) if valor else None
+
+
+def _digitos(valor: Optional[str]) -> Optional[str]:
+    return _NAO_DIGITO.sub("", valor) if valor else None
+
+
+def _data(valor: Optional[str]) -> Optional[str]:
+    # Vencimento que não é uma data válida fica como texto: fora do índice por faixa
+    return valor if valor and _DATA_ISO.match(valor) else None
+
+
+def parse_filtro_data(valor: Optional[str]) -> Optional[str]:
+    """Aceita aaaa-mm-dd ou dd/mm/aaaa e devolve a data ISO; ValueError se inválida."""
+    if not valor:
+        return None
+    if "/" in valor:
+        dia, mes, ano = valor.split("/")
+        return date(int(ano), int(mes), int(dia)).isoformat()
+    return date.fromisoformat(valor).isoformat()
+
+
+def parse_filtro_valor(valor: Optional[str]) -> Optional[int]:
+    """Aceita "1234.56", "1234,56" ou "1.234,56" e devolve centavos; ValueError se inválido."""
+    if not valor:
+        return None
+    valor = valor.strip()
+    if "," in valor:
+        valor = valor.replace(".", "").replace(",", ".")
+    inteiro, _, decimal = valor.partition(".")
+    centavos = parse_valor(f"{inteiro}.{(decimal + '00')[:2]}")
+    if centavos is None or len(decimal) > 2:
+        raise ValueError(f"Valor inválido: {valor}")
+    return centavos
+
+
+class _SortedIndex:
+    """Pares (chave, id) ordenados, para consultas por faixa com bisect."""
+
+    def __init__(self):
+        self._keys: List[Tuple] = []
+
+    def add_many(self, pairs: List[Tuple]) -> None:
+        pairs = [pair for pair in pairs if pair[0] is not None]
+        if len(pairs) < 32:
+            for pair in pairs:
+                bisect.insort(self._keys, pair)
+        else:
+            # Carga inicial ou lote grande: uma ordenação só
+            self._keys.extend(pairs)
+            self._keys.sort()
+
+    def remove(self, key, record_id: int) -> None:
+        if key is None:
+            return
+        i = bisect.bisect_left(self._keys, (key, record_id))
+        if i < len(self._keys) and self._keys[i] == (key, record_id):
+            del self._keys[i]
+
+    def range(self, low=None, high=None) -> Set[int]:
+        start = 0 if low is None else bisect.bisect_left(self._keys, (low,))
+        # (high, inf) fica depois de todos os pares com chave == high
+        end = len(self._keys) if high is None else bisect.bisect_right(self._keys, (high, float("inf")))
+        return {record_id for _, record_id in self._keys[start:end]}
+
+
+class _HashIndex:
+    """Chave exata -> ids dos boletos."""
+
+    def __init__(self):
+        self._ids: Dict[str, Set[int]] = {}
+
+    def add(self, key, record_id: int) -> None:
+        if key is not None:
+            self._ids.setdefault(key, set()).add(record_id)
+
+    def remove(self, key, record_id: int) -> None:
+        ids = self._ids.get(key)
+        if ids is not None:
+            ids.discard(record_id)
+            if not ids:
+                del self._ids[key]
+
+    def get(self, key) -> Set[int]:
+        return self._ids.get(key, set())
+
+
+class BoletoIndex:
+    """
+    Índices em memória dos boletos do repositório, para consultas paginadas.
+
+    Mantém os boletos por id (a ordem de gravação) e índices por vencimento e
+    valor (ordenados, para faixas) e por beneficiário, pagador e código de
+    barras (exatos). refresh() aplica apenas o que mudou no repositório desde
+    a última sincronização (store.changes_since), de modo que gravações de
+    outros processos, como o worker de e-mail, também aparecem.
+    """
+
+    def __init__(self, store: ResultStore, refresh_interval: float = 1.0):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self.version = 0
+        self._lock = threading.Lock()
+        self._refreshed_at = 0.0
+        self._rows: Dict[int, tuple] = {}
+        self._ids: List[int] = []
+        self._ranges = {"vencimento": _SortedIndex(), "valor": _SortedIndex()}
+        self._exact = {"beneficiario": _HashIndex(), "pagador": _HashIndex(),
+                       "codigo_barras": _HashIndex()}
+
+    @staticmethod
+    def _keys(row: tuple) -> Dict:
+        """Chave de cada índice para uma linha do repositório."""
+        return {
+            "vencimento": _data(row[_POS["vencimento"]]),
+            "valor": parse_valor(row[_POS["valor"]]),
+            "beneficiario": _texto(row[_POS["beneficiario"]]),
+            "pagador": _texto(row[_POS["pagador"]]),
+            "codigo_barras": _digitos(row[_POS["codigo_barras"]]),
+        }
+
+    def _apply(self, changes: List[Tuple[int, int, tuple]]) -> None:
+        pairs: Dict[str, List[Tuple]] = {field: [] for field in self._ranges}
+        new_ids = []
+        for record_id, _, row in changes:
+            old = self._rows.get(record_id)
+            if old is not None:
+                for field, key in self._keys(old).items():
+                    (self._ranges.get(field) or self._exact[field]).remove(key, record_id)
+            else:
+                new_ids.append(record_id)
+            self._rows[record_id] = row
+            for field, key in self._keys(row).items():
+                if field in self._ranges:
+                    pairs[field].append((key, record_id))
+                else:
+                    self._exact[field].add(key, record_id)
+        for field, index in self._ranges.items():
+            index.add_many(pairs[field])
+        # Ids novos costumam vir em ordem crescente, depois de todos os existentes
+        ordenado = not self._ids or not new_ids or self._ids[-1] < new_ids[0]
+        self._ids.extend(new_ids)
+        if not ordenado or new_ids != sorted(new_ids):
+            self._ids.sort()
+
+    def refresh(self, force: bool = True) -> int:
+        """
+        Aplica nos índices os boletos gravados desde a última sincronização.
+
+        Args:
+            force: Se False, não consulta o repositório quando a última
+                sincronização foi há menos de refresh_interval segundos
+
+        Returns:
+            Quantidade de boletos incluídos ou atualizados
+        """
+        with self._lock:
+            if not force and time.monotonic() - self._refreshed_at < self.refresh_interval:
+                return 0
+            # Os lotes são aplicados de uma vez: na carga inicial os índices
+            # ordenados são ordenados uma única vez
+            changes = []
+            while True:
+                batch = self.store.changes_since(changes[-1][1] if changes else self.version)
+                if not batch:
+                    break
+                changes.extend(batch)
+            if changes:
+                self._apply(changes)
+                self.version = changes[-1][1]
+            self._refreshed_at = time.monotonic()
+            return len(changes)
+
+    def etag(self, params: Dict) -> str:
+        """ETag da consulta: muda quando o repositório muda ou os filtros mudam."""
+        chave = "&".join(f"{k}={params[k]}" for k in sorted(params) if params[k] is not None)
+        digest = hashlib.sha1(chave.encode("utf-8")).hexdigest()[:16]
+        return f'"{self.version}-{digest}"'
+
+    def query(
+        self,
+        vencimento_de: Optional[str] = None,
+        vencimento_ate: Optional[str] = None,
+        valor_min: Optional[int] = None,
+        valor_max: Optional[int] = None,
+        beneficiario: Optional[str] = None,
+        pagador: Optional[str] = None,
+        codigo_barras: Optional[str] = None,
+        cursor: int = 0,
+        limit: int = 100,
+    ) -> Dict:
+        """
+        Busca boletos pelos filtros informados, na ordem de gravação.
+
+        Datas são ISO (aaaa-mm-dd) e valores em centavos; beneficiário e
+        pagador são comparados sem diferença de maiúsculas e o código de
+        barras apenas pelos dígitos. A página seguinte é obtida repetindo a
+        consulta com cursor=next_cursor.
+
+        Returns:
+            {"items": [...], "next_cursor": int ou None, "total": int}
+        """
+        limit = max(1, min(limit, MAX_LIMIT))
+        with self._lock:
+            candidates: List[Set[int]] = []
+            if vencimento_de is not None or vencimento_ate is not None:
+                candidates.append(self._ranges["vencimento"].range(vencimento_de, vencimento_ate))
+            if valor_min is not None or valor_max is not None:
+                candidates.append(self._ranges["valor"].range(valor_min, valor_max))
+            if beneficiario:
+                candidates.append(self._exact["beneficiario"].get(_texto(beneficiario)))
+            if pagador:
+                candidates.append(self._exact["pagador"].get(_texto(pagador)))
+            if codigo_barras:
+                candidates.append(self._exact["codigo_barras"].get(_digitos(codigo_barras)))
+
+            if candidates:
+                candidates.sort(key=len)
+                ids = set(candidates[0]).intersection(*candidates[1:])
+                total = len(ids)
+                ordered = sorted(i for i in ids if i > cursor)
+                page, has_more = ordered[:limit], len(ordered) > limit
+            else:
+                total = len(self._ids)
+                start = bisect.bisect_right(self._ids, cursor)
+                page, has_more = self._ids[start:start + limit], start + limit < total
+
+            items = [dict(zip(COLUMNS, self._rows[i])) for i in page]
+        return {
+            "items": items,
+            "next_cursor": page[-1] if has_more else None,
+            "total": total,
+        }
@@ -0,0 +1,275 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple, Union
+
+# Caracteres com significado especial no início de um padrão
+_META = set(".^$*+?{}[]|()")
+_QUANTIFIERS = set("*+?{")
+# Referências a grupos deixam de valer quando o padrão é embutido em outro
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+TierPatterns = Dict[str, Union[Pattern, List[Pattern]]]
+
+
+def _leading_literal(source: str) -> str:
+    """Retorna o trecho literal com que um padrão (sem alternativas) começa."""
+    literal = []
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            if i + 1 >= len(source) or source[i + 1].isalnum():
+                break
+            char, step = source[i + 1], 2
+        elif char in _META:
+            break
+        else:
+            step = 1
+        # Um quantificador torna o último caractere opcional
+        if i + step < len(source) and source[i + step] in _QUANTIFIERS:
+            break
+        literal.append(char)
+        i += step
+    return "".join(literal)
+
+
+def _split_branches(source: str) -> List[str]:
+    """Separa as alternativas de primeiro nível de um trecho de padrão."""
+    branches, depth, start, i, in_class = [], 0, 0, 0, False
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            branches.append(source[start:i])
+            start = i + 1
+        i += 1
+    branches.append(source[start:])
+    return branches
+
+
+def literal_prefixes(pattern: Pattern) -> Optional[List[str]]:
+    """
+    Calcula os literais com que toda ocorrência de um padrão obrigatoriamente começa.
+
+    Suporta padrões iniciados por texto literal ou por um grupo (?:A|B) cujas
+    alternativas começam por texto literal.
+
+    Returns:
+        Lista de prefixos literais, ou None se o padrão não tiver um prefixo
+        literal garantido (ex.: começa com \\d)
+    """
+    if pattern.flags & re.IGNORECASE:
+        return None
+    source = pattern.pattern
+    if len(_split_branches(source)) > 1:
+        return None
+
+    if source.startswith("(?:"):
+        branches = _split_branches(source[3:])
+        # O grupo termina na última alternativa; o restante vem após o ")"
+        last = branches[-1]
+        depth, end = 0, None
+        i = 0
+        while i < len(last):
+            if last[i] == "\\":
+                i += 2
+                continue
+            if last[i] == "(":
+                depth += 1
+            elif last[i] == ")":
+                if depth == 0:
+                    end = i
+                    break
+                depth -= 1
+            i += 1
+        if end is None or last[end + 1:end + 2] in _QUANTIFIERS:
+            return None
+        branches[-1] = last[:end]
+        prefixes = [_leading_literal(branch) for branch in branches]
+    else:
+        prefixes = [_leading_literal(source)]
+
+    if not all(prefixes):
+        return None
+    return prefixes
+
+
+def _starts_with_digit(pattern: Pattern) -> bool:
+    """Verifica se toda ocorrência do padrão começa com um dígito (\\d)."""
+    source = pattern.pattern
+    while source.startswith("("):
+        source = source[3:] if source.startswith("(?:") else source[1:]
+    return source.startswith("\\d") and len(_split_branches(pattern.pattern)) == 1
+
+
+def _search_anchored(text: str, pattern: Pattern, prefixes: List[str]):
+    """
+    Equivalente a pattern.search(text) para padrões com prefixos literais.
+
+    Com mais de um prefixo, o re perde a busca rápida por literal; as posições
+    candidatas são localizadas com str.find e o padrão só é testado nelas.
+    """
+    if len(prefixes) <= 1:
+        return pattern.search(text)
+    upcoming = {prefix: text.find(prefix) for prefix in prefixes}
+    while True:
+        starts = [start for start in upcoming.values() if start >= 0]
+        if not starts:
+            return None
+        start = min(starts)
+        match = pattern.match(text, start)
+        if match:
+            return match
+        for prefix, position in upcoming.items():
+            if position == start:
+                upcoming[prefix] = text.find(prefix, start + 1)
+
+
+class FieldScanner:
+    """
+    Extrator de campos que aplica todos os níveis de padrões de uma só vez.
+
+    Todos os níveis (primário, alternativo, extra, ...) são compilados uma
+    única vez. Padrões iniciados por texto literal são resolvidos pela busca
+    rápida de literais do re. Os padrões sem prefixo literal (código de
+    barras, valores numéricos), que obrigam a percorrer o texto inteiro, são
+    combinados em um único matcher: uma só passada coleta os candidatos de
+    todos os campos e níveis, e termina assim que todos os campos estiverem
+    decididos.
+
+    A resolução segue a ordem de prioridade dos níveis e, dentro de cada
+    nível, a ordem das listas, de modo que o resultado é idêntico ao de
+    aplicar pattern.search nível a nível.
+    """
+
+    def __init__(self, tiers: List[Tuple[str, TierPatterns]]):
+        default_flags = re.compile("").flags
+        # Para cada campo, a lista ordenada de (nível, padrão, prefixos).
+        # prefixos None indica um padrão resolvido pelo matcher combinado.
+        self.fields: Dict[str, List[Tuple[str, Pattern, Optional[List[str]]]]] = {}
+        for tier, patterns in tiers:
+            for field, field_patterns in patterns.items():
+                if not isinstance(field_patterns, list):
+                    field_patterns = [field_patterns]
+                for pattern in field_patterns:
+                    prefixes = literal_prefixes(pattern)
+                    if prefixes is None and (
+                        pattern.groupindex
+                        or _BACKREFERENCE.search(pattern.pattern)
+                        or pattern.flags != default_flags
+                        or pattern.groups < 1
+                    ):
+                        # Não pode ser embutido no matcher combinado
+                        prefixes = []
+                    self.fields.setdefault(field, []).append((tier, pattern, prefixes))
+        self._matchers: Dict[tuple, Tuple[Pattern, Dict[int, int]]] = {}
+        self._lock = threading.Lock()
+
+    def _combined(self, keys: tuple) -> Tuple[Pattern, Dict[int, int]]:
+        """
+        Compila (uma única vez por combinação) o matcher dos padrões sem prefixo.
+
+        Cada padrão vira uma alternativa de lookahead, de modo que nenhuma
+        ocorrência é consumida pelas demais.
+
+        Returns:
+            Tupla (matcher, índice do grupo externo -> posição em keys)
+        """
+        with self._lock:
+            cached = self._matchers.get(keys)
+            if cached is not None:
+                return cached
+            patterns = [self.fields[field][i][1] for field, i in keys]
+            alternatives = "|".join(
+                f"(?=(?P<p{k}>{pattern.pattern}))" for k, pattern in enumerate(patterns)
+            )
+            # Guarda barata que descarta posições que não são dígito
+            if all(_starts_with_digit(pattern) for pattern in patterns):
+                alternatives = f"(?=\\d)(?:{alternatives})"
+            matcher = re.compile(alternatives)
+            groups = {matcher.groupindex[f"p{k}"]: k for k in range(len(keys))}
+            self._matchers[keys] = (matcher, groups)
+            return matcher, groups
+
+    def scan(
+        self, text: str, fields: Optional[Iterable[str]] = None
+    ) -> Dict[str, Tuple[str, str]]:
+        """
+        Extrai os campos do texto.
+
+        Args:
+            text: Texto extraído do PDF
+            fields: Campos a extrair (por padrão, todos os conhecidos)
+
+        Returns:
+            Dicionário campo -> (nível que encontrou o valor, valor)
+        """
+        found = {}
+        # Padrões sem prefixo que têm prioridade sobre o resultado já encontrado
+        pending: List[Tuple[str, int]] = []
+        for field in self.fields if fields is None else fields:
+            for i, (tier, pattern, prefixes) in enumerate(self.fields[field]):
+                if prefixes is None:
+                    pending.append((field, i))
+                    continue
+                match = _search_anchored(text, pattern, prefixes)
+                if match and match.group(1):
+                    found[field] = (tier, match.group(1).strip())
+                    break
+
+        if not pending:
+            return found
+
+        keys = tuple(pending)
+        matcher, groups = self._combined(keys)
+        by_field: Dict[str, List[int]] = {}
+        for k, (field, _) in enumerate(keys):
+            by_field.setdefault(field, []).append(k)
+        # Posição em keys -> valor da primeira ocorrência (None se o grupo for vazio)
+        results: Dict[int, Optional[str]] = {}
+
+        def decided(positions: List[int]) -> bool:
+            for k in positions:
+                if k not in results:
+                    return False
+                if results[k] is not None:
+                    return True
+            return True
+
+        for hit in matcher.finditer(text):
+            winner = groups[hit.lastindex]
+            start = hit.start()
+            for k, (field, i) in enumerate(keys):
+                # Alternativas anteriores à vencedora não casam nesta posição
+                if k < winner or k in results:
+                    continue
+                if k == winner:
+                    value = hit.group(hit.lastindex + 1)
+                else:
+                    match = self.fields[field][i][1].match(text, start)
+                    if not match:
+                        continue
+                    value = match.group(1)
+                results[k] = value.strip() if value else None
+            # Para assim que o padrão de maior prioridade de cada campo for conhecido
+            if all(decided(positions) for positions in by_field.values()):
+                break
+
+        # Os pendentes têm prioridade sobre o que foi encontrado por literais
+        for field, positions in by_field.items():
+            for k in positions:
+                if results.get(k) is not None:
+                    tier = self.fields[field][keys[k][1]][0]
+                    found[field] = (tier, results[k])
+                    break
+        return found
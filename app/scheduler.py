@@ -0,0 +1,196 @@
+import collections
+import math
+import statistics
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from app.metrics import SCHEDULER_QUEUE_DEPTH, SCHEDULER_REJECTED, SCHEDULER_WAIT_SECONDS
+
+# Classes de prioridade, da mais para a menos urgente
+INTERACTIVE = "interactive"  # /upload/, /reprocessar/
+EMAIL = "email"              # anexos recebidos pelo worker de e-mail
+BULK = "bulk"                # /processar-todos/, backlog da pasta, reextração
+PRIORITIES = (INTERACTIVE, EMAIL, BULK)
+
+
+def parse_weights(value: str) -> Dict[str, int]:
+    """Converte "interactive=8,email=3,bulk=1" em {"interactive": 8, ...}."""
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in PRIORITIES:
+            raise ValueError(f"Classe de prioridade desconhecida: {name}")
+        weights[name] = max(1, int(weight))
+    return {p: weights.get(p, 1) for p in PRIORITIES}
+
+
+class QueueFull(Exception):
+    """A fila da classe de prioridade está cheia; tente de novo em retry_after segundos."""
+
+    def __init__(self, priority: str, retry_after: int):
+        super().__init__(
+            f"Fila de extração '{priority}' cheia; tente novamente em {retry_after}s"
+        )
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+class _Task:
+    __slots__ = ("future", "fn", "args", "priority", "enqueued_at")
+
+    def __init__(self, future: Future, fn: Callable, args: Tuple, priority: str):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+
+
+class ExtractionScheduler:
+    """
+    Fila central de extração com classes de prioridade, na frente do executor.
+
+    Cada classe tem sua fila limitada a `capacity` tarefas. No máximo `slots`
+    tarefas (um por worker) ficam no executor ao mesmo tempo; quando um slot
+    libera, a próxima tarefa é escolhida por round-robin ponderado (smooth
+    weighted round-robin) entre as classes com tarefas na fila. Com os pesos
+    padrão (8/3/1) os uploads passam na frente, mas o backlog continua
+    andando mesmo com uploads chegando o tempo todo.
+
+    submit() com block=False falha com QueueFull (com uma estimativa de
+    quando tentar de novo) se a fila estiver cheia; com block=True aguarda
+    espaço, aplicando contrapressão a quem enfileira em massa.
+    """
+
+    def __init__(
+        self,
+        get_executor: Callable[[], Executor],
+        slots: int,
+        capacity: int,
+        weights: Optional[Dict[str, int]] = None,
+    ):
+        self.get_executor = get_executor
+        self.slots = max(1, slots)
+        self.capacity = capacity
+        self.weights = weights or {INTERACTIVE: 8, EMAIL: 3, BULK: 1}
+        self._queues: Dict[str, Deque[_Task]] = {p: collections.deque() for p in PRIORITIES}
+        self._current = {p: 0 for p in PRIORITIES}
+        self._running = 0
+        self._lock = threading.Lock()
+        self._space = threading.Condition(self._lock)
+        # Duração média de uma extração (média móvel), para o Retry-After
+        self._service_time = 1.0
+        self._waits: Dict[str, Deque[float]] = {p: collections.deque(maxlen=1000) for p in PRIORITIES}
+        for priority in PRIORITIES:
+            SCHEDULER_QUEUE_DEPTH.set_function(self._queues[priority].__len__, priority)
+
+    def submit(self, priority: str, fn: Callable, *args, block: bool = False,
+               timeout: Optional[float] = None) -> Future:
+        """
+        Enfileira fn(*args) na classe `priority`.
+
+        Returns:
+            Future com o resultado de fn; cancelar o Future antes de a tarefa
+            sair da fila a descarta
+
+        Raises:
+            QueueFull: fila cheia (block=False, ou block=True e timeout esgotado)
+        """
+        queue = self._queues[priority]
+        future = Future()
+        with self._lock:
+            if len(queue) >= self.capacity:
+                if block:
+                    self._space.wait_for(lambda: len(queue) < self.capacity, timeout)
+                if len(queue) >= self.capacity:
+                    SCHEDULER_REJECTED.inc(priority)
+                    raise QueueFull(priority, self._retry_after(priority))
+            queue.append(_Task(future, fn, args, priority))
+        self._dispatch()
+        return future
+
+    def _retry_after(self, priority: str) -> int:
+        """
+        Segundos estimados para esvaziar metade da fila da classe, dada a
+        fatia dos slots que ela recebe no round-robin.
+        """
+        ativos = sum(self.weights[p] for p in PRIORITIES if self._queues[p] or p == priority)
+        vazao = self.slots * self.weights[priority] / ativos / self._service_time
+        return max(1, math.ceil(len(self._queues[priority]) / 2 / vazao))
+
+    def _next_task(self) -> Optional[_Task]:
+        # Smooth weighted round-robin entre as classes com tarefas na fila
+        ready = [p for p in PRIORITIES if self._queues[p]]
+        if not ready:
+            return None
+        total = 0
+        for p in PRIORITIES:
+            if p not in ready:
+                # Classe ociosa não acumula crédito
+                self._current[p] = 0
+                continue
+            self._current[p] += self.weights[p]
+            total += self.weights[p]
+        chosen = max(ready, key=lambda p: self._current[p])
+        self._current[chosen] -= total
+        return self._queues[chosen].popleft()
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._lock:
+                if self._running >= self.slots:
+                    return
+                task = self._next_task()
+                if task is None:
+                    return
+                self._space.notify_all()
+                if not task.future.set_running_or_notify_cancel():
+                    continue
+                self._running += 1
+            wait = time.monotonic() - task.enqueued_at
+            SCHEDULER_WAIT_SECONDS.observe(wait, task.priority)
+            self._waits[task.priority].append(wait)
+            started = time.monotonic()
+            try:
+                inner = self.get_executor().submit(task.fn, *task.args)
+            except Exception as e:
+                task.future.set_exception(e)
+                self._finished(started)
+                continue
+            inner.add_done_callback(
+                lambda done, task=task, started=started: self._complete(task, done, started)
+            )
+
+    def _complete(self, task: _Task, done: Future, started: float) -> None:
+        self._finished(started)
+        if done.cancelled():
+            task.future.set_exception(RuntimeError("Extração cancelada"))
+        elif done.exception() is not None:
+            task.future.set_exception(done.exception())
+        else:
+            task.future.set_result(done.result())
+        self._dispatch()
+
+    def _finished(self, started: float) -> None:
+        with self._lock:
+            self._running -= 1
+            self._service_time = 0.9 * self._service_time + 0.1 * (time.monotonic() - started)
+
+    def stats(self) -> Dict:
+        """Profundidade das filas, tarefas em execução e espera na fila (p50/p95, ms) por classe."""
+        with self._lock:
+            result = {"running": self._running, "slots": self.slots,
+                      "service_time_ms": round(self._service_time * 1000, 1), "classes": {}}
+            for p in PRIORITIES:
+                waits = sorted(self._waits[p])
+                result["classes"][p] = {
+                    "queued": len(self._queues[p]),
+                    "capacity": self.capacity,
+                    "weight": self.weights[p],
+                    "wait_p50_ms": round(statistics.median(waits) * 1000, 1) if waits else None,
+                    "wait_p95_ms": round(waits[int(0.95 * (len(waits) - 1))] * 1000, 1) if waits else None,
+                }
+        return result
@@ -0,0 +1,385 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import Config
+from app.models import BoletoData
+
+logger = logging.getLogger("boleto_processor")
+
+# Colunas persistidas, na mesma ordem dos campos de BoletoData
+COLUMNS = list(BoletoData.FIELDS)
+
+# Arquivos por consulta com "IN (...)" (o SQLite limita os parâmetros)
+_IN_BATCH = 500
+
+
+class ResultStore(ABC):
+    """
+    Interface dos repositórios de boletos extraídos.
+
+    Cada boleto é identificado pelo caminho do arquivo de origem.
+    """
+
+    @abstractmethod
+    def unprocessed(self, arquivos: List[str]) -> List[str]:
+        """
+        Dos arquivos informados, os que ainda não foram gravados nem estão em quarentena.
+
+        A consulta usa o índice por arquivo: o custo depende só da quantidade
+        de arquivos informados, não do histórico gravado.
+
+        Returns:
+            Os arquivos pendentes, na ordem recebida
+        """
+
+    @abstractmethod
+    def add_many(self, records: Iterable[Dict], owner: Optional[str] = None) -> int:
+        """
+        Grava um lote de boletos em uma única transação.
+
+        Com owner, a mesma transação encerra as reservas de owner sobre os
+        arquivos gravados, e os arquivos reservados por outro dono (reserva
+        ainda válida) não são gravados: o resultado deles é do outro dono.
+
+        Returns:
+            Quantidade de boletos gravados
+        """
+
+    @abstractmethod
+    def get(self, arquivo: str) -> Optional[Dict]:
+        """Retorna o boleto extraído de um arquivo."""
+
+    @abstractmethod
+    def all(self) -> List[Dict]:
+        """Retorna todos os boletos, na ordem em que foram gravados."""
+
+    @abstractmethod
+    def iter_batches(self, batch_size: int = 5000) -> Iterator[List[tuple]]:
+        """
+        Percorre todos os boletos em lotes de tuplas, na ordem de COLUMNS.
+
+        Usado na exportação em massa: só um lote fica em memória por vez.
+        """
+
+    @abstractmethod
+    def version(self) -> int:
+        """Número de sequência da última gravação (0 se o repositório está vazio)."""
+
+    @abstractmethod
+    def changes_since(self, seq: int, batch_size: int = 5000) -> List[Tuple[int, int, tuple]]:
+        """
+        Boletos gravados ou atualizados depois da sequência `seq`.
+
+        Returns:
+            Até batch_size tuplas (id, seq, linha na ordem de COLUMNS), em ordem de seq
+        """
+
+    @abstractmethod
+    def quarantine(self, arquivo: str, motivo: str, detalhe: str) -> None:
+        """Coloca um arquivo na quarentena: ele deixa de ser extraído até ser liberado."""
+
+    @abstractmethod
+    def quarantined(self) -> List[Dict]:
+        """Arquivos em quarentena, com motivo, detalhe e data."""
+
+    @abstractmethod
+    def release(self, arquivo: str) -> bool:
+        """Tira um arquivo da quarentena; retorna False se ele não estava nela."""
+
+    @abstractmethod
+    def claim(self, arquivos: List[str], owner: str, ttl: float) -> List[str]:
+        """
+        Reserva arquivos para extração por `owner` durante ttl segundos.
+
+        Arquivos já gravados, em quarentena ou com reserva válida de outro
+        dono ficam de fora; uma reserva vencida (ex.: processo que caiu)
+        pode ser tomada.
+
+        Returns:
+            Os arquivos reservados, na ordem recebida
+        """
+
+    @abstractmethod
+    def renew_claims(self, owner: str, ttl: float) -> int:
+        """Estende por ttl segundos todas as reservas de owner; retorna quantas."""
+
+    @abstractmethod
+    def release_claims(self, owner: str, arquivos: Optional[List[str]] = None) -> int:
+        """Desfaz reservas de owner (todas, se arquivos for None); retorna quantas."""
+
+    def close(self) -> None:
+        pass
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """
+        Importa os boletos de um arquivo JSON no formato antigo (boleto_data.json).
+
+        Args:
+            json_path: Caminho do arquivo JSON
+
+        Returns:
+            Quantidade de boletos importados
+        """
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return self.add_many(data)
+
+
+class SQLiteResultStore(ResultStore):
+    """
+    Repositório em SQLite, com índices por arquivo, codigo_barras e vencimento.
+
+    Cada gravação recebe um número de sequência (coluna seq) maior que o de
+    todas as anteriores, inclusive quando atualiza um boleto já existente,
+    o que permite acompanhar as alterações com changes_since().
+
+    As reservas (tabela reservas) coordenam vários processos usando o mesmo
+    banco (uvicorn --workers, réplicas da API, o worker de e-mail): cada
+    arquivo pendente é extraído por quem o reservou. Os prazos usam o
+    relógio do sistema, comum aos processos.
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            columns = ", ".join(
+                f"{c} TEXT UNIQUE NOT NULL" if c == "arquivo" else f"{c} TEXT"
+                for c in COLUMNS
+            )
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS boletos "
+                f"(id INTEGER PRIMARY KEY AUTOINCREMENT, {columns})"
+            )
+            # Colunas adicionadas ao BoletoData depois da criação da tabela
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(boletos)")}
+            for column in COLUMNS:
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE boletos ADD COLUMN {column} TEXT")
+            if "seq" not in existing:
+                self._conn.execute("ALTER TABLE boletos ADD COLUMN seq INTEGER")
+                self._conn.execute("UPDATE boletos SET seq = id")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_boletos_codigo_barras ON boletos (codigo_barras)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_boletos_vencimento ON boletos (vencimento)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_boletos_seq ON boletos (seq)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS quarentena "
+                "(arquivo TEXT PRIMARY KEY, motivo TEXT, detalhe TEXT, criado_em TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS reservas "
+                "(arquivo TEXT PRIMARY KEY, dono TEXT NOT NULL, expira_em REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_reservas_dono ON reservas (dono)")
+
+    def _rows(self, sql: str, params: tuple = ()) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [{c: row[c] for c in COLUMNS} for row in rows]
+
+    def unprocessed(self, arquivos: List[str]) -> List[str]:
+        conhecidos = set()
+        with self._lock:
+            for i in range(0, len(arquivos), _IN_BATCH):
+                lote = arquivos[i:i + _IN_BATCH]
+                marcadores = ", ".join("?" for _ in lote)
+                conhecidos.update(row[0] for row in self._conn.execute(
+                    f"SELECT arquivo FROM boletos WHERE arquivo IN ({marcadores}) "
+                    f"UNION SELECT arquivo FROM quarentena WHERE arquivo IN ({marcadores})",
+                    (*lote, *lote),
+                ))
+        return [arquivo for arquivo in arquivos if arquivo not in conhecidos]
+
+    def add_many(self, records: Iterable[Dict], owner: Optional[str] = None) -> int:
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in COLUMNS + ["seq"] if c != "arquivo")
+        sql = (
+            f"INSERT INTO boletos ({', '.join(COLUMNS)}, seq) VALUES ({placeholders}, ?) "
+            f"ON CONFLICT(arquivo) DO UPDATE SET {updates}"
+        )
+        rows = [tuple(record.get(c) for c in COLUMNS) for record in records]
+        if not rows:
+            return 0
+        arquivo = COLUMNS.index("arquivo")
+        with self._lock, self._conn:
+            # BEGIN IMMEDIATE: outro processo não grava entre a leitura de
+            # MAX(seq) e o insert
+            self._conn.execute("BEGIN IMMEDIATE")
+            if owner is not None:
+                arquivos = [row[arquivo] for row in rows]
+                alheios = set()
+                for i in range(0, len(arquivos), _IN_BATCH):
+                    lote = arquivos[i:i + _IN_BATCH]
+                    alheios.update(r[0] for r in self._conn.execute(
+                        f"SELECT arquivo FROM reservas WHERE dono != ? AND expira_em >= ? "
+                        f"AND arquivo IN ({', '.join('?' for _ in lote)})",
+                        (owner, time.time(), *lote),
+                    ))
+                    self._conn.execute(
+                        f"DELETE FROM reservas WHERE dono = ? "
+                        f"AND arquivo IN ({', '.join('?' for _ in lote)})",
+                        (owner, *lote),
+                    )
+                if alheios:
+                    logger.warning(f"{len(alheios)} boletos reservados por outro processo não gravados")
+                    rows = [row for row in rows if row[arquivo] not in alheios]
+            seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM boletos").fetchone()[0]
+            self._conn.executemany(sql, [row + (seq + i,) for i, row in enumerate(rows, 1)])
+        return len(rows)
+
+    def get(self, arquivo: str) -> Optional[Dict]:
+        rows = self._rows(
+            f"SELECT {', '.join(COLUMNS)} FROM boletos WHERE arquivo = ?", (arquivo,)
+        )
+        return rows[0] if rows else None
+
+    def all(self) -> List[Dict]:
+        return self._rows(f"SELECT {', '.join(COLUMNS)} FROM boletos ORDER BY id")
+
+    def iter_batches(self, batch_size: int = 5000) -> Iterator[List[tuple]]:
+        # Paginação pelo id: o lock é liberado entre um lote e outro
+        sql = (
+            f"SELECT id, {', '.join(COLUMNS)} FROM boletos "
+            f"WHERE id > ? ORDER BY id LIMIT ?"
+        )
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(sql, (last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [tuple(row)[1:] for row in rows]
+            if len(rows) < batch_size:
+                return
+
+    def version(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM boletos").fetchone()[0]
+
+    def changes_since(self, seq: int, batch_size: int = 5000) -> List[Tuple[int, int, tuple]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, seq, {', '.join(COLUMNS)} FROM boletos "
+                f"WHERE seq > ? ORDER BY seq LIMIT ?",
+                (seq, batch_size),
+            ).fetchall()
+        return [(row[0], row[1], tuple(row)[2:]) for row in rows]
+
+    def quarantine(self, arquivo: str, motivo: str, detalhe: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO quarentena (arquivo, motivo, detalhe, criado_em) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT(arquivo) DO UPDATE SET "
+                "motivo = excluded.motivo, detalhe = excluded.detalhe, criado_em = excluded.criado_em",
+                (arquivo, motivo, detalhe, datetime.now().isoformat(timespec="seconds")),
+            )
+
+    def quarantined(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT arquivo, motivo, detalhe, criado_em FROM quarentena ORDER BY criado_em"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def release(self, arquivo: str) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM quarentena WHERE arquivo = ?", (arquivo,))
+        return cursor.rowcount > 0
+
+    def claim(self, arquivos: List[str], owner: str, ttl: float) -> List[str]:
+        agora = time.time()
+        sql = (
+            "INSERT INTO reservas (arquivo, dono, expira_em) SELECT ?, ?, ? "
+            "WHERE NOT EXISTS (SELECT 1 FROM boletos WHERE arquivo = ?) "
+            "AND NOT EXISTS (SELECT 1 FROM quarentena WHERE arquivo = ?) "
+            "ON CONFLICT(arquivo) DO UPDATE SET dono = excluded.dono, expira_em = excluded.expira_em "
+            "WHERE reservas.dono = excluded.dono OR reservas.expira_em < ?"
+        )
+        claimed = []
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            for arquivo in arquivos:
+                cursor = self._conn.execute(
+                    sql, (arquivo, owner, agora + ttl, arquivo, arquivo, agora)
+                )
+                if cursor.rowcount > 0:
+                    claimed.append(arquivo)
+        return claimed
+
+    def renew_claims(self, owner: str, ttl: float) -> int:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE reservas SET expira_em = ? WHERE dono = ?", (time.time() + ttl, owner)
+            )
+        return cursor.rowcount
+
+    def release_claims(self, owner: str, arquivos: Optional[List[str]] = None) -> int:
+        total = 0
+        with self._lock, self._conn:
+            if arquivos is None:
+                return self._conn.execute("DELETE FROM reservas WHERE dono = ?", (owner,)).rowcount
+            for i in range(0, len(arquivos), _IN_BATCH):
+                lote = arquivos[i:i + _IN_BATCH]
+                total += self._conn.execute(
+                    f"DELETE FROM reservas WHERE dono = ? "
+                    f"AND arquivo IN ({', '.join('?' for _ in lote)})",
+                    (owner, *lote),
+                ).rowcount
+        return total
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+STORE_BACKENDS = {
+    "sqlite": lambda config: SQLiteResultStore(config.db_file),
+}
+
+
+def create_store(config: Config) -> ResultStore:
+    """
+    Cria o repositório configurado e migra o boleto_data.json antigo, se existir.
+
+    Após a migração o arquivo JSON é renomeado para '<nome>.migrated', de modo
+    que a importação acontece uma única vez.
+    """
+    try:
+        factory = STORE_BACKENDS[config.store_backend]
+    except KeyError:
+        raise ValueError(f"Backend de armazenamento desconhecido: {config.store_backend}")
+    store = factory(config)
+
+    if config.output_file and os.path.exists(config.output_file):
+        # Vários processos podem iniciar juntos: o rename atômico escolhe
+        # um único processo para migrar
+        migrando = f"{config.output_file}.{os.getpid()}.migrating"
+        try:
+            os.replace(config.output_file, migrando)
+        except FileNotFoundError:
+            return store
+        try:
+            total = store.migrate_from_json(migrando)
+            os.replace(migrando, f"{config.output_file}.migrated")
+            logger.info(f"Migrados {total} boletos de '{config.output_file}'")
+        except Exception as e:
+            os.replace(migrando, config.output_file)
+            logger.error(f"Erro ao migrar '{config.output_file}': {str(e)}")
+
+    return store
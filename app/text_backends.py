@@ -0,0 +1,147 @@
+import importlib
+import importlib.util
+from typing import Optional, Tuple
+
+# Região de uma página em frações da largura/altura: (x0, topo, x1, base),
+# medidas a partir do canto superior esquerdo
+CropBox = Tuple[float, float, float, float]
+
+
+class TextDocument:
+    """PDF aberto por um TextBackend; o texto é extraído página a página."""
+
+    page_count: int = 0
+
+    def page_text(self, index: int, crop: Optional[CropBox] = None) -> str:
+        """Texto da página `index` (a partir de 0), opcionalmente só da região `crop`."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "TextDocument":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class TextBackend:
+    """Interface das bibliotecas de extração de texto de PDF."""
+
+    name = ""
+    # Módulos carregados por preload()
+    modules: Tuple[str, ...] = ()
+
+    def open(self, path: str) -> TextDocument:
+        raise NotImplementedError
+
+    def preload(self) -> None:
+        """
+        Importa antecipadamente a biblioteca do backend.
+
+        Chamado antes de criar o pool de processos, para que os workers já
+        nasçam (fork) com os módulos carregados.
+        """
+        for module in self.modules:
+            importlib.import_module(module)
+
+
+class _PdfplumberDocument(TextDocument):
+    def __init__(self, path: str):
+        # Importado na primeira utilização (ou em preload()): importar a API
+        # não paga o import do pdfminer
+        import pdfplumber
+
+        self._pdf = pdfplumber.open(path)
+        self._pages = self._pdf.pages
+        self.page_count = len(self._pages)
+
+    def page_text(self, index: int, crop: Optional[CropBox] = None) -> str:
+        page = self._pages[index]
+        if crop is not None:
+            x0, top, x1, bottom = crop
+            page = page.crop((
+                page.bbox[0] + x0 * page.width, page.bbox[1] + top * page.height,
+                page.bbox[0] + x1 * page.width, page.bbox[1] + bottom * page.height,
+            ))
+        return page.extract_text() or ""
+
+    def close(self) -> None:
+        self._pdf.close()
+
+
+class PdfplumberBackend(TextBackend):
+    """pdfplumber (pdfminer): o layout de texto para o qual os padrões foram escritos."""
+
+    name = "pdfplumber"
+    modules = ("pdfplumber", "pdfminer.layout", "pdfminer.pdfinterp")
+
+    def open(self, path: str) -> TextDocument:
+        return _PdfplumberDocument(path)
+
+
+class _PdfiumDocument(TextDocument):
+    def __init__(self, pdf):
+        self._pdf = pdf
+        self.page_count = len(self._pdf)
+
+    def page_text(self, index: int, crop: Optional[CropBox] = None) -> str:
+        page = self._pdf[index]
+        try:
+            textpage = page.get_textpage()
+            try:
+                if crop is None:
+                    text = textpage.get_text_range()
+                else:
+                    # Coordenadas do PDF: origem no canto inferior esquerdo
+                    width, height = page.get_size()
+                    x0, top, x1, bottom = crop
+                    text = textpage.get_text_bounded(
+                        left=x0 * width, bottom=height - bottom * height,
+                        right=x1 * width, top=height - top * height,
+                    )
+            finally:
+                textpage.close()
+        finally:
+            page.close()
+        return text.replace("\r\n", "\n")
+
+    def close(self) -> None:
+        self._pdf.close()
+
+
+class PdfiumBackend(TextBackend):
+    """
+    PDFium (pypdfium2): bem mais rápido que o pdfminer.
+
+    A ordem das linhas é a mesma do pdfplumber na maioria dos boletos, mas o
+    espaçamento pode diferir em layouts com colunas.
+    """
+
+    name = "pdfium"
+    modules = ("pypdfium2",)
+
+    def __init__(self):
+        if importlib.util.find_spec("pypdfium2") is None:
+            raise ValueError("Backend de texto 'pdfium' requer o pacote pypdfium2")
+
+    def open(self, path: str) -> TextDocument:
+        # Importado na primeira utilização (ou em preload()), como o pdfplumber
+        import pypdfium2 as pdfium
+
+        return _PdfiumDocument(pdfium.PdfDocument(path))
+
+
+TEXT_BACKENDS = {
+    "pdfplumber": PdfplumberBackend,
+    "pdfium": PdfiumBackend,
+}
+
+
+def create_text_backend(name: str) -> TextBackend:
+    try:
+        factory = TEXT_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Backend de texto desconhecido: {name}")
+    return factory()
@@ -0,0 +1,89 @@
+import json
+import sqlite3
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+
+class TextStore:
+    """
+    Texto extraído de cada PDF, comprimido e endereçado pelo conteúdo.
+
+    O texto fica na tabela textos, uma linha por SHA-256 do PDF (o mesmo
+    boleto recebido várias vezes é guardado uma vez só), com as páginas
+    lidas comprimidas com zlib. A tabela arquivos liga cada caminho ao hash
+    do seu conteúdo. Com isso os padrões podem ser reaplicados a todo o
+    histórico sem abrir os PDFs de novo.
+
+    No modo de extração "early" nem todas as páginas são lidas; apenas as
+    páginas lidas inteiras são guardadas (não o texto de uma região de
+    corte), junto com o total de páginas do documento.
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS textos ("
+                "sha256 TEXT PRIMARY KEY, backend TEXT, paginas INTEGER, "
+                "lidas INTEGER, conteudo BLOB)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS arquivos (arquivo TEXT PRIMARY KEY, sha256 TEXT NOT NULL)"
+            )
+
+    def put(self, arquivo: str, sha256: str, backend: str, page_count: int, pages: Dict[int, str]) -> None:
+        """
+        Guarda as páginas lidas de um PDF.
+
+        Um texto já guardado para o mesmo conteúdo só é substituído por outro
+        com pelo menos a mesma quantidade de páginas lidas.
+        """
+        conteudo = zlib.compress(
+            json.dumps({str(i): text for i, text in pages.items()}, ensure_ascii=False).encode("utf-8")
+        )
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO textos (sha256, backend, paginas, lidas, conteudo) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(sha256) DO UPDATE SET "
+                "backend = excluded.backend, paginas = excluded.paginas, "
+                "lidas = excluded.lidas, conteudo = excluded.conteudo "
+                "WHERE excluded.lidas >= textos.lidas",
+                (sha256, backend, page_count, len(pages), conteudo),
+            )
+            self._conn.execute(
+                "INSERT INTO arquivos (arquivo, sha256) VALUES (?, ?) "
+                "ON CONFLICT(arquivo) DO UPDATE SET sha256 = excluded.sha256",
+                (arquivo, sha256),
+            )
+
+    def get(self, arquivo: str) -> Optional[Tuple[int, Dict[int, str]]]:
+        """
+        Returns:
+            (total de páginas do PDF, {página: texto} das páginas lidas) ou
+            None se não houver texto guardado para o arquivo
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT t.paginas, t.conteudo FROM arquivos a "
+                "JOIN textos t ON t.sha256 = a.sha256 WHERE a.arquivo = ?",
+                (arquivo,),
+            ).fetchone()
+        if row is None:
+            return None
+        pages = json.loads(zlib.decompress(row[1]).decode("utf-8"))
+        return row[0], {int(i): text for i, text in pages.items()}
+
+    def files(self) -> List[str]:
+        """Arquivos com texto guardado."""
+        with self._lock:
+            rows = self._conn.execute("SELECT arquivo FROM arquivos ORDER BY arquivo").fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
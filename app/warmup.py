@@ -0,0 +1,70 @@
+import os
+import tempfile
+from typing import List
+
+# Boleto mínimo (layout padrão, linha digitável válida) usado para aquecer
+# os workers de extração antes da primeira requisição
+WARMUP_BOLETO = [
+    "BANCO BRADESCO S.A. | 237-9 | 23798.15901 83016.613180 60913.909960 6 12930000342277",
+    "Local de Pagamento Vencimento",
+    "PAGAVEL EM QUALQUER BANCO ATE O VENCIMENTO 12/12/2025",
+    "Beneficiário Agência / Código Beneficiário",
+    "EMPRESA EXEMPLO LTDA 1234/56789-0",
+    "Data Documento Número Documento Espécie Doc. Aceite Data Processamento",
+    "28/11/2025 961168 DM N 28/11/2025",
+    "Valor do Documento 3.422,77",
+    "Pagador FULANO DE TAL",
+    "FULANO DE TAL CPF 000.000.000-00",
+    "Autenticação mecânica - Ficha de Compensação",
+]
+
+
+def build_pdf(pages: List[List[str]]) -> bytes:
+    """Monta um PDF mínimo com uma linha de texto por item de cada página."""
+    objs: List[bytes] = []
+
+    def add(obj: bytes) -> int:
+        objs.append(obj)
+        return len(objs)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+               b"/Encoding /WinAnsiEncoding >>")
+    pages_id = len(objs) + 1 + 2 * len(pages)
+    kids = []
+    for lines in pages:
+        ops = ["BT /F1 9 Tf 12 TL 30 810 Td"]
+        for line in lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({escaped}) Tj T*")
+        ops.append("ET")
+        data = "\n".join(ops).encode("latin-1")
+        contents = add(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, font, contents)
+        ))
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>"
+        % (b" ".join(b"%d 0 R" % k for k in kids), len(kids)))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += (b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(objs) + 1, catalog, xref))
+    return bytes(out)
+
+
+def write_warmup_pdf() -> str:
+    """Grava o boleto de aquecimento em um arquivo temporário e retorna o caminho."""
+    fd, path = tempfile.mkstemp(prefix="boleto_warmup_", suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(build_pdf([WARMUP_BOLETO]))
+    return path
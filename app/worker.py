@@ -1,16 +1,51 @@
 import time
 import os
+from app.config import Config
 from app.getemails import monitorar_emails
+from app.metrics import IMAP_FAILURES, start_http_server
+from app.pipeline import ExtractionPipeline
+from app.processor import BoletoProcessor
 from app.core.settings import settings
 
 def start_worker():
     intervalo = settings.EMAIL_CHECK_INTERVAL  # segundos
 
-    print(f"[Worker] Iniciando com intervalo de {intervalo} segundos")
-    while True:
+    # Os anexos salvos vão direto para a fila de extração, sem esperar por
+    # uma chamada a /processar-todos/
+    config = Config()
+    processor = BoletoProcessor(config)
+    if config.warmup:
+        # Workers de extração aquecidos antes do primeiro anexo
         try:
-            print("[Worker] Verificando novos e-mails...")
-            monitorar_emails()
+            processor.warm_up()
         except Exception as e:
-            print(f"[Worker] Erro: {e}")
-        time.sleep(intervalo)
+            print(f"[Worker] Falha ao aquecer os workers de extração: {e}")
+    pipeline = ExtractionPipeline(processor)
+    pipeline.start()
+    if settings.WATCH_ANEXOS:
+        pipeline.watch(config.anexos_dir)
+
+    if settings.METRICS_PORT:
+        start_http_server(settings.METRICS_PORT)
+        print(f"[Worker] Métricas em http://0.0.0.0:{settings.METRICS_PORT}/metrics")
+
+    if settings.WATCH_ANEXOS:
+        # Backlog da pasta com prioridade baixa: anexos novos passam na frente.
+        # Enfileirado em segundo plano, sem atrasar o monitoramento de e-mail
+        pipeline.submit_pending()
+
+    print(f"[Worker] Iniciando com intervalo de {intervalo} segundos")
+    try:
+        while True:
+            # monitorar_emails mantém uma thread por fonte de e-mail, cada uma
+            # com sua sessão e reconexão; só retorna aqui em caso de erro
+            # inesperado (ex.: IMAP_FONTES inválido)
+            try:
+                monitorar_emails(ao_salvar=pipeline.submit)
+            except Exception as e:
+                IMAP_FAILURES.inc(type(e).__name__)
+                print(f"[Worker] Erro: {e}")
+                time.sleep(intervalo)
+    finally:
+        pipeline.stop()
+        processor.shutdown()
@@ -0,0 +1,84 @@
+"""
+Micro-benchmark do extrator de campos: cascata de regex (nível a nível)
+versus o FieldScanner de passada única, sobre o texto de um documento.
+
+Uso:
+    python -m benchmarks.bench_scanner [--repeat N]
+"""
+import argparse
+import timeit
+
+from app.processor import BoletoProcessor
+
+# Texto típico de um boleto bancário, precedido por um demonstrativo
+STANDARD_TEXT = (
+    "Demonstrativo de cobrança referente ao período\n" * 40
+    + "Banco Exemplo 341-7 34191.79001 01043.510047 91020.150008 1 90010000012345\n"
+    "Local de Pagamento Vencimento\n"
+    "PAGAVEL EM QUALQUER BANCO ATE O VENCIMENTO 10/05/2024\n"
+    "Beneficiário Agência / Código Beneficiário\n"
+    "EMPRESA EXEMPLO LTDA 1234/56789-0\n"
+    "Data Documento Número Documento Espécie Doc. Aceite Data Processamento\n"
+    "01/04/2024 123456 DM N 01/04/2024\n"
+    "Valor do Documento 1.234,56\n"
+    "Pagador FULANO DE TAL\n"
+    "FULANO DE TAL CPF 000.000.000-00\n"
+)
+
+# Boleto sem "Valor do Documento": o valor só aparece no nível de moeda
+MISSING_VALOR_TEXT = (
+    "Demonstrativo de cobrança referente ao período\n" * 40
+    + "Beneficiário: OPERADORA DE SAUDE SA\n"
+    "Pagador CPF/CNPJ: 000.000.000-00\n"
+    "FULANO DE TAL\n"
+    "Data Documento Número Documento 01/04/2024\n"
+    "Total a pagar R$ 789,10\n"
+)
+
+
+def cascade(text):
+    """Reprodução da extração nível a nível usada antes do FieldScanner."""
+    found = {}
+    for patterns in (
+        BoletoProcessor.PATTERNS,
+        BoletoProcessor.ALT_PATTERNS,
+        BoletoProcessor.EXTRA_PATTERNS,
+    ):
+        for field, pattern in patterns.items():
+            if found.get(field) is None:
+                match = pattern.search(text)
+                if match and match.group(1):
+                    found[field] = match.group(1).strip()
+    for patterns in (BoletoProcessor.HEALTH_PATTERNS, BoletoProcessor.CURRENCY_PATTERNS):
+        if found.get("valor") is None:
+            for pattern in patterns["valor"]:
+                match = pattern.search(text)
+                if match and match.group(1):
+                    found["valor"] = match.group(1).strip()
+                    break
+    return found
+
+
+def scanner(text):
+    return {
+        field: value for field, (_, value) in BoletoProcessor.SCANNER.scan(text).items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    for name, text in (("padrao", STANDARD_TEXT), ("sem_valor", MISSING_VALOR_TEXT)):
+        assert cascade(text) == scanner(text), name
+        old = timeit.timeit(lambda: cascade(text), number=args.repeat) / args.repeat
+        new = timeit.timeit(lambda: scanner(text), number=args.repeat) / args.repeat
+        print(
+            f"{name}: cascata {old * 1e6:.1f} us | passada única {new * 1e6:.1f} us "
+            f"| {old / new:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
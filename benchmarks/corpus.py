@@ -0,0 +1,179 @@
+"""
+Corpus sintético e reprodutível de boletos em PDF para os benchmarks.
+
+Gera PDFs nos layouts tratados pelo BoletoProcessor, sem dependências além
+da biblioteca padrão, junto com um manifest.json com os valores esperados
+de cada arquivo:
+
+    padrao        - boleto bancário com "Valor do Documento" e linha digitável
+    beneficiario  - layout alternativo com "Beneficiário:" e "Pagador CPF/CNPJ:"
+    saude         - boleto de plano de saúde (AMIL), sem linha digitável
+    multipagina   - demonstrativo em várias páginas seguido do boleto padrão
+
+Uso:
+    python -m benchmarks.corpus DESTINO [--count N] [--seed S]
+"""
+import argparse
+import json
+import os
+import random
+from datetime import date, timedelta
+from typing import Dict, List
+
+from app.barcode import DATA_BASE_FATOR, DATA_BASE_FATOR_2025, modulo10, modulo11
+from app.warmup import build_pdf
+
+LAYOUTS = ("padrao", "beneficiario", "saude", "multipagina")
+
+BANCOS = {"001": "BANCO DO BRASIL S.A.", "033": "BANCO SANTANDER S.A.",
+          "104": "CAIXA ECONOMICA FEDERAL", "237": "BANCO BRADESCO S.A.",
+          "341": "ITAU UNIBANCO S.A."}
+EMPRESAS = ("EMPRESA EXEMPLO LTDA", "CONDOMINIO EDIFICIO AURORA", "ESCOLA NOVO SABER",
+            "ENERGIA DISTRIBUIDORA SA", "TELECOM SERVICOS LTDA", "ACADEMIA CORPO LIVRE")
+NOMES = ("FULANO DE TAL", "MARIA DA SILVA", "JOAO PEREIRA SOUZA", "ANA CAROLINA LIMA",
+         "CARLOS EDUARDO ROCHA", "BEATRIZ COSTA MENDES")
+
+
+def make_pdf(pages: List[List[str]], path: str) -> None:
+    """Grava um PDF mínimo com uma linha de texto por item de cada página."""
+    with open(path, "wb") as f:
+        f.write(build_pdf(pages))
+
+
+def linha_digitavel(banco: str, vencimento: date, centavos: int, rng: random.Random) -> str:
+    """Monta uma linha digitável válida (dígitos módulo 10 e módulo 11 corretos)."""
+    fator = (vencimento - DATA_BASE_FATOR).days
+    if fator > 9999:
+        fator = (vencimento - DATA_BASE_FATOR_2025).days
+    livre = "".join(rng.choice("0123456789") for _ in range(25))
+    valor = f"{centavos:010d}"
+    dv = modulo11(banco + "9" + f"{fator:04d}" + valor + livre)
+    campos = [banco + "9" + livre[:5], livre[5:15], livre[15:]]
+    c1, c2, c3 = (campo + str(modulo10(campo)) for campo in campos)
+    return f"{c1[:5]}.{c1[5:]} {c2[:5]}.{c2[5:]} {c3[:5]}.{c3[5:]} {dv} {fator:04d}{valor}"
+
+
+def _moeda(centavos: int) -> str:
+    return f"{centavos / 100:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def _boleto_padrao(d: Dict) -> List[str]:
+    return [
+        f"{BANCOS[d['banco']]} | {d['banco']}-9 | {d['linha']}",
+        "Local de Pagamento Vencimento",
+        f"PAGAVEL EM QUALQUER BANCO ATE O VENCIMENTO {d['vencimento']:%d/%m/%Y}",
+        "Beneficiário Agência / Código Beneficiário",
+        f"{d['beneficiario']} 1234/56789-0",
+        "Data Documento Número Documento Espécie Doc. Aceite Data Processamento",
+        f"{d['emissao']:%d/%m/%Y} {d['documento']} DM N {d['emissao']:%d/%m/%Y}",
+        f"Valor do Documento {_moeda(d['centavos'])}",
+        f"Pagador {d['pagador']}",
+        f"{d['pagador']} CPF 000.000.000-00",
+        "Autenticação mecânica - Ficha de Compensação",
+    ]
+
+
+def _boleto_beneficiario(d: Dict) -> List[str]:
+    return [
+        f"{BANCOS[d['banco']]} {d['banco']}-9 {d['linha']}",
+        "Local de Pagamento Vencimento",
+        f"Pagável em qualquer banco até o vencimento {d['vencimento']:%d/%m/%Y}",
+        f"Beneficiário: {d['beneficiario']}",
+        "Pagador CPF/CNPJ: 000.000.000-00",
+        d["pagador"],
+        f"Data Documento Número Documento {d['emissao']:%d/%m/%Y} {d['documento']}",
+        f"(=) Valor cobrado {_moeda(d['centavos'])}",
+    ]
+
+
+def _boleto_saude(d: Dict) -> List[str]:
+    return [
+        "AMIL ASSISTENCIA MEDICA INTERNACIONAL S.A.",
+        f"Beneficiário: {d['beneficiario']}",
+        f"Titular: {d['pagador']}",
+        "Local de Pagamento Vencimento",
+        f"Pagável preferencialmente na rede bancária {d['vencimento']:%d/%m/%Y}",
+        f"Mensalidade referente a {d['emissao']:%m/%Y}",
+        f"Valor a pagar R$ {_moeda(d['centavos'])}",
+    ]
+
+
+def _demonstrativo(d: Dict, rng: random.Random, linhas: int = 60) -> List[str]:
+    return [
+        f"{d['emissao']:%d/%m/%Y} Consumo item {i:03d} referente ao período "
+        f"{rng.randint(1, 999):03d} {_moeda(rng.randint(100, 99999))}"
+        for i in range(linhas)
+    ]
+
+
+def gerar_documento(layout: str, rng: random.Random) -> Dict:
+    """Sorteia os dados de um boleto e retorna as páginas e os valores esperados."""
+    emissao = date(2025, 1, 1) + timedelta(days=rng.randint(0, 700))
+    vencimento = emissao + timedelta(days=rng.randint(5, 40))
+    d = {
+        "banco": rng.choice(sorted(BANCOS)),
+        "vencimento": vencimento,
+        "emissao": emissao,
+        "centavos": rng.randint(1000, 500000),
+        "beneficiario": rng.choice(EMPRESAS),
+        "pagador": rng.choice(NOMES),
+        "documento": rng.randint(100000, 999999),
+    }
+    d["linha"] = linha_digitavel(d["banco"], vencimento, d["centavos"], rng)
+
+    if layout == "padrao":
+        pages = [_boleto_padrao(d)]
+    elif layout == "beneficiario":
+        pages = [_boleto_beneficiario(d)]
+    elif layout == "saude":
+        pages = [_boleto_saude(d)]
+    elif layout == "multipagina":
+        pages = [_demonstrativo(d, rng) for _ in range(rng.randint(2, 4))] + [_boleto_padrao(d)]
+    else:
+        raise ValueError(f"Layout desconhecido: {layout}")
+
+    expected = {
+        "vencimento": vencimento.isoformat(),
+        "valor": f"{d['centavos'] // 100}.{d['centavos'] % 100:02d}",
+        "codigo_barras": None if layout == "saude" else d["linha"].replace(" ", ""),
+    }
+    return {"pages": pages, "expected": expected}
+
+
+def gerar_corpus(destino: str, count: int = 40, seed: int = 1234) -> List[Dict]:
+    """
+    Gera `count` PDFs em `destino`, distribuídos igualmente entre os layouts.
+
+    O mesmo seed produz sempre os mesmos arquivos. Um manifest.json com
+    arquivo, layout e valores esperados é gravado junto.
+
+    Returns:
+        Entradas do manifest
+    """
+    os.makedirs(destino, exist_ok=True)
+    rng = random.Random(seed)
+    manifest = []
+    for i in range(count):
+        layout = LAYOUTS[i % len(LAYOUTS)]
+        doc = gerar_documento(layout, rng)
+        path = os.path.join(destino, f"{layout}_{i:05d}.pdf")
+        make_pdf(doc["pages"], path)
+        manifest.append({"arquivo": path, "layout": layout, "expected": doc["expected"]})
+    with open(os.path.join(destino, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"seed": seed, "documentos": manifest}, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("destino")
+    parser.add_argument("--count", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+    manifest = gerar_corpus(args.destino, args.count, args.seed)
+    print(f"{len(manifest)} PDFs gerados em {args.destino}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+Suíte de benchmarks da extração de boletos.
+
+Gera um corpus sintético (benchmarks.corpus) e mede:
+
+    stage       - cada etapa da extração por layout, lendo todas as páginas:
+                  abertura do PDF, extract_text, regex (parse_text, que já
+                  normaliza os campos) e serialize (BoletoData.to_dict); e
+                  extract_data_from_pdf completo no modo configurado
+                  (--extraction-mode), de onde vem o acerto (accuracy.*) de
+                  cada campo: codigo_barras, vencimento e valor contra os
+                  valores do manifest; os demais contra a leitura de todas as
+                  páginas inteiras (o modo "full" sem regiões de corte)
+    throughput  - process_all_boletos com diferentes quantidades de workers
+    reextract   - reextract_all sobre o texto guardado do corpus (sem abrir PDFs)
+    api         - /upload/ sob carga concorrente e /processar-todos/
+    startup     - em um interpretador novo: import de app.main, tempo até a
+                  API ficar pronta e latência do primeiro /upload/, com e sem
+                  o aquecimento dos workers (WARMUP)
+
+O resultado é um JSON com métricas nomeadas ("stage.regex.padrao.p50_ms",
+"throughput.workers_4.docs_per_s", ...). Com --baseline, cada métrica é
+comparada à do arquivo informado e o comando termina com código 1 se alguma
+piorou mais que a tolerância.
+
+Uso:
+    python -m benchmarks.run --output resultado.json
+    python -m benchmarks.run --baseline resultado.json --tolerance 0.15
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+import pdfplumber
+
+from app import text_backends
+from app.config import Config
+from app.models import BoletoData
+from app.processor import BoletoProcessor
+from benchmarks.corpus import LAYOUTS, gerar_corpus
+
+SECTIONS = ("stage", "throughput", "reextract", "api", "startup")
+
+# Executado em um processo novo por bench_startup: nada importado antes
+_STARTUP_SCRIPT = """
+import json, sys, time
+inicio = time.perf_counter()
+import app.main
+importado = time.perf_counter() - inicio
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    pronta = time.perf_counter() - inicio
+    with open(sys.argv[1], "rb") as f:
+        t = time.perf_counter()
+        client.post("/upload/", files={"file": ("primeiro.pdf", f, "application/pdf")}).raise_for_status()
+        primeiro = time.perf_counter() - t
+print(json.dumps({"import": importado, "ready": pronta, "first_upload": primeiro}))
+"""
+
+
+def _percentis(amostras: List[float], prefixo: str) -> Dict[str, float]:
+    amostras = sorted(amostras)
+    p95 = amostras[min(len(amostras) - 1, int(round(0.95 * (len(amostras) - 1))))]
+    return {
+        f"{prefixo}.p50_ms": round(statistics.median(amostras) * 1000, 4),
+        f"{prefixo}.p95_ms": round(p95 * 1000, 4),
+    }
+
+
+def _config(workdir: str, **overrides) -> Config:
+    config = Config()
+    # Cache desligado: cada execução mede a extração de fato
+    config.cache_size = 0
+    config.cache_dir = ""
+    config.db_file = os.path.join(workdir, f"bench_{time.monotonic_ns()}.db")
+    config.output_file = ""
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    return config
+
+
+def bench_stages(processor: BoletoProcessor, manifest: List[Dict], repeat: int) -> Dict[str, float]:
+    """Tempo de cada etapa de extract_data_from_pdf e acerto de cada campo extraído."""
+    tempos = {etapa: {layout: [] for layout in LAYOUTS}
+              for etapa in ("open", "extract_text", "regex", "serialize", "total", "extract")}
+    acertos = {campo: 0 for campo in BoletoData.FIELDS if campo != "arquivo"}
+
+    for _ in range(repeat):
+        for doc in manifest:
+            layout = doc["layout"]
+            t0 = time.perf_counter()
+            with processor.text_backend.open(doc["arquivo"]) as pdf:
+                t1 = time.perf_counter()
+                all_text = "".join(pdf.page_text(i) + "\n" for i in range(pdf.page_count))
+                t2 = time.perf_counter()
+                boleto = processor.parse_text(doc["arquivo"], all_text)
+                t3 = time.perf_counter()
+            # Referência dos campos sem valor esperado no manifest
+            referencia = boleto.to_dict()
+            t4 = time.perf_counter()
+            boleto = processor.extract_data_from_pdf(doc["arquivo"])
+            result = boleto.to_dict() if boleto else {}
+            t5 = time.perf_counter()
+
+            tempos["open"][layout].append(t1 - t0)
+            tempos["extract_text"][layout].append(t2 - t1)
+            tempos["regex"][layout].append(t3 - t2)
+            tempos["serialize"][layout].append(t4 - t3)
+            tempos["total"][layout].append(t4 - t0)
+            tempos["extract"][layout].append(t5 - t4)
+            for campo in acertos:
+                esperado = doc["expected"].get(campo, referencia[campo])
+                acertos[campo] += result.get(campo) == esperado
+
+    metrics = {}
+    for etapa, por_layout in tempos.items():
+        for layout, amostras in por_layout.items():
+            if amostras:
+                metrics.update(_percentis(amostras, f"stage.{etapa}.{layout}"))
+        metrics.update(_percentis(
+            [t for amostras in por_layout.values() for t in amostras], f"stage.{etapa}.all"
+        ))
+    total = repeat * len(manifest)
+    for campo, certos in acertos.items():
+        metrics[f"accuracy.{campo}"] = round(certos / total, 4)
+    return metrics
+
+
+def bench_throughput(corpus_dir: str, workdir: str, workers: List[int], mode: str,
+                     leitura: Dict[str, str]) -> Dict[str, float]:
+    """Documentos por segundo de process_all_boletos para cada quantidade de workers."""
+    metrics = {}
+    for n in workers:
+        processor = BoletoProcessor(_config(
+            workdir, anexos_dir=corpus_dir, max_workers=n, executor_mode=mode, **leitura
+        ))
+        try:
+            inicio = time.perf_counter()
+            resultados = processor.process_all_boletos()
+            duracao = time.perf_counter() - inicio
+        finally:
+            processor.shutdown()
+            processor.store.close()
+        metrics[f"throughput.workers_{n}.docs_per_s"] = round(len(resultados) / duracao, 2)
+        metrics[f"throughput.workers_{n}.total_ms"] = round(duracao * 1000, 2)
+    return metrics
+
+
+def bench_reextract(corpus_dir: str, workdir: str, mode: str, leitura: Dict[str, str]) -> Dict[str, float]:
+    """Documentos por segundo ao reaplicar os padrões ao texto guardado do corpus."""
+    processor = BoletoProcessor(_config(
+        workdir, anexos_dir=corpus_dir, executor_mode=mode,
+        text_db=os.path.join(workdir, f"textos_{time.monotonic_ns()}.db"), **leitura
+    ))
+    try:
+        processor.process_all_boletos()
+        inicio = time.perf_counter()
+        resumo = processor.reextract_all(aplicar=False)
+        duracao = time.perf_counter() - inicio
+    finally:
+        processor.shutdown()
+        processor.store.close()
+    return {
+        "reextract.docs_per_s": round(resumo["total"] / duracao, 2),
+        "reextract.total_ms": round(duracao * 1000, 2),
+    }
+
+
+def bench_api(manifest: List[Dict], workdir: str, requests: int, concurrency: int) -> Dict[str, float]:
+    """Latência de /upload/ com requisições concorrentes e tempo de /processar-todos/."""
+    os.environ.update({
+        "RESULT_DB": os.path.join(workdir, "api.db"),
+        "RESULT_CACHE_SIZE": "0",
+        "RESULT_CACHE_DIR": "",
+    })
+    from fastapi.testclient import TestClient
+
+    from app.main import app, config
+
+    metrics = {}
+    with TestClient(app) as client:
+        def upload(i: int) -> float:
+            doc = manifest[i % len(manifest)]
+            with open(doc["arquivo"], "rb") as f:
+                inicio = time.perf_counter()
+                resposta = client.post(
+                    "/upload/",
+                    files={"file": (f"up_{i:05d}_{os.path.basename(doc['arquivo'])}", f,
+                                    "application/pdf")},
+                )
+            resposta.raise_for_status()
+            return time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencias = list(pool.map(upload, range(requests)))
+        duracao = time.perf_counter() - inicio
+        metrics.update(_percentis(latencias, "api.upload"))
+        metrics["api.upload.requests_per_s"] = round(requests / duracao, 2)
+
+        # Arquivos novos na pasta de anexos, extraídos por /processar-todos/
+        for doc in manifest:
+            shutil.copy(doc["arquivo"], os.path.join(
+                config.anexos_dir, f"lote_{os.path.basename(doc['arquivo'])}"
+            ))
+        inicio = time.perf_counter()
+        client.get("/processar-todos/").raise_for_status()
+        metrics["api.processar_todos.total_ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+    return metrics
+
+
+def bench_startup(manifest: List[Dict], workdir: str, mode: str, leitura: Dict[str, str]) -> Dict[str, float]:
+    """Import, tempo até a API ficar pronta e primeiro /upload/, com e sem aquecimento."""
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    metrics = {}
+    for warmup in (True, False):
+        cwd = tempfile.mkdtemp(prefix="startup_", dir=workdir)
+        env = dict(
+            os.environ,
+            PYTHONPATH=raiz,
+            EXECUTOR_MODE=mode,
+            TEXT_BACKEND=leitura["text_backend"],
+            EXTRACTION_MODE=leitura["extraction_mode"],
+            WARMUP=str(warmup),
+            RESULT_DB=os.path.join(cwd, "api.db"),
+            TEXT_DB=os.path.join(cwd, "textos.db"),
+            RESULT_CACHE_SIZE="0",
+            RESULT_CACHE_DIR="",
+        )
+        saida = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT, manifest[0]["arquivo"]],
+            cwd=cwd, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        tempos = json.loads(saida.strip().splitlines()[-1])
+        prefixo = "startup.warm" if warmup else "startup.cold"
+        for nome, segundos in tempos.items():
+            metrics[f"{prefixo}.{nome}_ms"] = round(segundos * 1000, 2)
+    return metrics
+
+
+def _meta(args) -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pdfplumber": pdfplumber.__version__,
+        "text_backend": args.text_backend,
+        "extraction_mode": args.extraction_mode,
+        "patterns_version": BoletoProcessor.patterns_version(),
+        "count": args.count,
+        "seed": args.seed,
+    }
+
+
+def _menor_melhor(nome: str) -> bool:
+    return nome.endswith("_ms")
+
+
+def compare(atual: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """
+    Compara as métricas com as da baseline e imprime a variação de cada uma.
+
+    Returns:
+        Nomes das métricas que pioraram mais que a tolerância
+    """
+    regressoes = []
+    for nome in sorted(atual):
+        base = baseline.get(nome)
+        if not base:
+            continue
+        variacao = (atual[nome] - base) / base
+        piorou = variacao > tolerance if _menor_melhor(nome) else variacao < -tolerance
+        if piorou:
+            regressoes.append(nome)
+        marca = "REGRESSÃO" if piorou else ""
+        print(f"{nome:<45} {base:>12.4f} -> {atual[nome]:>12.4f} {variacao:>+8.1%} {marca}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=40, help="PDFs no corpus")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--repeat", type=int, default=3, help="repetições por documento nas etapas")
+    parser.add_argument("--workers", default="1,2,4", help="quantidades de workers, separadas por vírgula")
+    parser.add_argument("--executor-mode", default="process", choices=("process", "thread"))
+    parser.add_argument("--text-backend", default="pdfplumber", choices=sorted(text_backends.TEXT_BACKENDS))
+    parser.add_argument("--extraction-mode", default="early", choices=("early", "full"))
+    parser.add_argument("--api-requests", type=int, default=40)
+    parser.add_argument("--api-concurrency", type=int, default=8)
+    parser.add_argument("--only", default=",".join(SECTIONS), help="seções a executar")
+    parser.add_argument("--output", help="grava o resultado em JSON neste arquivo")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="piora relativa tolerada antes de acusar regressão")
+    args = parser.parse_args()
+    sections = set(args.only.split(","))
+
+    # Logs do processador apenas para avisos, para não dominar as medições
+    logging.getLogger("boleto_processor").setLevel(logging.WARNING)
+
+    # Tudo (corpus, bancos, pasta de anexos da API) fica em um diretório temporário
+    workdir = tempfile.mkdtemp(prefix="boleto_bench_")
+    origem = os.getcwd()
+    os.chdir(workdir)
+    try:
+        corpus_dir = os.path.join(workdir, "corpus")
+        manifest = gerar_corpus(corpus_dir, args.count, args.seed)
+
+        metrics: Dict[str, float] = {}
+        leitura = {"text_backend": args.text_backend, "extraction_mode": args.extraction_mode}
+        if "stage" in sections:
+            processor = BoletoProcessor(_config(workdir, **leitura))
+            metrics.update(bench_stages(processor, manifest, args.repeat))
+        if "throughput" in sections:
+            workers = [int(n) for n in args.workers.split(",")]
+            metrics.update(bench_throughput(corpus_dir, workdir, workers, args.executor_mode, leitura))
+        if "reextract" in sections:
+            metrics.update(bench_reextract(corpus_dir, workdir, args.executor_mode, leitura))
+        if "api" in sections:
+            metrics.update(bench_api(manifest, workdir, args.api_requests, args.api_concurrency))
+        if "startup" in sections:
+            metrics.update(bench_startup(manifest, workdir, args.executor_mode, leitura))
+    finally:
+        os.chdir(origem)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    resultado = {"meta": _meta(args), "metrics": metrics}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+    else:
+        json.dump(resultado, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["metrics"]
+        regressoes = compare(metrics, baseline, args.tolerance)
+        if regressoes:
+            print(f"{len(regressoes)} métrica(s) piores que a baseline (tolerância {args.tolerance:.0%})")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
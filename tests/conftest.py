@@ -0,0 +1,26 @@
+import pytest
+
+from app.warmup import WARMUP_BOLETO, build_pdf
+
+
+@pytest.fixture
+def processador(tmp_path, monkeypatch):
+    """BoletoProcessor em modo thread, com pastas e bancos em um diretório temporário."""
+    from app.config import Config
+    from app.processor import BoletoProcessor
+
+    # A configuração usa caminhos relativos ao diretório atual
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("EXECUTOR_MODE", "thread")
+    monkeypatch.setenv("MAX_WORKERS", "2")
+    monkeypatch.setenv("WARMUP", "False")
+    processor = BoletoProcessor(Config())
+    yield processor
+    processor.shutdown()
+
+
+def gravar_boleto(caminho, *linhas):
+    """Grava um boleto em PDF com as linhas do boleto de aquecimento e as extras."""
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    caminho.write_bytes(build_pdf([WARMUP_BOLETO + list(linhas)]))
+    return str(caminho)
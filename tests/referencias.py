@@ -0,0 +1,78 @@
+"""
+Implementações de referência usadas como oráculo nos testes.
+
+Ficam aqui, e não em benchmarks/, para que `pytest tests/` não dependa dos
+benchmarks.
+"""
+import random
+from datetime import date
+
+from app.barcode import DATA_BASE_FATOR, DATA_BASE_FATOR_2025, modulo10, modulo11
+from app.processor import BoletoProcessor
+
+# Texto típico de um boleto bancário, precedido por um demonstrativo
+STANDARD_TEXT = (
+    "Demonstrativo de cobrança referente ao período\n" * 40
+    + "Banco Exemplo 341-7 34191.79001 01043.510047 91020.150008 1 90010000012345\n"
+    "Local de Pagamento Vencimento\n"
+    "PAGAVEL EM QUALQUER BANCO ATE O VENCIMENTO 10/05/2024\n"
+    "Beneficiário Agência / Código Beneficiário\n"
+    "EMPRESA EXEMPLO LTDA 1234/56789-0\n"
+    "Data Documento Número Documento Espécie Doc. Aceite Data Processamento\n"
+    "01/04/2024 123456 DM N 01/04/2024\n"
+    "Valor do Documento 1.234,56\n"
+    "Pagador FULANO DE TAL\n"
+    "FULANO DE TAL CPF 000.000.000-00\n"
+)
+
+# Boleto sem "Valor do Documento": o valor só aparece no nível de moeda
+MISSING_VALOR_TEXT = (
+    "Demonstrativo de cobrança referente ao período\n" * 40
+    + "Beneficiário: OPERADORA DE SAUDE SA\n"
+    "Pagador CPF/CNPJ: 000.000.000-00\n"
+    "FULANO DE TAL\n"
+    "Data Documento Número Documento 01/04/2024\n"
+    "Total a pagar R$ 789,10\n"
+)
+
+
+def cascade(text):
+    """Extração nível a nível usada antes do FieldScanner."""
+    found = {}
+    for patterns in (
+        BoletoProcessor.PATTERNS,
+        BoletoProcessor.ALT_PATTERNS,
+        BoletoProcessor.EXTRA_PATTERNS,
+    ):
+        for field, pattern in patterns.items():
+            if found.get(field) is None:
+                match = pattern.search(text)
+                if match and match.group(1):
+                    found[field] = match.group(1).strip()
+    for patterns in (BoletoProcessor.HEALTH_PATTERNS, BoletoProcessor.CURRENCY_PATTERNS):
+        if found.get("valor") is None:
+            for pattern in patterns["valor"]:
+                match = pattern.search(text)
+                if match and match.group(1):
+                    found["valor"] = match.group(1).strip()
+                    break
+    return found
+
+
+def scanner(text):
+    return {
+        field: value for field, (_, value) in BoletoProcessor.SCANNER.scan(text).items()
+    }
+
+
+def linha_digitavel(banco: str, vencimento: date, centavos: int, rng: random.Random) -> str:
+    """Monta uma linha digitável válida (dígitos módulo 10 e módulo 11 corretos)."""
+    fator = (vencimento - DATA_BASE_FATOR).days
+    if fator > 9999:
+        fator = (vencimento - DATA_BASE_FATOR_2025).days
+    livre = "".join(rng.choice("0123456789") for _ in range(25))
+    valor = f"{centavos:010d}"
+    dv = modulo11(banco + "9" + f"{fator:04d}" + valor + livre)
+    campos = [banco + "9" + livre[:5], livre[5:15], livre[15:]]
+    c1, c2, c3 = (campo + str(modulo10(campo)) for campo in campos)
+    return f"{c1[:5]}.{c1[5:]} {c2[:5]}.{c2[5:]} {c3[:5]}.{c3[5:]} {dv} {fator:04d}{valor}"
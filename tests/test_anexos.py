@@ -0,0 +1,53 @@
+import os
+
+from app.anexos import VarreduraPdfs
+from tests.conftest import gravar_boleto
+
+
+def _envelhecer(*pastas):
+    # Pastas alteradas há pouco não são dadas como resolvidas
+    for pasta in pastas:
+        os.utime(pasta, (1_600_000_000, 1_600_000_000))
+
+
+def test_varredura_relê_so_as_pastas_alteradas(tmp_path):
+    raiz = tmp_path / "anexos"
+    a = gravar_boleto(raiz / "aa" / "1.pdf")
+    b = gravar_boleto(raiz / "bb" / "2.pdf")
+    (raiz / "bb" / "nota.txt").write_text("x")
+    _envelhecer(raiz, raiz / "aa", raiz / "bb")
+    varredura = VarreduraPdfs(str(raiz))
+
+    lidas = varredura.candidatos()
+    assert {pdf for _, pdfs in lidas.values() for pdf in pdfs} == {a, b}
+    for pasta, (mtime, _) in lidas.items():
+        varredura.resolver(pasta, mtime)
+    assert varredura.candidatos() == {}
+
+    # Arquivo novo: só a pasta dele volta a ser lida
+    c = gravar_boleto(raiz / "bb" / "3.pdf")
+    lidas = varredura.candidatos()
+    assert list(lidas) == [str(raiz / "bb")]
+    assert lidas[str(raiz / "bb")][1] == [b, c]
+
+
+def test_pasta_alterada_agora_nao_e_resolvida(tmp_path):
+    raiz = tmp_path / "anexos"
+    gravar_boleto(raiz / "aa" / "1.pdf")
+    varredura = VarreduraPdfs(str(raiz))
+    for pasta, (mtime, _) in varredura.candidatos().items():
+        varredura.resolver(pasta, mtime)
+    assert str(raiz / "aa") in varredura.candidatos()
+
+
+def test_pendentes_nao_relê_pastas_gravadas(processador, tmp_path):
+    raiz = tmp_path / "anexos"
+    gravado = gravar_boleto(raiz / "aa" / "1.pdf")
+    pendente = gravar_boleto(raiz / "bb" / "2.pdf")
+    processador.save_data([{"arquivo": os.path.relpath(gravado, tmp_path), "valor": "1,00"}])
+    _envelhecer(raiz, raiz / "aa", raiz / "bb")
+
+    pendentes = processador.pending_files()
+    assert pendentes == [os.path.relpath(pendente, tmp_path)]
+    # A pasta "aa" só tinha arquivo gravado: não é relida na próxima varredura
+    assert list(processador._varredura.candidatos()) == ["anexos/bb"]
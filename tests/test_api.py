@@ -0,0 +1,105 @@
+import importlib
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+from app.scheduler import INTERACTIVE, QueueFull
+from app.warmup import WARMUP_BOLETO, build_pdf
+
+
+@pytest.fixture(scope="module")
+def api(tmp_path_factory):
+    # app.main cria a configuração (caminhos relativos) no import
+    pasta = tmp_path_factory.mktemp("api")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(pasta)
+        mp.setenv("EXECUTOR_MODE", "thread")
+        mp.setenv("MAX_WORKERS", "2")
+        mp.setenv("WARMUP", "False")
+        main = importlib.import_module("app.main")
+        with TestClient(main.app) as cliente:
+            yield main, cliente
+
+
+@pytest.fixture
+def pdf():
+    return build_pdf([WARMUP_BOLETO])
+
+
+def test_upload_grava_pelo_conteudo(api, pdf):
+    main, cliente = api
+    for nome in ("../../fora.pdf", "/tmp/absoluto.pdf", "boleto.pdf"):
+        resposta = cliente.post("/upload/", files={"file": (nome, pdf, "application/pdf")})
+        assert resposta.status_code == 200, resposta.text
+        caminho = resposta.json()["arquivo"]
+        pasta = os.path.realpath(main.config.anexos_dir)
+        assert os.path.realpath(caminho).startswith(pasta + os.sep)
+        assert os.path.basename(caminho) != os.path.basename(nome)
+    assert not os.path.exists(os.path.join(os.getcwd(), "..", "fora.pdf"))
+
+
+def test_upload_sem_nome(api, pdf):
+    main, _ = api
+    caminho = main._save_upload_by_content(UploadFile(io.BytesIO(pdf), filename=None))
+    assert caminho.endswith(".pdf")
+    assert os.path.exists(caminho)
+
+
+def test_reextrair_todos_exige_post(api):
+    _, cliente = api
+    assert cliente.get("/reextrair-todos/").status_code == 405
+    resposta = cliente.post("/reextrair-todos/", params={"aplicar": False})
+    assert resposta.status_code == 200, resposta.text
+    assert resposta.json()["alterados"] == []
+
+
+def test_liberar_quarentena_exige_post(api):
+    main, cliente = api
+    main.processor.store.quarantine("anexos/preso.pdf", "timeout", "Tempo limite")
+    assert cliente.get("/quarentena/liberar/", params={"arquivo": "anexos/preso.pdf"}).status_code == 405
+    assert [item["arquivo"] for item in cliente.get("/quarentena/").json()] == ["anexos/preso.pdf"]
+
+    resposta = cliente.post("/quarentena/liberar/", params={"arquivo": "anexos/preso.pdf"})
+    assert resposta.json() == {"arquivo": "anexos/preso.pdf", "liberado": True}
+    assert cliente.get("/quarentena/").json() == []
+    assert cliente.post("/quarentena/liberar/", params={"arquivo": "anexos/preso.pdf"}).status_code == 404
+
+
+def test_fila_cheia_responde_429(api, pdf, monkeypatch):
+    main, cliente = api
+
+    def recusar(caminho):
+        raise QueueFull(INTERACTIVE, 7)
+
+    monkeypatch.setattr(main.processor, "submit_reprocess", recusar)
+    resposta = cliente.post("/upload/", files={"file": ("boleto.pdf", pdf, "application/pdf")})
+    assert resposta.status_code == 429
+    assert resposta.headers["Retry-After"] == "7"
+    assert resposta.json()["retry_after"] == 7
+
+
+def test_consulta_com_etag(api):
+    main, cliente = api
+    main.processor.save_data([{"arquivo": "anexos/etag.pdf", "valor": "5.00", "beneficiario": "ETAG LTDA"}])
+    main.processor.index.refresh()
+
+    resposta = cliente.get("/boletos/", params={"beneficiario": "etag ltda"})
+    assert resposta.status_code == 200
+    assert [item["arquivo"] for item in resposta.json()["items"]] == ["anexos/etag.pdf"]
+    etag = resposta.headers["ETag"]
+    resposta = cliente.get("/boletos/", params={"beneficiario": "etag ltda"},
+                           headers={"If-None-Match": etag})
+    assert resposta.status_code == 304
+    assert resposta.content == b""
+
+    main.processor.save_data([{"arquivo": "anexos/etag.pdf", "valor": "6.00", "beneficiario": "ETAG LTDA"}])
+    main.processor.index.refresh()
+    resposta = cliente.get("/boletos/", params={"beneficiario": "etag ltda"},
+                           headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.json()["items"][0]["valor"] == "6.00"
+
+    assert cliente.get("/boletos/", params={"vencimento_de": "32/01/2024"}).status_code == 400
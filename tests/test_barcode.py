@@ -0,0 +1,105 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from app.barcode import (
+    DATA_BASE_FATOR,
+    DATA_BASE_FATOR_2025,
+    decode_linha_digitavel,
+    fator_para_data,
+    modulo10,
+    modulo11,
+)
+from tests.referencias import linha_digitavel
+
+# Exemplo do Banco do Brasil (vencimento 31/12/2007, R$ 1,00)
+LINHA_BB = "00190.50095 40144.816069 06809.350314 3 37370000000100"
+CODIGO_BB = "00193373700000001000500940144816060680935031"
+
+
+@pytest.mark.parametrize("numero, dv", [
+    ("01230067896", 3),
+    ("001905009", 5),
+    ("4014481606", 9),
+    ("0680935031", 4),
+    ("0000000000", 0),
+])
+def test_modulo10(numero, dv):
+    assert modulo10(numero) == dv
+
+
+@pytest.mark.parametrize("numero, dv", [
+    # Código de barras sem o DV (posição 5)
+    (CODIGO_BB[:4] + CODIGO_BB[5:], 3),
+    # Resto 0 ou 1: DV 1
+    ("0" * 43, 1),
+])
+def test_modulo11(numero, dv):
+    assert modulo11(numero) == dv
+
+
+def test_decodifica_linha_digitavel():
+    linha = decode_linha_digitavel(LINHA_BB, referencia=date(2007, 12, 1))
+    assert linha.banco == "001"
+    assert linha.moeda == "9"
+    assert linha.fator_vencimento == 3737
+    assert linha.valor_centavos == 100
+    assert linha.valor == "1,00"
+    assert linha.codigo_barras == CODIGO_BB
+    assert linha.vencimento == date(2007, 12, 31)
+
+
+def test_aceita_linha_so_com_digitos():
+    digitos = "".join(c for c in LINHA_BB if c.isdigit())
+    assert decode_linha_digitavel(digitos).codigo_barras == CODIGO_BB
+
+
+@pytest.mark.parametrize("posicao", [0, 9, 10, 20, 21, 31, 32, 40])
+def test_recusa_digito_alterado(posicao):
+    digitos = "".join(c for c in LINHA_BB if c.isdigit())
+    alterado = digitos[:posicao] + str((int(digitos[posicao]) + 1) % 10) + digitos[posicao + 1:]
+    assert decode_linha_digitavel(alterado) is None
+
+
+@pytest.mark.parametrize("linha", ["", "123", LINHA_BB[:-1], LINHA_BB + "0"])
+def test_recusa_tamanho_invalido(linha):
+    assert decode_linha_digitavel(linha) is None
+
+
+@pytest.mark.parametrize("fator, referencia, esperada", [
+    (1000, date(2000, 7, 1), date(2000, 7, 3)),
+    (9999, date(2025, 2, 1), date(2025, 2, 21)),
+    # Depois de 21/02/2025 o fator volta para 1000
+    (1000, date(2025, 2, 1), date(2025, 2, 22)),
+    (1001, date(2025, 3, 1), date(2025, 2, 23)),
+    (1293, date(2025, 11, 28), date(2025, 12, 12)),
+    # O mesmo fator, perto do primeiro ciclo
+    (1293, date(2001, 1, 1), date(2001, 4, 22)),
+    # Fatores abaixo de 1000 existem só no primeiro ciclo
+    (999, date(2025, 6, 1), date(2000, 7, 2)),
+])
+def test_fator_de_vencimento(fator, referencia, esperada):
+    assert fator_para_data(fator, referencia) == esperada
+
+
+def test_fator_zero_sem_vencimento():
+    assert fator_para_data(0) is None
+
+
+def test_bases_do_fator():
+    assert DATA_BASE_FATOR + timedelta(days=1000) == date(2000, 7, 3)
+    assert DATA_BASE_FATOR_2025 + timedelta(days=1000) == date(2025, 2, 22)
+
+
+def test_ida_e_volta_em_torno_da_virada():
+    rng = random.Random(2025)
+    inicio = date(2024, 6, 1)
+    for dia in range(0, 600, 3):
+        vencimento = inicio + timedelta(days=dia)
+        centavos = rng.randint(1, 10 ** 9)
+        texto = linha_digitavel("341", vencimento, centavos, rng)
+        linha = decode_linha_digitavel(texto, referencia=vencimento - timedelta(days=10))
+        assert linha is not None, texto
+        assert linha.vencimento == vencimento
+        assert linha.valor_centavos == centavos
@@ -0,0 +1,137 @@
+import base64
+import imaplib
+import re
+import socketserver
+import threading
+import time
+
+import pytest
+
+from app import getemails
+from app.core.settings import settings
+
+
+def _parte_pdf(tamanho):
+    return (
+        '("application" "pdf" ("name" "boleto.pdf") NIL NIL "base64" %d NIL '
+        '("attachment" ("filename" "boleto.pdf")) NIL NIL)' % tamanho
+    )
+
+
+class CaixaFalsa:
+    """Responde a mail.uid(...) como um servidor IMAP com uma mensagem por UID."""
+
+    def __init__(self, quantidade, tamanho=1000, recusar=()):
+        self.conteudos = {
+            uid: base64.encodebytes(b"%PDF-1.4 boleto " + str(uid).encode() * tamanho)
+            for uid in range(1, quantidade + 1)
+        }
+        self.recusar = set(recusar)
+        self.lotes = []
+        self.store = []
+
+    def uid(self, comando, *args):
+        if comando == "SEARCH":
+            return "OK", [" ".join(str(uid) for uid in self.conteudos).encode()]
+        if comando == "STORE":
+            self.store.append(args[0])
+            return "OK", []
+        uids = [int(uid) for uid in args[0].split(",")]
+        if "BODYSTRUCTURE" in args[1]:
+            dados = []
+            for uid in uids:
+                dados.append((
+                    b'%d (UID %d BODYSTRUCTURE (("text" "plain" NIL NIL NIL "7bit" 10 1 NIL NIL NIL NIL)'
+                    b'%s "mixed" ("boundary" "b") NIL NIL NIL) BODY[HEADER.FIELDS (SUBJECT FROM DATE)] {19}'
+                    % (uid, uid, _parte_pdf(len(self.conteudos[uid])).encode()),
+                    b"Subject: Boleto\r\n\r\n",
+                ))
+                dados.append(b")")
+            return "OK", dados
+        self.lotes.append(uids)
+        if self.recusar & set(uids):
+            return "NO", [b"falha"]
+        secao = re.search(r"BODY\.PEEK\[([\d.]+)\]", args[1]).group(1)
+        dados = []
+        for uid in uids:
+            conteudo = self.conteudos[uid]
+            dados.append((b"%d (UID %d BODY[%s] {%d}" % (uid, uid, secao.encode(), len(conteudo)), conteudo))
+            dados.append(b")")
+        return "OK", dados
+
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PASTA_ANEXOS", str(tmp_path))
+    monkeypatch.setattr(getemails, "indice_anexos", lambda: None)
+    return tmp_path
+
+
+def test_partes_pequenas_em_lotes_por_quantidade(pasta, monkeypatch):
+    monkeypatch.setattr(settings, "IMAP_LOTE_UIDS", 2)
+    caixa = CaixaFalsa(5)
+    salvos = []
+    estado = getemails.EstadoUID(str(pasta / "estado.json"))
+    assert getemails.verificar_emails(caixa, estado, salvos.append)
+    assert caixa.lotes == [[1, 2], [3, 4], [5]]
+    assert len(salvos) == 5
+    assert estado.ultimo_uid == 5
+
+
+def test_partes_pequenas_em_lotes_por_tamanho(pasta, monkeypatch):
+    caixa = CaixaFalsa(4)
+    tamanho = len(caixa.conteudos[1])
+    monkeypatch.setattr(settings, "IMAP_LOTE_BYTES", tamanho * 2 + 1)
+    estado = getemails.EstadoUID(str(pasta / "estado.json"))
+    assert getemails.verificar_emails(caixa, estado)
+    assert caixa.lotes == [[1, 2], [3, 4]]
+
+
+def test_lote_recusado_nao_avanca_o_estado(pasta, monkeypatch):
+    monkeypatch.setattr(settings, "IMAP_LOTE_UIDS", 2)
+    caixa = CaixaFalsa(5, recusar={3})
+    estado = getemails.EstadoUID(str(pasta / "estado.json"))
+    assert not getemails.verificar_emails(caixa, estado)
+    # O lote [3, 4] falhou: só as mensagens dos outros lotes recebem \Seen
+    assert caixa.store == ["1,2,5"]
+    assert estado.ultimo_uid == 2
+
+
+class _ServidorIdle(socketserver.StreamRequestHandler):
+    def _enviar(self, dados):
+        self.wfile.write(dados)
+        self.wfile.flush()
+
+    def handle(self):
+        self._enviar(b"* OK pronto\r\n")
+        while True:
+            linha = self.rfile.readline()
+            if not linha:
+                return
+            tag, comando = linha.split()[:2]
+            if comando == b"CAPABILITY":
+                self._enviar(b"* CAPABILITY IMAP4rev1 IDLE\r\n" + tag + b" OK feito\r\n")
+            elif comando == b"IDLE":
+                # Duas respostas no mesmo segmento: a segunda fica no buffer do imaplib
+                self._enviar(b"+ idling\r\n")
+                self._enviar(b"* OK ainda aqui\r\n* 3 EXISTS\r\n")
+                self.rfile.readline()  # DONE
+                self._enviar(tag + b" OK IDLE terminado\r\n")
+            else:
+                self._enviar(tag + b" OK feito\r\n")
+
+
+def test_idle_le_respostas_ja_no_buffer():
+    servidor = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _ServidorIdle)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        sessao = getemails.SessaoIMAP(getemails.FonteEmail("teste", "127.0.0.1", "u", "p"))
+        sessao.mail = imaplib.IMAP4("127.0.0.1", servidor.server_address[1], timeout=10)
+        inicio = time.monotonic()
+        assert sessao._idle(timeout=5)
+        assert time.monotonic() - inicio < 2
+        sessao.mail.shutdown()
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
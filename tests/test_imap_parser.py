@@ -0,0 +1,86 @@
+from app.imap_parser import parse_fetch, partes_pdf
+
+# Respostas no formato devolvido por mail.uid("FETCH", ...): linhas em bytes
+# e literais ({n}) como tuplas (prefixo, conteúdo)
+TEXTO = b'("text" "plain" ("charset" "utf-8") NIL NIL "quoted-printable" 120 4 NIL NIL NIL NIL)'
+PDF = (
+    b'("application" "pdf" ("name" "boleto.pdf") NIL NIL "base64" 48200 NIL '
+    b'("attachment" ("filename" "boleto.pdf")) NIL NIL)'
+)
+ENVELOPE = (
+    b'("Mon, 1 Apr 2024 10:00:00 -0300" "Fwd: Boleto" (("Fulano" NIL "fulano" "example.com")) '
+    b'(("Fulano" NIL "fulano" "example.com")) (("Fulano" NIL "fulano" "example.com")) '
+    b'((NIL NIL "contas" "example.com")) NIL NIL NIL "<abc@example.com>")'
+)
+
+
+def _estrutura(dados):
+    (mensagem,) = parse_fetch(dados)
+    return mensagem["BODYSTRUCTURE"]
+
+
+def test_multipart_simples():
+    dados = [b'1 (UID 42 BODYSTRUCTURE (' + TEXTO + PDF + b' "mixed" ("boundary" "b1") NIL NIL NIL))']
+    assert partes_pdf(_estrutura(dados)) == [
+        {"secao": "2", "encoding": "base64", "nome": "boleto.pdf", "tamanho": 48200},
+    ]
+
+
+def test_multipart_aninhado():
+    # mixed( alternative(text, html), pdf, octet-stream com nome .pdf )
+    html = b'("text" "html" ("charset" "utf-8") NIL NIL "7bit" 300 10 NIL NIL NIL NIL)'
+    octeto = (
+        b'("application" "octet-stream" NIL NIL NIL "base64" 900 NIL '
+        b'("attachment" ("filename" "segunda via.PDF")) NIL NIL)'
+    )
+    dados = [
+        b'7 (UID 43 BODYSTRUCTURE ((' + TEXTO + html + b' "alternative" ("boundary" "b2") NIL NIL NIL)'
+        + PDF + octeto + b' "mixed" ("boundary" "b1") NIL NIL NIL))'
+    ]
+    partes = partes_pdf(_estrutura(dados))
+    assert [(p["secao"], p["nome"]) for p in partes] == [("2", "boleto.pdf"), ("3", "segunda via.PDF")]
+
+
+def test_mensagem_encaminhada_como_anexo():
+    # mixed( text, message/rfc822( mixed( text, pdf ) ) )
+    interna = b'(' + TEXTO + PDF + b' "mixed" ("boundary" "b3") NIL NIL NIL)'
+    rfc822 = b'("message" "rfc822" NIL NIL NIL "7bit" 52000 ' + ENVELOPE + b' ' + interna + b' 700 NIL NIL NIL NIL)'
+    dados = [b'3 (UID 44 BODYSTRUCTURE (' + TEXTO + rfc822 + b' "mixed" ("boundary" "b1") NIL NIL NIL))']
+    partes = partes_pdf(_estrutura(dados))
+    assert [(p["secao"], p["nome"], p["tamanho"]) for p in partes] == [("2.2", "boleto.pdf", 48200)]
+
+
+def test_mensagem_encaminhada_com_parte_unica():
+    rfc822 = b'("message" "rfc822" NIL NIL NIL "7bit" 50000 ' + ENVELOPE + b' ' + PDF + b' 650 NIL NIL NIL NIL)'
+    dados = [b'3 (UID 45 BODYSTRUCTURE (' + TEXTO + rfc822 + b' "mixed" ("boundary" "b1") NIL NIL NIL))']
+    assert [p["secao"] for p in partes_pdf(_estrutura(dados))] == ["2.1"]
+
+
+def test_nome_em_literal():
+    nome = b"=?utf-8?q?boleto_condom=C3=ADnio_abril_2024_unidade_101_bloco_B?=.pdf"
+    dados = [
+        (
+            b'9 (UID 46 BODYSTRUCTURE (' + TEXTO
+            + b'("application" "octet-stream" ("name" {%d}' % len(nome),
+            nome,
+        ),
+        b') NIL NIL "base64" 1200 NIL ("attachment" NIL) NIL NIL) "mixed" ("boundary" "b1") NIL NIL NIL))',
+    ]
+    (parte,) = partes_pdf(_estrutura(dados))
+    assert parte["secao"] == "2"
+    assert parte["nome"] == nome.decode()
+
+
+def test_parte_unica_sem_multipart():
+    dados = [b'1 (UID 47 BODYSTRUCTURE ' + PDF + b')']
+    assert [p["secao"] for p in partes_pdf(_estrutura(dados))] == ["1"]
+
+
+def test_sem_pdf():
+    dados = [b'1 (UID 48 BODYSTRUCTURE (' + TEXTO + TEXTO + b' "mixed" ("boundary" "b1") NIL NIL NIL))']
+    assert partes_pdf(_estrutura(dados)) == []
+
+
+def test_conteudo_da_parte_em_literal():
+    dados = [(b'1 (UID 42 BODY[2] {8}', b"JVBERi0x"), b')']
+    assert parse_fetch(dados) == [{"UID": "42", "BODY[2]": b"JVBERi0x"}]
@@ -0,0 +1,75 @@
+import os
+import time
+
+import pytest
+
+from app import isolation
+from app.isolation import MOTIVO_MEMORIA, MOTIVO_TIMEOUT, ExtractionAborted, SupervisedProcessPool
+
+MIB = 2 ** 20
+
+pytestmark = pytest.mark.skipif(
+    not os.path.exists("/proc/self/statm"), reason="requer /proc"
+)
+
+
+def _espera(segundos):
+    time.sleep(segundos)
+    return "ok"
+
+
+def _aloca(tamanho):
+    dados = bytearray(tamanho)
+    dados[::4096] = b"\x01" * len(range(0, tamanho, 4096))
+    time.sleep(10)
+    return len(dados)
+
+
+@pytest.fixture(scope="module")
+def pai_grande():
+    # Memória residente do processo principal bem acima do limite dos workers
+    dados = bytearray(256 * MIB)
+    dados[::4096] = b"\x01" * (len(dados) // 4096)
+    yield dados
+
+
+@pytest.fixture(params=["smaps_rollup", "statm"])
+def pool(request, monkeypatch, pai_grande):
+    if request.param == "statm":
+        monkeypatch.setattr(isolation, "_private_bytes", lambda pid: None)
+    elif isolation._private_bytes(os.getpid()) is None:
+        pytest.skip("sem /proc/<pid>/smaps_rollup")
+    pool = SupervisedProcessPool(1, memory_limit=128 * MIB, poll_interval=0.05)
+    yield pool
+    pool.shutdown()
+
+
+def test_paginas_herdadas_nao_contam(pool):
+    # A tarefa dura vários ciclos do supervisor, que mede o processo em cada um
+    for _ in range(2):
+        assert pool.submit(_espera, 0.5).result(timeout=30) == "ok"
+
+
+def test_encerra_tarefa_acima_do_limite(pool):
+    future = pool.submit(_aloca, 192 * MIB)
+    with pytest.raises(ExtractionAborted) as erro:
+        future.result(timeout=30)
+    assert erro.value.motivo == MOTIVO_MEMORIA
+    # O processo novo também herda o pai e segue aceitando tarefas
+    assert pool.submit(_espera, 0.5).result(timeout=30) == "ok"
+
+
+def test_callback_lento_nao_atrasa_os_limites():
+    pool = SupervisedProcessPool(2, timeout=0.5, poll_interval=0.05)
+    try:
+        rapido = pool.submit(_espera, 0.2)
+        # Callback demorado (ex.: gravação da quarentena) da primeira tarefa
+        rapido.add_done_callback(lambda _: time.sleep(3))
+        lento = pool.submit(_espera, 10)
+        inicio = time.monotonic()
+        with pytest.raises(ExtractionAborted) as erro:
+            lento.result(timeout=30)
+        assert erro.value.motivo == MOTIVO_TIMEOUT
+        assert time.monotonic() - inicio < 2
+    finally:
+        pool.shutdown()
@@ -0,0 +1,29 @@
+from datetime import date
+
+from app.models import BoletoData
+
+
+def _campos(**campos):
+    return {"codigo_barras": None, "vencimento": "10/05/2024", "valor": "1.234,56",
+            "beneficiario": "Empresa", "pagador": "Fulano 1.234,56",
+            "data_processamento": "02/05/2024", **campos}
+
+
+def test_formato_da_api():
+    boleto = BoletoData.from_text("anexos/a.pdf", _campos(banco="341"))
+    assert boleto.vencimento == date(2024, 5, 10)
+    assert boleto.to_dict() == {
+        "arquivo": "anexos/a.pdf", "codigo_barras": None, "vencimento": "2024-05-10",
+        "valor": "1234.56", "beneficiario": "EMPRESA", "pagador": "FULANO",
+        "data_processamento": "2024-05-02", "banco": "341",
+    }
+    assert BoletoData.from_text("anexos/a.pdf", _campos()).to_dict()["banco"] is None
+
+
+def test_data_invalida_fica_como_texto():
+    boleto = BoletoData.from_text(
+        "anexos/a.pdf", _campos(vencimento="31/02/2024", data_processamento="02/13/2024")
+    )
+    assert boleto.is_valid()
+    assert boleto.to_dict()["vencimento"] == "31/02/2024"
+    assert boleto.to_dict()["data_processamento"] == "02/13/2024"
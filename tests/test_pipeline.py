@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+
+from app.pipeline import ExtractionPipeline, _PollingWatcher
+from app.scheduler import BULK, PRIORITIES
+from tests.conftest import gravar_boleto
+
+
+def _contar_extracoes(processor):
+    extraidos = []
+    submit_file = processor.submit_file
+
+    def contar(pdf_path, *args, **kwargs):
+        extraidos.append(pdf_path)
+        return submit_file(pdf_path, *args, **kwargs)
+
+    processor.submit_file = contar
+    return extraidos
+
+
+def test_anexo_avisado_duas_vezes_e_extraido_uma(processador, tmp_path):
+    extraidos = _contar_extracoes(processador)
+    pipeline = ExtractionPipeline(processador, workers=1)
+    pipeline.start()
+    try:
+        caminho = gravar_boleto(tmp_path / "anexos" / "ab" / "boleto.pdf")
+        # ao_salvar e o observador da pasta avisam o mesmo arquivo
+        assert pipeline.submit(caminho)
+        pipeline.queue.join()
+        assert not pipeline.submit(caminho)
+        pipeline.queue.join()
+    finally:
+        pipeline.stop()
+    assert extraidos == [caminho]
+    assert processador.store.get(caminho) is not None
+
+
+class _Avisos:
+    def __init__(self):
+        self.caminhos = []
+
+    def submit(self, caminho):
+        self.caminhos.append(caminho)
+
+
+def _aguardar(condicao, timeout=5.0):
+    fim = time.monotonic() + timeout
+    while time.monotonic() < fim:
+        if condicao():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_observador_sobrevive_a_pasta_ausente_na_partida(tmp_path):
+    pasta = tmp_path / "anexos"
+    avisos = _Avisos()
+    observador = _PollingWatcher(avisos, str(pasta), interval=0.05)
+    observador.start()
+    try:
+        time.sleep(0.2)
+        assert observador._thread.is_alive()
+        # A primeira leitura bem-sucedida só registra o que já existe; a pasta
+        # aparece de uma vez, já com o arquivo
+        gravar_boleto(tmp_path / "preparo" / "antigo.pdf")
+        os.rename(tmp_path / "preparo", pasta)
+        antigo = str(pasta / "antigo.pdf")
+        time.sleep(0.2)
+        novo = gravar_boleto(pasta / "cd" / "novo.pdf")
+        assert _aguardar(lambda: novo in avisos.caminhos)
+        assert antigo not in avisos.caminhos
+    finally:
+        observador.stop()
+
+
+def test_backlog_enfileirado_sem_bloquear(processador, tmp_path, monkeypatch):
+    listando = threading.Event()
+    liberar = threading.Event()
+    pendentes = [str(tmp_path / "anexos" / f"{i}.pdf") for i in range(3)]
+
+    def pending_files():
+        listando.set()
+        liberar.wait(5)
+        return pendentes
+
+    monkeypatch.setattr(processador, "pending_files", pending_files)
+    monkeypatch.setattr(processador.config, "pipeline_queue_size", 2)
+    # Sem consumidoras: a fila enche e submit() do backlog bloqueia
+    pipeline = ExtractionPipeline(processador, workers=1)
+    inicio = time.monotonic()
+    pipeline.submit_pending()
+    assert time.monotonic() - inicio < 1
+    assert listando.wait(5)
+    liberar.set()
+    assert _aguardar(lambda: pipeline.queue.full())
+    # O backlog vai na classe bulk, atrás dos anexos recebidos
+    assert [item[0] for item in sorted(pipeline.queue.queue)] == [PRIORITIES.index(BULK)] * 2
+    assert [item[2] for item in sorted(pipeline.queue.queue)] == pendentes[:2]
+    pipeline._stopping.set()
+    pipeline.queue.get_nowait()
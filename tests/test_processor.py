@@ -0,0 +1,23 @@
+from tests.conftest import gravar_boleto
+
+
+def test_reextracao_compara_com_os_resultados_em_memoria(processador, tmp_path):
+    caminhos = [gravar_boleto(tmp_path / "anexos" / f"{i}.pdf", f"Documento {i}") for i in range(3)]
+    resultados = [processador.submit_file(caminho).result() for caminho in caminhos]
+    assert processador.text_store.files()
+    processador.save_data(resultados[:2])
+    alterado = dict(resultados[1], valor="9,99")
+    processador.store.add_many([alterado])
+
+    consultas = []
+    get = processador.store.get
+    processador.store.get = lambda arquivo: consultas.append(arquivo) or get(arquivo)
+    resumo = processador.reextract_all(aplicar=False)
+
+    assert consultas == []
+    assert resumo["novos"] == 1
+    assert [item["arquivo"] for item in resumo["alterados"]] == [caminhos[1]]
+    assert resumo["alterados"][0]["campos"]["valor"] == ["9,99", resultados[1]["valor"]]
+    # Simulação: nada é gravado
+    assert processador.store.get(caminhos[1])["valor"] == "9,99"
+    assert processador.store.get(caminhos[2]) is None
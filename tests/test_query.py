@@ -0,0 +1,66 @@
+from app.query import BoletoIndex
+from app.storage import SQLiteResultStore
+
+
+def test_vencimento_em_texto_fica_fora_das_faixas(tmp_path):
+    store = SQLiteResultStore(str(tmp_path / "boletos.db"))
+    store.add_many([
+        {"arquivo": "anexos/a.pdf", "vencimento": "2024-05-10", "valor": "1.00"},
+        {"arquivo": "anexos/b.pdf", "vencimento": "31/02/2024", "valor": "2.00"},
+    ])
+    index = BoletoIndex(store)
+    index.refresh()
+    pagina = index.query(vencimento_de="2024-01-01")
+    assert [item["arquivo"] for item in pagina["items"]] == ["anexos/a.pdf"]
+    assert index.query()["total"] == 2
+    store.close()
+
+
+def _boletos(store, quantidade, inicio=0):
+    store.add_many([
+        {"arquivo": f"anexos/{i}.pdf", "vencimento": f"2024-05-{i % 28 + 1:02d}",
+         "valor": f"{i}.00", "beneficiario": "Empresa Par" if i % 2 == 0 else "Empresa Impar",
+         "codigo_barras": f"34191.{i:05d}"}
+        for i in range(inicio, inicio + quantidade)
+    ])
+
+
+def test_paginacao_por_cursor(tmp_path):
+    store = SQLiteResultStore(str(tmp_path / "boletos.db"))
+    _boletos(store, 250)
+    index = BoletoIndex(store)
+    index.refresh()
+
+    vistos, cursor = [], 0
+    while cursor is not None:
+        pagina = index.query(beneficiario="empresa  par", valor_min=1000, cursor=cursor, limit=40)
+        assert pagina["total"] == 120
+        vistos += [item["arquivo"] for item in pagina["items"]]
+        cursor = pagina["next_cursor"]
+    assert vistos == [f"anexos/{i}.pdf" for i in range(10, 250, 2)]
+
+    pagina = index.query(codigo_barras="3419100007", vencimento_de="2024-05-08",
+                         vencimento_ate="2024-05-08")
+    assert [item["arquivo"] for item in pagina["items"]] == ["anexos/7.pdf"]
+
+    # Atualizações e novos boletos entram no refresh seguinte
+    store.add_many([{"arquivo": "anexos/10.pdf", "valor": "1.00", "beneficiario": "Outra"}])
+    _boletos(store, 2, inicio=250)
+    assert index.refresh() == 3
+    assert index.query(beneficiario="empresa par", valor_min=1000)["total"] == 120
+    assert index.query(beneficiario="outra")["items"][0]["arquivo"] == "anexos/10.pdf"
+    store.close()
+
+
+def test_etag_muda_com_o_repositorio_e_os_filtros(tmp_path):
+    store = SQLiteResultStore(str(tmp_path / "boletos.db"))
+    _boletos(store, 3)
+    index = BoletoIndex(store)
+    index.refresh()
+    etag = index.etag({"pagador": "x", "cursor": 0})
+    assert index.etag({"cursor": 0, "pagador": "x"}) == etag
+    assert index.etag({"pagador": "y", "cursor": 0}) != etag
+    _boletos(store, 1, inicio=3)
+    index.refresh()
+    assert index.etag({"pagador": "x", "cursor": 0}) != etag
+    store.close()
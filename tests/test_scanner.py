@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from app.processor import BoletoProcessor
+from tests.referencias import MISSING_VALOR_TEXT, STANDARD_TEXT, cascade, scanner
+
+# Trechos dos layouts conhecidos, combinados aleatoriamente para exercitar
+# todos os níveis, a ordem entre eles e as ocorrências repetidas
+LINHA = "34191.79001 01043.510047 91020.150008 1 90010000012345"
+OUTRA_LINHA = "23798.15901 83016.613180 60913.909960 6 12930000342277"
+TRECHOS = [
+    LINHA,
+    OUTRA_LINHA,
+    f"Banco Exemplo 341-7 {LINHA}",
+    f"237-9 {OUTRA_LINHA}",
+    "Local de Pagamento Vencimento",
+    "PAGAVEL EM QUALQUER BANCO ATE O VENCIMENTO 10/05/2024",
+    "Pagável em qualquer banco até o vencimento 12/12/2025",
+    "Valor Documento 01/04/2024 1.234,56 20/04/2024",
+    "Beneficiário Agência / Código Beneficiário",
+    "EMPRESA EXEMPLO LTDA 1234/56789-0",
+    "Beneficiário: OPERADORA DE SAUDE SA",
+    "Data Documento Número Documento Espécie Doc. Aceite Data Processamento",
+    "01/04/2024 123456 DM N 01/04/2024",
+    "Aceite Data Processamento 02/04/2024",
+    "Data Documento Número Documento 03/04/2024",
+    "Valor do Documento 1.234,56",
+    "Valor do Documento 99,90",
+    "Data VencimentoValor DocumentoNúmero da Proposta 10/05/2024 456,78",
+    "Valor Plano 321,00",
+    "Vencimento Valor 150,00",
+    "Valor R$ 88,80",
+    "Valor a pagar R$ 1.000,00",
+    "Valor do Pagamento R$ 77,70",
+    "VALOR COBRADO 66,60",
+    "R$ 12,34",
+    "56,78 R$",
+    "(=) Valor cobrado 3.422,77",
+    "(=) 9,99",
+    "Total a pagar R$ 789,10",
+    "Total a pagar 10,00",
+    "Pagador FULANO DE TAL",
+    "FULANO DE TAL CPF 000.000.000-00",
+    "Pagador CPF/CNPJ: 000.000.000-00",
+    "MARIA DA SILVA",
+    "Demonstrativo de cobrança referente ao período",
+    "Consumo item 001 referente ao período 123 45,67",
+    "",
+]
+
+
+def _texto(rng: random.Random) -> str:
+    linhas = rng.choices(TRECHOS, k=rng.randint(0, 14))
+    # Às vezes dois trechos na mesma linha, como em layouts de colunas
+    if linhas and rng.random() < 0.3:
+        i = rng.randrange(len(linhas))
+        linhas[i] = f"{linhas[i]} {rng.choice(TRECHOS)}"
+    return "\n".join(linhas) + "\n"
+
+
+@pytest.mark.parametrize("text", [STANDARD_TEXT, MISSING_VALOR_TEXT, "", "\n"])
+def test_textos_de_referencia(text):
+    assert scanner(text) == cascade(text)
+
+
+def test_equivale_a_cascata_em_textos_aleatorios():
+    rng = random.Random(20240501)
+    for _ in range(30000):
+        text = _texto(rng)
+        assert scanner(text) == cascade(text), text
+
+
+def test_busca_de_parte_dos_campos():
+    rng = random.Random(7)
+    fields = list(BoletoProcessor.SCANNER.fields)
+    for _ in range(1000):
+        text = _texto(rng)
+        subset = rng.sample(fields, rng.randint(1, len(fields)))
+        found = BoletoProcessor.SCANNER.scan(text, subset)
+        expected = {f: v for f, v in cascade(text).items() if f in subset}
+        assert {f: v for f, (_, v) in found.items()} == expected, (subset, text)
@@ -0,0 +1,61 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.scheduler import BULK, EMAIL, INTERACTIVE, ExtractionScheduler, QueueFull
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=1)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def _ocupar(scheduler):
+    """Ocupa o único slot até o evento retornado ser liberado."""
+    liberar = threading.Event()
+    scheduler.submit(BULK, liberar.wait, 5)
+    return liberar
+
+
+def test_round_robin_ponderado(executor):
+    scheduler = ExtractionScheduler(lambda: executor, slots=1, capacity=100)
+    liberar = _ocupar(scheduler)
+    ordem = []
+    futures = [
+        scheduler.submit(priority, ordem.append, priority)
+        for priority in (BULK, EMAIL, INTERACTIVE)
+        for _ in range(24)
+    ]
+    liberar.set()
+    for future in futures:
+        future.result(timeout=5)
+
+    # Pesos 8/3/1: a cada 12 tarefas, 8 interativas, 3 de e-mail e 1 do backlog
+    for inicio in (0, 12):
+        janela = ordem[inicio:inicio + 12]
+        assert [janela.count(p) for p in (INTERACTIVE, EMAIL, BULK)] == [8, 3, 1]
+    # Suave: as classes se intercalam, sem rajadas longas de interativas
+    assert max(len(list(g)) for p, g in itertools.groupby(ordem[:24]) if p == INTERACTIVE) <= 3
+
+
+def test_fila_cheia(executor):
+    scheduler = ExtractionScheduler(lambda: executor, slots=1, capacity=2)
+    liberar = _ocupar(scheduler)
+    try:
+        scheduler.submit(INTERACTIVE, int)
+        scheduler.submit(INTERACTIVE, int)
+        with pytest.raises(QueueFull) as erro:
+            scheduler.submit(INTERACTIVE, int)
+        assert erro.value.priority == INTERACTIVE
+        assert erro.value.retry_after >= 1
+        with pytest.raises(QueueFull):
+            scheduler.submit(INTERACTIVE, int, block=True, timeout=0.05)
+        # Outra classe tem a sua própria fila
+        scheduler.submit(EMAIL, int)
+        assert scheduler.stats()["classes"][INTERACTIVE]["queued"] == 2
+    finally:
+        liberar.set()
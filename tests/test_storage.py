@@ -0,0 +1,80 @@
+import pytest
+
+from app.storage import SQLiteResultStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteResultStore(str(tmp_path / "boletos.db"))
+    yield store
+    store.close()
+
+
+def _boleto(arquivo, **campos):
+    return {"arquivo": arquivo, "codigo_barras": "1" * 44, "vencimento": "10/05/2024",
+            "valor": "1,00", **campos}
+
+
+def test_pendentes_sem_carregar_o_historico(store):
+    store.add_many([_boleto(f"anexos/{i}.pdf") for i in range(1200)])
+    store.quarantine("anexos/q.pdf", "timeout", "Tempo limite")
+    candidatos = ["anexos/novo2.pdf", "anexos/5.pdf", "anexos/q.pdf", "anexos/novo1.pdf"]
+    candidatos += [f"anexos/{i}.pdf" for i in range(600, 1300)]
+    assert store.unprocessed(candidatos) == (
+        ["anexos/novo2.pdf", "anexos/novo1.pdf"] + [f"anexos/{i}.pdf" for i in range(1200, 1300)]
+    )
+    assert store.unprocessed([]) == []
+
+
+@pytest.fixture
+def outro(store):
+    # Outra conexão ao mesmo banco, como um segundo processo
+    outro = SQLiteResultStore(store.db_file)
+    yield outro
+    outro.close()
+
+
+def test_reserva_exclui_outros_donos(store, outro):
+    store.add_many([_boleto("anexos/gravado.pdf")])
+    store.quarantine("anexos/q.pdf", "timeout", "Tempo limite")
+    arquivos = ["anexos/a.pdf", "anexos/gravado.pdf", "anexos/q.pdf", "anexos/b.pdf"]
+    assert store.claim(arquivos, "api", ttl=60) == ["anexos/a.pdf", "anexos/b.pdf"]
+    assert outro.claim(arquivos + ["anexos/c.pdf"], "worker", ttl=60) == ["anexos/c.pdf"]
+    # O próprio dono pode renovar a reserva
+    assert store.claim(["anexos/a.pdf"], "api", ttl=60) == ["anexos/a.pdf"]
+    assert store.renew_claims("api", ttl=60) == 2
+
+    assert store.release_claims("api", ["anexos/a.pdf"]) == 1
+    assert outro.claim(["anexos/a.pdf", "anexos/b.pdf"], "worker", ttl=60) == ["anexos/a.pdf"]
+    assert store.release_claims("api") == 1
+    assert outro.claim(["anexos/b.pdf"], "worker", ttl=60) == ["anexos/b.pdf"]
+
+
+def test_reserva_vencida_pode_ser_tomada(store, outro):
+    assert store.claim(["anexos/a.pdf"], "caiu", ttl=-1) == ["anexos/a.pdf"]
+    assert outro.claim(["anexos/a.pdf"], "worker", ttl=60) == ["anexos/a.pdf"]
+    # A gravação de quem perdeu a reserva é descartada
+    assert store.add_many([_boleto("anexos/a.pdf", valor="9,99")], owner="caiu") == 0
+    assert outro.add_many([_boleto("anexos/a.pdf")], owner="worker") == 1
+    assert store.get("anexos/a.pdf")["valor"] == "1,00"
+    # A gravação encerra a reserva do dono
+    assert outro.release_claims("worker") == 0
+
+
+def test_gravacao_sem_dono_ignora_reservas(store, outro):
+    outro.claim(["anexos/a.pdf"], "worker", ttl=60)
+    assert store.add_many([_boleto("anexos/a.pdf"), _boleto("anexos/b.pdf")]) == 2
+    assert store.add_many([_boleto("anexos/a.pdf"), _boleto("anexos/c.pdf")], owner="api") == 1
+    assert store.get("anexos/c.pdf") is not None
+
+
+def test_quarentena(store):
+    store.quarantine("anexos/q.pdf", "memoria", "Limite de memória")
+    store.quarantine("anexos/q.pdf", "timeout", "Tempo limite")
+    [item] = store.quarantined()
+    assert (item["arquivo"], item["motivo"], item["detalhe"]) == ("anexos/q.pdf", "timeout", "Tempo limite")
+    assert store.unprocessed(["anexos/q.pdf"]) == []
+    assert store.release("anexos/q.pdf")
+    assert not store.release("anexos/q.pdf")
+    assert store.quarantined() == []
+    assert store.claim(["anexos/q.pdf"], "api", ttl=60) == ["anexos/q.pdf"]